@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+
+from backends import open_reader
+from timeseries import SheetSeries
+from utils import AGGREGATE_MIN_PARALLEL_SHEETS
+from worker import check_cancelled
+
+
+def summarize(series: SheetSeries, start: date = None, end: date = None) -> dict:
+    """Compact arrays and statistics for one product inside a date range."""
+    dates, stock, price = series.between(start, end)
+    changes = np.diff(price)
+    return {
+        "dates": dates,
+        "price": price,
+        "changes": changes,
+        "total_change": int(price[-1] - price[0]) if price.size else 0,
+        "volatility": float(changes.std()) if changes.size else 0.0,
+    }
+
+
+def aggregate_workbook(wb, sheet_names: list, start: date = None, end: date = None, series_cache=None) -> dict:
+    """Aggregate sheets of an already loaded workbook in this process."""
+    results = {}
+    for sheet_name in sheet_names:
+        check_cancelled()
+        if series_cache is not None:
+            series = series_cache.get(wb, sheet_name)
+        else:
+            series = SheetSeries.from_rows(wb[sheet_name].iter_rows(min_row=2, values_only=True))
+        results[sheet_name] = summarize(series, start, end)
+    return results
+
+
+def _aggregate_chunk(file_name: str, sheet_names: list, start: date, end: date) -> dict:
+    """Process pool task: read the assigned sheets through a read-only view of the store."""
+    reader = open_reader(file_name)
+    try:
+        return aggregate_workbook(reader, sheet_names, start, end)
+    finally:
+        reader.close()
+
+
+def aggregate_file(file_name: str, sheet_names: list = None, start: date = None, end: date = None, workers: int = None) -> dict:
+    """Aggregate product sheets of a workbook or database across a process pool.
+
+    Sheets are dealt round-robin into one chunk per worker (opening the file
+    is the fixed cost); every worker opens it read-only and only parses the
+    sheets it was given. Small
+    workbooks are handled in-process since pool startup would dominate.
+    Results keep the order of ``sheet_names``.
+    """
+    if sheet_names is None:
+        reader = open_reader(file_name)
+        sheet_names = reader.sheetnames
+        reader.close()
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sheet_names) < AGGREGATE_MIN_PARALLEL_SHEETS:
+        return _aggregate_chunk(file_name, sheet_names, start, end)
+
+    chunk_count = min(len(sheet_names), workers)
+    chunks = [sheet_names[i::chunk_count] for i in range(chunk_count)]
+    merged = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_aggregate_chunk, file_name, chunk, start, end) for chunk in chunks]
+        for future in futures:
+            merged.update(future.result())
+    return {sheet_name: merged[sheet_name] for sheet_name in sheet_names}
+
+
+def top_movers(results: dict, count: int = 10) -> list:
+    """Products with the largest absolute price change, as ``(sheet, change)`` pairs."""
+    names = list(results)
+    if not names:
+        return []
+    totals = np.array([results[name]["total_change"] for name in names])
+    order = np.argsort(-np.abs(totals), kind="stable")[:count]
+    return [(names[i], int(totals[i])) for i in order]
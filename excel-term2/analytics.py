@@ -0,0 +1,219 @@
+"""Inventory analytics across every product.
+
+Usage::
+
+    python analytics.py [datas/products.xlsx] [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--top 5]
+
+Sheets are streamed through a read-only view of the store a chunk at a
+time; each chunk's rows are concatenated into flat arrays and folded into
+the running totals with grouped NumPy reductions, so memory is bounded by
+the chunk and the number of days, not by the catalog.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+
+from backends import open_reader
+from main import load_index
+from timeseries import SheetSeries
+from utils import storage_file_path, AGGREGATE_MIN_PARALLEL_SHEETS, ANALYTICS_CHUNK_SHEETS, ANALYTICS_TOP
+from worker import check_cancelled
+
+
+def new_partial(days: int) -> dict:
+    return {"value": np.zeros(days), "products": [], "sold": [], "turnover": [], "volatility": [], "drops": []}
+
+
+def fold_chunk(partial: dict, names: list, series: list, first_day: np.datetime64, days: int, top: int) -> None:
+    """Fold the series of some products into a partial report for ``days`` days from ``first_day``.
+
+    Value is tracked as the change each row makes to its product's stock ×
+    price, summed per day, so a cumulative sum later gives the catalog's
+    value at the end of every day. Rows before the range set the opening
+    value; stock moves and price changes only count inside the range.
+    """
+    lengths = np.array([len(s) for s in series], dtype=np.int64)
+    ends = np.cumsum(lengths)
+    product = np.repeat(np.arange(len(series)), lengths)
+    dates = np.concatenate([s.dates for s in series]) if series else np.array([], dtype="datetime64[s]")
+    stock = np.concatenate([s.stock for s in series]) if series else np.array([], dtype=np.int64)
+    price = np.concatenate([s.price for s in series]) if series else np.array([], dtype=np.int64)
+    first = np.zeros(dates.size, dtype=bool)
+    first[(ends - lengths)[lengths > 0]] = True
+    last = np.zeros(dates.size, dtype=bool)
+    last[ends[lengths > 0] - 1] = True
+
+    day = (dates.astype("datetime64[D]") - first_day).astype(np.int64)
+    started = day < days
+    value = stock * price
+    change = value - np.where(first, 0, np.roll(value, 1))
+    partial["value"] += np.bincount(np.maximum(day[started], 0), weights=change[started], minlength=days)
+
+    # Row-to-row moves of the same product, dated by the later row
+    moved = ~first & (day >= 0) & started
+    stock_change = stock - np.roll(stock, 1)
+    sold = np.bincount(product[moved], weights=np.maximum(-stock_change[moved], 0), minlength=len(series))
+
+    # Turnover: units sold over the time-weighted average stock in the range
+    low = first_day.astype("datetime64[s]").astype(np.int64)
+    high = (first_day + days).astype("datetime64[s]").astype(np.int64)
+    seconds = dates.astype(np.int64)
+    held = np.where(last, high, np.minimum(np.roll(seconds, -1), high)) - np.maximum(seconds, low)
+    held = np.maximum(held, 0)
+    stock_seconds = np.bincount(product, weights=stock * held.astype(np.float64), minlength=len(series))
+    tracked = np.bincount(product, weights=held, minlength=len(series))
+    average_stock = np.divide(stock_seconds, tracked, out=np.zeros(len(series)), where=tracked > 0)
+    turnover = np.divide(sold, average_stock, out=np.zeros(len(series)), where=average_stock > 0)
+
+    # Volatility: standard deviation of the relative price changes
+    previous = np.roll(price, 1)
+    priced = moved & (previous > 0)
+    returns = (price[priced] - previous[priced]) / previous[priced]
+    count = np.bincount(product[priced], minlength=len(series))
+    mean = np.divide(np.bincount(product[priced], weights=returns, minlength=len(series)), count,
+                     out=np.zeros(len(series)), where=count > 0)
+    square = np.divide(np.bincount(product[priced], weights=returns ** 2, minlength=len(series)), count,
+                       out=np.zeros(len(series)), where=count > 0)
+    volatility = np.sqrt(np.maximum(square - mean ** 2, 0))
+
+    # Largest single drops, kept to the top few across chunks
+    dropped = np.flatnonzero(moved & (stock_change < 0))
+    if dropped.size > top:
+        dropped = dropped[np.argpartition(stock_change[dropped], top)[:top]]
+    partial["drops"] = sorted(partial["drops"] + [
+        (int(-stock_change[i]), names[product[i]], dates[i].astype(datetime)) for i in dropped],
+        key=lambda drop: -drop[0])[:top]
+
+    partial["products"].extend(names)
+    partial["sold"].extend(sold.tolist())
+    partial["turnover"].extend(turnover.tolist())
+    partial["volatility"].extend(volatility.tolist())
+
+
+def analyze_sheets(reader, sheet_names: list, first_day: date, days: int, top: int = ANALYTICS_TOP,
+                   chunk_size: int = ANALYTICS_CHUNK_SHEETS) -> dict:
+    """Partial report of some sheets of an open (read-only) workbook or database, ``chunk_size`` sheets at a time."""
+    partial = new_partial(days)
+    first_day = np.datetime64(first_day, "D")
+    for i in range(0, len(sheet_names), chunk_size):
+        check_cancelled()
+        names = sheet_names[i:i + chunk_size]
+        series = [SheetSeries.from_rows(reader[name].iter_rows(min_row=2, values_only=True)) for name in names]
+        fold_chunk(partial, names, series, first_day, days, top)
+    return partial
+
+
+def _analyze_chunk(file_name: str, sheet_names: list, first_day: date, days: int, top: int) -> dict:
+    """Process pool task: stream the assigned sheets through a read-only view of the store."""
+    reader = open_reader(file_name)
+    try:
+        return analyze_sheets(reader, sheet_names, first_day, days, top)
+    finally:
+        reader.close()
+
+
+def date_range(index, sheet_names: list, start: date = None, end: date = None) -> tuple:
+    """``(first_day, days)`` covering ``start`` to ``end``, open ends taken from the products' dates."""
+    if start is None or end is None:
+        bounds = [(index.products[name]["min_date"], index.products[name]["max_date"]) for name in sheet_names
+                  if name in index.products and index.products[name]["min_date"] is not None]
+        if start is None and bounds:
+            start = datetime.strptime(min(low for low, _ in bounds)[:10], "%Y-%m-%d").date()
+        if end is None and bounds:
+            end = datetime.strptime(max(high for _, high in bounds)[:10], "%Y-%m-%d").date()
+    if start is None or end is None or end < start:
+        return date.today(), 0
+    return start, (end - start).days + 1
+
+
+def analyze_file(file_name: str, sheet_names: list = None, start: date = None, end: date = None,
+                 top: int = ANALYTICS_TOP, workers: int = None) -> dict:
+    """Inventory report of a workbook or database between two dates (both days inclusive).
+
+    Returns ``dates`` (one per day) with the catalog's ``value`` (sum of
+    stock × price) at the end of each, per-product ``sold`` units,
+    ``turnover`` (units sold over average stock) and price ``volatility``
+    aligned with ``products``, and the ``drops`` as ``(units, sheet, date)``
+    for the largest single stock decreases. Open ends default to the
+    earliest and latest transaction. Sheets are dealt round-robin to a
+    process pool like ``aggregate.aggregate_file``.
+    """
+    index = load_index(file_name)
+    if sheet_names is None:
+        sheet_names = list(index.sheetnames)
+    first_day, days = date_range(index, sheet_names, start, end)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sheet_names) < AGGREGATE_MIN_PARALLEL_SHEETS:
+        partials = [_analyze_chunk(file_name, sheet_names, first_day, days, top)]
+    else:
+        chunk_count = min(len(sheet_names), workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_analyze_chunk, file_name, sheet_names[i::chunk_count], first_day, days, top)
+                       for i in range(chunk_count)]
+            partials = [future.result() for future in futures]
+
+    report = {
+        "dates": np.datetime64(first_day, "D") + np.arange(days),
+        "value": np.rint(np.cumsum(sum(partial["value"] for partial in partials))).astype(np.int64),
+        "drops": sorted((drop for partial in partials for drop in partial["drops"]), key=lambda drop: -drop[0])[:top],
+    }
+    # Back to the order of sheet_names
+    position = {name: i for i, name in enumerate(sheet_names)}
+    products = [name for partial in partials for name in partial["products"]]
+    order = np.argsort([position[name] for name in products], kind="stable")
+    report["products"] = [products[i] for i in order]
+    for metric in ("sold", "turnover", "volatility"):
+        report[metric] = np.array([value for partial in partials for value in partial[metric]], dtype=np.float64)[order]
+    return report
+
+
+def ranked(report: dict, metric: str, count: int = ANALYTICS_TOP) -> list:
+    """Products with the highest ``metric`` ("sold", "turnover" or "volatility"), as ``(sheet, value)`` pairs."""
+    values = report[metric]
+    order = np.argsort(-values, kind="stable")[:count]
+    return [(report["products"][i], float(values[i])) for i in order if values[i] > 0]
+
+
+def print_report(report: dict, count: int = ANALYTICS_TOP) -> None:
+    if not report["dates"].size:
+        print("No transactions in the range.")
+        return
+    print(f"Inventory value: {report['value'][0]} on {report['dates'][0]}, {report['value'][-1]} on {report['dates'][-1]} "
+          f"(peak {report['value'].max()} on {report['dates'][report['value'].argmax()]})")
+    for metric, title in (("turnover", "Highest turnover"), ("volatility", "Most volatile prices")):
+        print(f"{title}:")
+        for sheet_name, value in ranked(report, metric, count):
+            print(f"  {sheet_name}: {value:.3f}")
+    print("Largest stock drops:")
+    for units, sheet_name, when in report["drops"][:count]:
+        print(f"  {sheet_name}: -{units} on {when}")
+
+
+def parse_day(text: str) -> date:
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a date (YYYY-MM-DD).") from None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", nargs="?", default=storage_file_path, help="workbook or database to analyze")
+    parser.add_argument("--start", type=parse_day, help="first day, defaults to the earliest transaction")
+    parser.add_argument("--end", type=parse_day, help="last day, defaults to the latest transaction")
+    parser.add_argument("--top", type=int, default=ANALYTICS_TOP, help="products listed per metric")
+    args = parser.parse_args(argv)
+    if args.start and args.end and args.end < args.start:
+        parser.error("--end is before --start.")
+
+    print_report(analyze_file(args.file, None, args.start, args.end, args.top), args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import os
+
+from reader import WorkbookReader
+from sqlite_store import SQLiteReader
+from utils import SQLITE_SUFFIXES
+
+
+def is_sqlite(file_name: str) -> bool:
+    """Whether a storage path names an SQLite database rather than a workbook."""
+    return os.path.splitext(file_name)[1].lower() in SQLITE_SUFFIXES
+
+
+def open_reader(file_name: str):
+    """Read-only view of either backend, with the ``WorkbookReader`` interface."""
+    if is_sqlite(file_name):
+        return SQLiteReader(file_name)
+    return WorkbookReader(file_name)
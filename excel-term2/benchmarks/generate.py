@@ -0,0 +1,59 @@
+import random
+from datetime import datetime, timedelta
+
+from main import header_row, apply_data_validation, write_only_sheet, load_rollups
+from backends import is_sqlite
+from sqlite_store import SQLiteStore, DEFAULT_SHEET
+from openpyxl import Workbook
+from utils import HEADERS
+
+START_DATE = datetime(2020, 1, 1)
+
+
+def product_name(number: int) -> str:
+    return f"Product {number:05d}"
+
+
+def product_rows(rng: random.Random, name: str, rows: int, start: datetime = START_DATE):
+    """Transactions of one product: increasing dates, random-walk stock and price."""
+    date = start
+    stock = rng.randint(10, 1000)
+    price = rng.randint(100, 10000)
+    for _ in range(rows):
+        yield [date, name, "Synthetic product", stock, price]
+        date += timedelta(minutes=rng.randint(1, 1440))
+        stock = max(0, stock + rng.randint(-20, 20))
+        price = max(1, price + rng.randint(-50, 50))
+
+
+def generate(file_name: str, products: int, rows: int, seed: int = 0) -> None:
+    """Write a catalog laid out like one built with ``add_product``/``edit_product``.
+
+    Sheets are titled with the lowercased product name and followed by the
+    default sheet of a new workbook. The same seed gives the same data on
+    either backend.
+    """
+    rng = random.Random(seed)
+    names = [product_name(number) for number in range(products)]
+    if is_sqlite(file_name):
+        with SQLiteStore(file_name) as store, store.conn:
+            store.clear()
+            for name in names:
+                store.create_product(name.lower(), first=False)
+                store.append_rows(name.lower(), product_rows(rng, name, rows))
+            store.create_product(DEFAULT_SHEET, header=False, first=False)
+        return
+
+    wb = Workbook(write_only=True)
+    for name in names:
+        ws = write_only_sheet(wb, name.lower(), rows + 1)
+        ws.append(header_row(ws, HEADERS))
+        for row in product_rows(rng, name, rows):
+            ws.append(row)
+        apply_data_validation(ws)
+    ws = write_only_sheet(wb, DEFAULT_SHEET, 1)
+    ws.append(header_row(ws, [None]))
+    apply_data_validation(ws)
+    wb.save(file_name)
+    # The stores keep rollups current as they write; build them once here
+    load_rollups(file_name).close()
@@ -0,0 +1,304 @@
+"""Time the data paths of main.py and the GUI against synthetic catalogs.
+
+Usage (from the excel-term2 folder)::
+
+    python benchmarks/run.py --products 10,100 --rows 10,1000
+    python benchmarks/run.py --backend xlsx,sqlite --output results.json
+    python benchmarks/run.py --update-baseline
+
+Every (backend, products, rows) case is generated into a scratch folder and
+each operation is timed ``--repeat`` times, followed by one extra run under
+tracemalloc for its peak memory. Results are written as JSON and compared
+with the stored baseline: an operation whose best run got slower, or whose
+peak grew, by more than ``--tolerance`` exits with status 1. The baseline is
+machine specific; regenerate it with ``--update-baseline`` on a new machine.
+So does a case whose cold start (importing ``main`` plus reading the first
+sheet) goes over ``STARTUP_BUDGET``.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+BASELINE_FILE = os.path.join(HERE, "baseline.json")
+DEFAULT_PRODUCTS = [10, 100]
+DEFAULT_ROWS = [10, 100]
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.5
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.02
+MIN_BYTES = 256 * 1024
+# Plot width in pixels the rollup chart picks its granularity for
+CHART_POINTS = 700
+
+
+def check(result):
+    """Fail the benchmark on an operation that reports ``(False, msg)``."""
+    if isinstance(result, tuple) and result[0] is False:
+        raise RuntimeError(result[1])
+    if result is False:
+        raise RuntimeError("operation failed")
+    return result
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """Median/min wall time over ``repeat`` runs plus the peak of one traced run."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            check(func())
+            times.append(time.perf_counter() - started)
+
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            check(func())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"seconds": statistics.median(times), "min": min(times), "runs": repeat, "peak_bytes": peak}
+
+
+def filter_range(reader, sheet_name: str):
+    """The middle half of a product's dates, like a typical chart filter."""
+    from timeseries import SeriesCache
+    dates = SeriesCache().get(reader, sheet_name).dates
+    if not dates.size:
+        return None, None
+    span = dates[-1] - dates[0]
+    start = (dates[0] + span // 4).astype(object).date()
+    end = (dates[-1] - span // 4).astype(object).date()
+    return start, end
+
+
+def run_case(backend: str, products: int, rows: int, repeat: int, seed: int) -> dict:
+    """Generate one catalog and time every operation against it."""
+    import main
+    from aggregate import aggregate_file, aggregate_workbook
+    from analytics import analyze_file
+    from backends import open_reader
+    from generate import generate
+    from metadata import index_path
+    from timeseries import SeriesCache
+    from utils import TABLE_PAGE_SIZE
+
+    file_name = os.path.abspath(f"bench-{products}x{rows}.{'db' if backend == 'sqlite' else 'xlsx'}")
+    ops = {}
+    started = time.perf_counter()
+    generate(file_name, products, rows, seed)
+    ops["generate"] = {"seconds": time.perf_counter() - started, "min": None, "runs": 1, "peak_bytes": None}
+
+    def fresh(path):
+        def remove():
+            for name in (path, index_path(path), path + "-wal", path + "-shm"):
+                if os.path.exists(name):
+                    os.remove(name)
+        return remove
+
+    def drop_index():
+        if os.path.exists(index_path(file_name)):
+            os.remove(index_path(file_name))
+
+    # Cold start without Tk: a fresh interpreter importing main, then the GUI's first-sheet pass
+    ops["import_main"] = measure(lambda: subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {os.path.dirname(HERE)!r}); import main"], check=True), repeat)
+
+    def first_sheet():
+        reader = open_reader(file_name)
+        try:
+            reader[reader.sheetnames[0]].rows(0, TABLE_PAGE_SIZE)
+            main.load_index(file_name)
+        finally:
+            reader.close()
+
+    ops["first_sheet"] = measure(first_sheet, repeat)
+
+    new_file = os.path.abspath(f"new.{'db' if backend == 'sqlite' else 'xlsx'}")
+    ops["create"] = measure(lambda: main.create_storage(new_file), repeat, setup=fresh(new_file))
+    ops["load_index_cold"] = measure(lambda: main.load_index(file_name), repeat, setup=drop_index)
+    ops["load_index"] = measure(lambda: main.load_index(file_name), repeat)
+    ops["validate_sheet_exists"] = measure(lambda: main.validate_sheet_exists(file_name, main.load_index(file_name).sheetnames[0]), repeat)
+
+    if backend == "xlsx":
+        ops["load_workbook"] = measure(lambda: main.prepare_workbook(file_name), repeat)
+        wb = main.prepare_workbook(file_name)
+        ops["save_workbook"] = measure(lambda: main.save_changes(wb, os.path.abspath("saved.xlsx")), repeat)
+        wb.close()
+    else:
+        ops["export_xlsx"] = measure(lambda: main.export_xlsx(file_name, os.path.abspath("export.xlsx")), repeat)
+
+    added = iter(range(sys.maxsize))
+    ops["add_product"] = measure(lambda: main.add_product(file_name, f"Bench {next(added)}", "Added", 1, 1), repeat)
+    # Index 1 is an original product once add_product put its sheet first
+    ops["edit_product"] = measure(lambda: main.edit_product(file_name, 1, price=1), repeat)
+    ops["delete_last_row"] = measure(lambda: main.delete_last_row(file_name, 1), repeat)
+
+    # update_chart_with_filter without Tk: the GUI's read path and its numpy filters
+    ops["open_reader"] = measure(lambda: open_reader(file_name).close(), repeat)
+    reader = open_reader(file_name)
+    try:
+        sheet_names = main.load_index(file_name).sheetnames
+        start, end = filter_range(reader, sheet_names[1])
+        ops["filter_sheet"] = measure(
+            lambda: SeriesCache().get(reader, sheet_names[1]).between(start, end), repeat)
+        ops["filter_all_in_process"] = measure(
+            lambda: aggregate_workbook(reader, sheet_names, start, end, SeriesCache()), repeat)
+    finally:
+        reader.close()
+    ops["filter_all_file"] = measure(lambda: aggregate_file(file_name, sheet_names, start, end), repeat)
+    ops["analytics"] = measure(lambda: analyze_file(file_name, sheet_names), repeat)
+
+    # The GUI's long-history chart path: pick a rollup granularity, read its buckets
+    rollups = main.load_rollups(file_name)
+    try:
+        ops["chart_rollups"] = measure(
+            lambda: rollups.series(sheet_names[1], rollups.pick(sheet_names[1], CHART_POINTS, start, end) or "day",
+                                   start, end).envelope(), repeat)
+    finally:
+        rollups.close()
+    return {"backend": backend, "products": products, "rows": rows, "ops": ops}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Operations that regressed against the baseline or that it lacks, as printable lines.
+
+    Cases the baseline doesn't have (other sizes) are left out, see ``missing_cases``.
+    """
+    regressions = []
+    for case, data in results["cases"].items():
+        base_case = baseline.get("cases", {}).get(case)
+        if base_case is None:
+            continue
+        for op, current in data["ops"].items():
+            if op == "generate":
+                continue
+            base = base_case["ops"].get(op)
+            if base is None:
+                regressions.append(f"{case} {op}: not in the baseline, regenerate it with --update-baseline")
+                continue
+            # Best of the runs is the least noisy figure to compare
+            if current["min"] > base["min"] * (1 + tolerance) and current["min"] - base["min"] > MIN_SECONDS:
+                regressions.append(f"{case} {op}: {current['min'] * 1000:.1f} ms, baseline {base['min'] * 1000:.1f} ms")
+            if base.get("peak_bytes") and current["peak_bytes"] > base["peak_bytes"] * (1 + tolerance) \
+                    and current["peak_bytes"] - base["peak_bytes"] > MIN_BYTES:
+                regressions.append(f"{case} {op}: peak {current['peak_bytes'] / 1024:.0f} KiB, "
+                                   f"baseline {base['peak_bytes'] / 1024:.0f} KiB")
+    return regressions
+
+
+def missing_cases(results: dict, baseline: dict) -> list:
+    """Cases measured here that the baseline has nothing to compare with."""
+    return [case for case in results["cases"] if case not in baseline.get("cases", {})]
+
+
+def over_budget(results: dict) -> list:
+    """Cases whose cold start exceeds ``STARTUP_BUDGET``, as printable lines."""
+    from utils import STARTUP_BUDGET
+    lines = []
+    for case, data in results["cases"].items():
+        seconds = data["ops"]["import_main"]["min"] + data["ops"]["first_sheet"]["min"]
+        if seconds > STARTUP_BUDGET:
+            lines.append(f"{case} cold start: {seconds * 1000:.0f} ms, budget {STARTUP_BUDGET * 1000:.0f} ms")
+    return lines
+
+
+def print_results(results: dict) -> None:
+    for case, data in results["cases"].items():
+        print(case)
+        for op, m in data["ops"].items():
+            peak = f"{m['peak_bytes'] / 1024:10.0f} KiB" if m["peak_bytes"] is not None else ""
+            print(f"  {op:24s} {m['seconds'] * 1000:10.1f} ms {peak}")
+
+
+def parse_list(value: str) -> list:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", default=",".join(map(str, DEFAULT_PRODUCTS)), help="comma separated product counts")
+    parser.add_argument("--rows", default=",".join(map(str, DEFAULT_ROWS)), help="comma separated rows per product")
+    parser.add_argument("--backend", default="xlsx,sqlite", help="comma separated backends: xlsx, sqlite")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "cases": {},
+    }
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_file = os.path.abspath(args.baseline)
+
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="excel-bench-")
+    # Catalogs and scratch files are written relative to the working directory
+    os.chdir(work_dir)
+    try:
+        for backend in parse_list(args.backend):
+            for products in map(int, parse_list(args.products)):
+                for rows in map(int, parse_list(args.rows)):
+                    case = f"{backend}-{products}x{rows}"
+                    print(f"Running {case}...", file=sys.stderr)
+                    results["cases"][case] = run_case(backend, products, rows, args.repeat, args.seed)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+    over = over_budget(results)
+    for line in over:
+        print(f"OVER BUDGET: {line}", file=sys.stderr)
+    status = 1 if over else 0
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(baseline_file, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {baseline_file}")
+        return 0
+
+    if not os.path.exists(baseline_file):
+        print(f"No baseline at {baseline_file}; run with --update-baseline to create one.", file=sys.stderr)
+        return status
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = json.load(f)
+    for case in missing_cases(results, baseline):
+        print(f"Not in the baseline, not compared: {case}", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} operation(s) beyond {args.tolerance:.0%} of the baseline or missing from it",
+              file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print("No regressions against the baseline.")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import tkinter as tk
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+import perf
+from utils import CHART_MARKER_POINTS
+
+
+def minmax_indices(y: np.ndarray, buckets: int, previous: np.ndarray = None, changed: int = 0) -> np.ndarray:
+    """Indices keeping the min and max of each of ``buckets`` equal slices of ``y``.
+
+    Peaks survive the decimation, so the line looks the same at plot
+    resolution with at most ``2 * buckets`` points.
+
+    ``previous`` is the result for an earlier ``y`` that only differs from
+    index ``changed`` on (points appended or removed at the end): while the
+    slice size stays the same, the slices before the changed one are reused
+    and only the tail is scanned.
+    """
+    n = y.size
+    if buckets <= 0 or n <= 2 * buckets:
+        return np.arange(n)
+
+    size = -(-n // buckets)  # ceil
+    first = 0
+    if previous is not None and previous.size:
+        # The last point of the old series is always kept, which gives its length
+        old_n = int(previous[-1]) + 1
+        if old_n > 2 * buckets and -(-old_n // buckets) == size:
+            first = min(changed, old_n - 1) // size
+    start = first * size
+    count = -(-(n - start) // size)
+    tail = y[start:]
+    padded = np.concatenate([tail, np.repeat(tail[-1:], size * count - tail.size)]).reshape(count, size)
+    starts = start + np.arange(count) * size
+    lows = starts + padded.argmin(axis=1)
+    highs = starts + padded.argmax(axis=1)
+    kept = previous[previous < start] if first else np.array([], dtype=np.int64)
+    return np.unique(np.concatenate([kept, lows, highs, [0, n - 1]]))
+
+
+class ChartRenderer:
+    """One figure and canvas reused for every chart update.
+
+    Series are kept as Line2D objects and updated with ``set_data``; long
+    series are decimated to about two points per horizontal pixel before
+    drawing. Switching between date and index x axes clears the axes once.
+    """
+
+    def __init__(self, master, figsize=(7, 8)):
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        # Actual rendering happens in draw(), which draw_idle schedules
+        self.canvas.draw = perf.timed("chart.draw")(self.canvas.draw)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.canvas.get_tk_widget().bind("<Configure>", lambda event: self.refresh(), add="+")
+
+        self.lines = {}     # label -> Line2D
+        self.series = {}    # label -> full (x, y) arrays
+        self.decimated = {}  # label -> (buckets, indices) last plotted
+        self.x_kind = None  # "date" or "index"
+        self.message = None
+
+    def pixel_width(self) -> int:
+        width = self.canvas.get_tk_widget().winfo_width()
+        if width <= 1:  # Not mapped yet
+            width = int(self.figure.get_figwidth() * self.figure.dpi)
+        return width
+
+    def show_series(self, series: dict, title: str, xlabel: str, ylabel: str, legend: bool = False) -> None:
+        """Replace the plotted series, reusing existing lines where labels match."""
+        x_kind = "date" if any(np.issubdtype(np.asarray(x).dtype, np.datetime64) for x, _ in series.values()) else "index"
+        if x_kind != self.x_kind:
+            # Axis units can't change under existing lines
+            self.ax.clear()
+            self.lines = {}
+            self.message = None
+            self.x_kind = x_kind
+            self.ax.tick_params(axis="x", labelrotation=45)
+
+        for label in list(self.lines):
+            if label not in series:
+                self.lines.pop(label).remove()
+        if self.message is not None:
+            self.message.remove()
+            self.message = None
+
+        self.series = {label: (np.asarray(x), np.asarray(y)) for label, (x, y) in series.items()}
+        self.decimated = {}
+        for label in self.series:
+            if label not in self.lines:
+                self.lines[label], = self.ax.plot([], [], label=label)
+
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        legend_artist = self.ax.get_legend()
+        if legend and self.lines:
+            self.ax.legend()
+        elif legend_artist is not None:
+            legend_artist.remove()
+        self.refresh()
+
+    def show_message(self, text: str) -> None:
+        """Clear the series and show a centered message instead."""
+        self.show_series({}, "", "", "")
+        self.message = self.ax.text(0.5, 0.5, text, transform=self.ax.transAxes,
+                                    horizontalalignment='center', verticalalignment='center')
+        self.canvas.draw_idle()
+
+    @perf.timed("chart.refresh")
+    def refresh(self) -> None:
+        """Decimate the stored series for the current width and redraw."""
+        buckets = self.pixel_width()
+        for label, (x, y) in self.series.items():
+            self._plot(label, x, y, buckets, minmax_indices(y, buckets))
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    @perf.timed("chart.update_tail")
+    def update_tail(self, label: str, x, y, changed: int) -> None:
+        """Replace one plotted series whose points only changed from index ``changed`` on.
+
+        Only the slices from the changed point on are decimated again, so
+        a row appended to a long history costs about one slice.
+        """
+        x, y = np.asarray(x), np.asarray(y)
+        self.series[label] = (x, y)
+        buckets = self.pixel_width()
+        plotted, previous = self.decimated.get(label, (None, None))
+        indices = minmax_indices(y, buckets, previous if plotted == buckets else None, changed)
+        self._plot(label, x, y, buckets, indices)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    def _plot(self, label: str, x: np.ndarray, y: np.ndarray, buckets: int, indices: np.ndarray) -> None:
+        line = self.lines[label]
+        line.set_data(x[indices], y[indices])
+        line.set_marker('o' if indices.size <= CHART_MARKER_POINTS else '')
+        self.decimated[label] = (buckets, indices)
@@ -0,0 +1,120 @@
+import itertools
+import json
+import os
+import socket
+import threading
+
+import events
+from utils import SERVER_SOCKET_SUFFIX, SERVER_TIMEOUT
+
+
+def socket_path(file_name: str) -> str:
+    """Where the write daemon of a storage file listens."""
+    return file_name + SERVER_SOCKET_SUFFIX
+
+
+def send_message(sock, message: dict) -> None:
+    """Send one newline-delimited JSON message."""
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+class StoreClient:
+    """Connection to a write daemon (``server.py``).
+
+    ``request`` sends one store operation and waits for its acknowledgement,
+    which comes after the batch holding it has been saved. Changes made by
+    other clients arrive as notifications and are passed to the callbacks
+    given to ``subscribe``, from the connection's reader thread.
+    """
+
+    def __init__(self, path: str, timeout: float = SERVER_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.closed = False
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._waiting = {}  # request id -> [threading.Event, reply]
+        self._listeners = []
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def request(self, op: str, *args):
+        """Run a ``ProductStore`` method on the daemon; returns its ``(success, msg)``.
+
+        The operation's change events are emitted in this thread, as if the
+        store had run here.
+        """
+        request_id = next(self._ids)
+        waiting = self._waiting[request_id] = [threading.Event(), None]
+        try:
+            with self._send_lock:
+                send_message(self.sock, {"id": request_id, "op": op, "args": list(args)})
+            if not waiting[0].wait(self.timeout):
+                return False, f"No reply from the server at '{self.path}'."
+        except OSError as e:
+            return False, f"Lost the server at '{self.path}': {e}"
+        finally:
+            self._waiting.pop(request_id, None)
+
+        reply = waiting[1]
+        if reply is None:
+            return False, f"Lost the server at '{self.path}'."
+        if "error" in reply:
+            return False, reply["error"]
+        for event in reply["changes"]:
+            events.emit(event)
+        return tuple(reply["result"])
+
+    def subscribe(self, callback) -> None:
+        """Call ``callback(changes)`` with the change events of every operation made by another client."""
+        self._listeners.append(callback)
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _read(self) -> None:
+        try:
+            for line in self.sock.makefile("rb"):
+                message = json.loads(line)
+                if "id" in message:
+                    waiting = self._waiting.get(message["id"])
+                    if waiting is not None:
+                        waiting[1] = message
+                        waiting[0].set()
+                else:
+                    for callback in list(self._listeners):
+                        callback(message["changes"])
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.closed = True
+            for waiting in list(self._waiting.values()):
+                waiting[0].set()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(file_name: str):
+    """The shared client for the daemon serving ``file_name``, or None if none is running."""
+    path = socket_path(file_name)
+    if not os.path.exists(path):
+        return None
+    with _clients_lock:
+        client = _clients.get(path)
+        if client is None or client.closed:
+            try:
+                client = _clients[path] = StoreClient(path)
+            except OSError:
+                # A socket left behind by a daemon that is gone
+                _clients.pop(path, None)
+                return None
+        return client
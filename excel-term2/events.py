@@ -0,0 +1,78 @@
+import threading
+from contextlib import contextmanager
+
+from metadata import json_row
+
+# Change events are dicts with a "type" and the "sheet" they concern:
+#   {"type": "sheet_added", "sheet", "row"}            new product with its first row
+#   {"type": "row_appended", "sheet", "row"}
+#   {"type": "row_removed", "sheet", "row", "last"}    the removed row and the new last row
+#   {"type": "sheet_renamed", "sheet", "title"}
+#   {"type": "sheet_deleted", "sheet"}
+#   {"type": "reset"}                                  too much changed, reload everything
+# Rows are lists with the date as a DATE_FORMAT string, like journal records.
+
+_listeners = []
+_local = threading.local()
+
+
+def subscribe(callback) -> None:
+    """Call ``callback(event)`` for every change, from the thread that made it."""
+    _listeners.append(callback)
+
+
+def unsubscribe(callback) -> None:
+    _listeners.remove(callback)
+
+
+def emit(event: dict) -> None:
+    for changes in getattr(_local, "captures", ()):
+        changes.append(event)
+    for callback in list(_listeners):
+        callback(event)
+
+
+@contextmanager
+def capture():
+    """Collect the events emitted by this thread inside the block."""
+    changes = []
+    captures = _local.__dict__.setdefault("captures", [])
+    captures.append(changes)
+    try:
+        yield changes
+    finally:
+        captures.remove(changes)
+
+
+def capture_changes(func, *args, **kwargs):
+    """Run ``func`` and return ``(result, events)`` for the changes it made."""
+    with capture() as changes:
+        result = func(*args, **kwargs)
+    return result, changes
+
+
+def record_events(record: dict, removed=None, last=None) -> list:
+    """Change events for one store operation (a ``main.apply_record`` record).
+
+    ``removed`` and ``last`` are the deleted and the new last row of a
+    ``delete_last_row``; the record itself carries at most the new last row.
+    """
+    title = record["sheet"]
+    new_title = record.get("title")
+    renamed = [{"type": "sheet_renamed", "sheet": title, "title": new_title}] if new_title and new_title != title else []
+    match record["op"]:
+        case "add":
+            return [{"type": "sheet_added", "sheet": title, "row": json_row(record["row"])}]
+        case "append":
+            return [{"type": "row_appended", "sheet": title, "row": json_row(record["row"])}] + renamed
+        case "delete_last_row":
+            # apply_record renames before it deletes
+            return renamed + [{"type": "row_removed", "sheet": new_title or title, "row": json_row(removed), "last": json_row(last)}]
+        case "delete_sheet":
+            return [{"type": "sheet_deleted", "sheet": title}]
+    return []
+
+
+def emit_record(record: dict, removed=None, last=None) -> None:
+    for event in record_events(record, removed, last):
+        emit(event)
@@ -1,12 +1,55 @@
+import time
+STARTED = time.perf_counter()  # Time-to-first-paint includes the imports below
+
+import queue
 import tkinter as tk
 from datetime import datetime
 from tkinter import ttk, messagebox
-from openpyxl import load_workbook
 import os
-from main import delete_last_row, delete_product_sheet, add_product, edit_product
-from utils import excel_file_path
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import sqlite3
+import numpy as np
+from main import delete_last_row, delete_product_sheet, add_product, edit_product, load_index, load_rollups, create_storage
+from utils import storage_file_path, IO_POLL_MS, STARTUP_BUDGET
+from timeseries import SeriesCache
+from table import VirtualTable
+from backends import open_reader
+from worker import IOWorker
+from aggregate import aggregate_file, top_movers
+from analytics import analyze_file, ranked
+from perf_panel import PerfPanel
+from events import capture_changes
+from client import get_client
+from search import ProductSearch
+import perf
+
+
+@perf.timed("gui.read_workbook")
+def read_workbook(file_name, sheet_index):
+    """Open a read-only view and the sheet to show, its first rows only (runs on the I/O worker).
+
+    The metadata index is loaded after the first paint (``load_index``),
+    since a cold one reads every sheet.
+    """
+    if not os.path.exists(file_name):
+        create_storage(file_name)
+    reader = open_reader(file_name)
+    if reader.sheetnames:
+        reader[reader.sheetnames[max(0, min(sheet_index, len(reader.sheetnames) - 1))]]
+    return reader
+
+
+@perf.timed("gui.prepare_chart")
+def prepare_chart(file_name):
+    """Import the chart module (and matplotlib) and open the rollups, after the first sheet is shown (runs on the I/O worker).
+
+    Returns the renderer class, the rollups and the error that kept them from loading, if any.
+    """
+    import chart
+    try:
+        return chart.ChartRenderer, load_rollups(file_name), None
+    except sqlite3.Error as e:
+        # Charts fall back to the raw rows
+        return chart.ChartRenderer, None, f"Failed to load the rollups: {e}"
 
 
 class ProductApp:
@@ -17,8 +60,27 @@ class ProductApp:
         self.root.state('zoomed')
 
         self.current_sheet_index = 0  # current sheet index
+        self.series_cache = SeriesCache()  # per-sheet numpy columns for the chart
+        self.workbook = None
+        self.index = None
+        self.rollups = None
+        self.chart = None  # created once matplotlib is imported, after the first paint
+        self.pending_chart = None  # (method, args) of the latest chart asked for before that
+        self.chart_view = None  # (sheet, start, end, granularity) of the price chart shown, None for other charts
+        self.search = None  # built with the rollups, after the first paint
+        self.search_query = None  # query of search_results, None once changes made them stale
+        self.search_results = []
+        self.painted = False
+        self.sheets = []
+        self.client = None  # write daemon connection, when one is running
+        self.notifications = queue.Queue()  # changes made by other clients of the daemon
+        self.change_seq = 0  # latest daemon operation applied
 
         self.setup_ui()
+        self.worker = IOWorker(self.root, on_state=self.set_busy)  # workbook I/O off the Tk thread
+        self.connect_server()
+        self.root.after(IO_POLL_MS, self.poll_notifications)
+        perf.begin_action("startup")
         self.load_data()
 
     def setup_ui(self):
@@ -77,9 +139,24 @@ class ProductApp:
         apply_all_sheets_checkbox = tk.Checkbutton(input_frame , text = "Apply filter on all sheets" ,variable = self.apply_all_sheets_var)
         apply_all_sheets_checkbox.grid(row = 8 , columnspan = 2 , pady = 5)
 
-        # Treeview
-        self.tree = ttk.Treeview(self.root, show='headings')
-        self.tree.grid(row=0, column=2, padx=10, pady=10, sticky=tk.NSEW)
+        # Search across products, e.g. "stock<10" or "changed<7d" (see search.parse_query)
+        search_separator = ttk.Separator(input_frame , orient = 'horizontal')
+        search_separator.grid(row = 9 , columnspan = 2 , pady = 10 , sticky = "ew")
+
+        tk.Label(input_frame , text = "Search:" , bg = "gray").grid(row = 10 , column = 0 , sticky = tk.W)
+        self.search_entry = tk.Entry(input_frame)
+        self.search_entry.grid(row = 10 , column = 1 , pady = 5)
+        self.search_entry.bind("<Return>" , self.find_product)
+
+        find_button = tk.Button(input_frame , text = "Find Next" , command = self.find_product)
+        find_button.grid(row = 11 , columnspan = 2 , pady = 5)
+
+        self.search_label = tk.Label(input_frame , text = "" , bg = "gray")
+        self.search_label.grid(row = 12 , columnspan = 2 , sticky = tk.W)
+
+        # Treeview (only the visible page of rows is materialized)
+        self.table = VirtualTable(self.root)
+        self.table.grid(row=0, column=2, padx=10, pady=10, sticky=tk.NSEW)
 
         # Navigation Buttons
         nav_frame = tk.Frame(self.root, bg="gray")
@@ -96,109 +173,302 @@ class ProductApp:
 
         self.chart_frame = tk.Frame(self.root, bg = "gray")
         self.chart_frame.grid(row=0, column=3, padx=10, pady=10, sticky=tk.NSEW)
-        self.chart_canvas = None
+        self.chart_placeholder = tk.Label(self.chart_frame, text="Loading chart...", bg="gray")
+        self.chart_placeholder.pack(fill=tk.BOTH, expand=True)
 
         # Delete last row
         delete_last_row_button = tk.Button(button_frame, text="Delete Last Row", command=self.delete_last_row_gui)
         delete_last_row_button.pack(fill=tk.X, pady=5)
 
+        # Busy state of the background I/O
+        status_frame = tk.Frame(self.root, bg="gray")
+        status_frame.grid(row=2, column=0, columnspan=4, padx=10, pady=5, sticky=tk.EW)
+        self.status_label = tk.Label(status_frame, text="Ready", bg="gray")
+        self.status_label.pack(side=tk.LEFT)
+        self.progress = ttk.Progressbar(status_frame, mode="indeterminate", length=150)
+        self.progress.pack(side=tk.LEFT, padx=10)
+        self.cancel_button = tk.Button(status_frame, text="Cancel", command=self.cancel_load, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT)
+
+        # Timings of the hot paths, hidden until toggled
+        self.perf_panel = PerfPanel(self.root, perf.recorder)
+        self.perf_panel.grid(row=3, column=0, columnspan=4, padx=10, pady=5, sticky=tk.EW)
+        perf_button = tk.Button(button_frame, text="Perf", command=self.perf_panel.toggle)
+        perf_button.pack(fill=tk.X, pady=5)
+
+        # Catalog-wide inventory value chart, over the date filter when one is given
+        analytics_button = tk.Button(button_frame, text="Analytics", command=self.show_analytics_gui)
+        analytics_button.pack(fill=tk.X, pady=5)
+        self.analytics_label = tk.Label(status_frame, text="", bg="gray")
+        self.analytics_label.pack(side=tk.LEFT, padx=10)
+
+        # Startup time and background load problems
+        self.notice_label = tk.Label(status_frame, text="", bg="gray")
+        self.notice_label.pack(side=tk.RIGHT)
+
+    def set_busy(self, state):
+        """Reflect the I/O worker state ("read", "write" or None) in the status bar."""
+        if state is None:
+            self.status_label.config(text="Ready")
+            self.progress.stop()
+            self.root.config(cursor="")
+        else:
+            self.status_label.config(text="Saving..." if state == "write" else "Loading...")
+            self.progress.start(10)
+            self.root.config(cursor="watch")
+        self.cancel_button.config(state=tk.NORMAL if state == "read" else tk.DISABLED)
+
+    def cancel_load(self):
+        self.worker.cancel("read")
+
+    def run_write(self, func, *args, success_text=None, fail=messagebox.showerror):
+        """Run a main.py mutation on the I/O worker, then apply its changes and report."""
+        def done(result):
+            (success, msg), changes = result
+            self.apply_changes(changes)
+            if success:
+                messagebox.showinfo("Success", success_text or msg)
+            else:
+                fail("Error" if fail is messagebox.showerror else "Fail", msg)
+
+        def failed(error):
+            messagebox.showerror("Error", f"Failed to perform product operation: {error}")
+            self.load_data()
+
+        if self.worker.submit("write", capture_changes, func, *args, on_done=done, on_error=failed) is None:
+            messagebox.showinfo("Busy", "A save is still in progress, please wait.")
+
+    def connect_server(self):
+        """Follow the changes other clients make through the write daemon, if one is running."""
+        self.client = get_client(storage_file_path)
+        if self.client is not None:
+            self.client.subscribe(self.notifications.put)
+
+    def poll_notifications(self):
+        try:
+            while True:
+                changes = self.notifications.get_nowait()
+                # A load in flight may or may not have read the change already
+                if self.worker.has_pending("read"):
+                    self.load_data()
+                else:
+                    self.apply_changes(changes)
+        except queue.Empty:
+            pass
+        if self.client is not None and self.client.closed:
+            # The daemon went away: reconnect if it was restarted and catch up from the file
+            self.connect_server()
+            self.change_seq = 0
+            self.load_data()
+        self.root.after(IO_POLL_MS, self.poll_notifications)
+
+    @perf.timed("gui.apply_changes")
+    def apply_changes(self, changes):
+        """Patch the reader, index, series cache and the shown sheet instead of reloading."""
+        if not changes:
+            return
+        # Daemon operations are numbered; one older than what was applied arrived out of order.
+        # Before the index is loaded it can't tell whether it already has the changes.
+        if self.workbook is None or self.index is None or any(event["type"] == "reset" or event.get("seq", self.change_seq) < self.change_seq
+                                        for event in changes):
+            self.load_data()
+            return
+        self.change_seq = max([self.change_seq] + [event["seq"] for event in changes if "seq" in event])
+        self.search_query = None
+        shown = self.sheets[self.current_sheet_index] if self.sheets else None
+        chart_stale = False
+        # First point of the shown series that the changes touched, for a tail-only chart update
+        changed = len(self.series_cache.get(self.workbook, shown)) if shown in self.series_cache else 0
+        for event in changes:
+            self.workbook.apply_event(event)
+            self.index.apply_event(event)
+            self.series_cache.apply_event(event)
+            if shown in self.series_cache:
+                changed = min(changed, len(self.series_cache.get(self.workbook, shown)))
+            if self.search is not None:
+                self.search.apply_event(event)
+            match event["type"]:
+                case "sheet_renamed" if event["sheet"] == shown:
+                    shown = event["title"]
+                case "sheet_deleted" if event["sheet"] == shown:
+                    shown = None
+                case "row_appended" | "row_removed" if event["sheet"] == shown:
+                    if self.is_shown(shown):
+                        if event["type"] == "row_appended":
+                            self.table.row_appended()
+                        else:
+                            self.table.row_removed()
+                    chart_stale = True
+
+        self.sheets = self.index.sheetnames
+        if shown in self.sheets:
+            # New sheets are inserted first, so the shown one may have moved
+            self.current_sheet_index = self.sheets.index(shown)
+            if not chart_stale:
+                return
+            if self.is_shown(shown):
+                self.refresh_price_chart(shown, changed)
+                return
+        self.current_sheet_index = max(0, min(self.current_sheet_index, len(self.sheets) - 1))
+        self.display_sheet(self.sheets[self.current_sheet_index])
+
+    def is_shown(self, sheet_name):
+        """Whether the table shows the reader's live copy of ``sheet_name``, which change events patch."""
+        source = self.table.source
+        return source is not None and source.title == sheet_name and sheet_name in self.workbook \
+            and self.workbook[sheet_name] is source
+
     def handle_product(self, mode):
+        perf.begin_action(mode)
         name = self.name_entry.get()
         description = self.description_entry.get()
         stock = self.count_entry.get()
         price = self.price_entry.get()
 
         # To set the name to last record of the sheet for edit operation
-        if not name and mode == "edit":
-            ws = self.workbook[self.sheets[self.current_sheet_index]]
-            last_row = ws.max_row
-            last_record_name = ws.cell(row = last_row , column = 2).value  # Assuming the name is in the 2nd column
-            name = last_record_name
+        if not name and mode == "edit" and self.index is not None:
+            last_record = self.index.last_record(self.sheets[self.current_sheet_index])
+            name = last_record["Name"] if last_record else None
 
         try:
             match mode:
                 case "add":
                     if name and description and stock and price:
-                        success , msg = add_product(excel_file_path , name , description , int(stock) , int(price))
-                        if success:
-                            messagebox.showinfo("Success" , "Product operation completed successfully.")
-                        else:
-                            messagebox.showerror("Error" , msg)
+                        self.run_write(add_product , storage_file_path , name , description , int(stock) , int(price) ,
+                                       success_text = "Product operation completed successfully.")
                     else:
                         messagebox.showerror("Error" , "Please fill in all fields for adding a product.")
                 case "edit":
                     if name:
                         # Tuple
-                        success, msg = edit_product(excel_file_path, self.current_sheet_index , name , description , int(stock) , int(price))
-                        if success:
-                            messagebox.showinfo("Success" , "Product operation completed successfully.")
-                        else:
-                            messagebox.showerror("Error" , msg)
+                        self.run_write(edit_product , storage_file_path , self.sheets[self.current_sheet_index] , name , description , int(stock) , int(price) ,
+                                       success_text = "Product operation completed successfully.")
                 case "delete":
                     if name:
-                        success, msg = delete_product_sheet(excel_file_path , name)
-                        if success:
-                            messagebox.showinfo("Success" , "Product sheet deleted successfully.")
-                        else:
-                            messagebox.showinfo("Fail" , msg)
+                        self.run_write(delete_product_sheet , storage_file_path , name ,
+                                       success_text = "Product sheet deleted successfully." , fail = messagebox.showinfo)
                     else:
                         messagebox.showerror("Warning" , "Please enter the product name for deleting.")
         except Exception as e:
             messagebox.showerror("Error" , f"Failed to perform product operation: {e}")
 
-        self.load_data()
-
     def load_data(self):
-        if os.path.exists(excel_file_path):
-            self.workbook = load_workbook(excel_file_path)
-            self.sheets = self.workbook.sheetnames
-            self.display_sheet(self.sheets[self.current_sheet_index])
-        else:
-            messagebox.showerror("Error", f"Excel file '{excel_file_path}' not found!")
-
+        """Reload the workbook and index on the I/O worker, superseding older loads."""
+        self.worker.cancel("read")
+        self.worker.submit("read", read_workbook, storage_file_path, self.current_sheet_index, on_done=self.on_data_loaded,
+                           on_error=lambda e: messagebox.showerror("Error", f"Failed to load '{storage_file_path}': {e}"))
+
+    @perf.timed("gui.on_data_loaded")
+    def on_data_loaded(self, reader):
+        if self.workbook is not None:
+            self.workbook.close()
+        self.workbook = reader
+        self.index = None
+        self.series_cache.invalidate()
+        self.search = None
+        self.search_query = None
+        self.sheets = list(reader.sheetnames)
+        self.current_sheet_index = max(0, min(self.current_sheet_index, len(self.sheets) - 1))
+        self.display_sheet(self.sheets[self.current_sheet_index])
+        # The index, then the chart and its rollups, wait for the first paint
+        self.worker.submit("read", load_index, storage_file_path, on_done=self.on_index_loaded, group="index",
+                           on_error=lambda e: messagebox.showerror("Error", f"Failed to load the index: {e}"))
+
+    @perf.timed("gui.on_index_loaded")
+    def on_index_loaded(self, index):
+        self.index = index
+        self.sheets = index.sheetnames
+        self.worker.submit("read", prepare_chart, storage_file_path, on_done=self.on_chart_ready, group="chart",
+                           on_error=lambda e: messagebox.showerror("Error", f"Failed to prepare the chart: {e}"))
+
+    def on_chart_ready(self, result):
+        renderer, rollups, error = result
+        if self.rollups is not None:
+            self.rollups.close()
+        self.rollups = rollups
+        if error is not None:
+            shown = self.notice_label.cget("text")
+            self.notice_label.config(text=f"{shown}. {error}" if shown else error)
+        with perf.span("gui.build_search"):
+            self.search = ProductSearch(self.index, rollups)
+        if self.chart is None:
+            self.chart_placeholder.destroy()
+            self.chart = renderer(self.chart_frame)
+        if self.pending_chart is not None:
+            method, args = self.pending_chart
+            self.pending_chart = None
+            method(*args)
+
+    def report_first_paint(self):
+        """Show in the status bar (and record for the perf panel) how long the first sheet took to appear."""
+        finished = time.perf_counter()
+        if perf.recorder.enabled:
+            perf.recorder.record("gui.first_paint", STARTED, finished)
+        over = f", over the {STARTUP_BUDGET:g}s budget" if finished - STARTED > STARTUP_BUDGET else ""
+        self.notice_label.config(text=f"First sheet shown in {finished - STARTED:.2f}s{over}")
+
+    @perf.timed("gui.display_sheet")
     def display_sheet(self, sheet_name):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        ws = self.workbook[sheet_name]
-        columns = [cell.value for cell in ws[1]]
-        self.tree["columns"] = columns
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100)
-
-        data = []
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            self.tree.insert("", "end", values=row)
-            data.append(row)
-
-        # print(data)
-        self.update_chart(data)
-
-    def update_chart(self, data):
-        if self.chart_canvas:
-            self.chart_canvas.get_tk_widget().destroy()
-
-        fig, ax = plt.subplots(figsize=(7, 8 ))
-
-        if not data:
-            ax.text(0.5, 0.5, 'No data in the specified date range', horizontalalignment='center', verticalalignment='center')
+        # Sheets outside the reader's LRU are parsed on the I/O worker
+        if sheet_name in self.workbook:
+            self.show_sheet(self.workbook[sheet_name])
         else:
-            prices = [row[4] for row in data]  # 5th column is price
-            transaction_dates = [row[0] for row in data]
-
-            ax.plot(transaction_dates, prices, marker='o')
-            ax.set_xlabel('Transaction Date')
-            ax.set_ylabel('Price')
-            ax.set_title('Product Prices Over Time')
-            plt.xticks(rotation=45)
+            self.worker.cancel("read", group="sheet")
+            self.worker.submit("read", self.workbook.__getitem__, sheet_name, on_done=self.show_sheet, group="sheet",
+                               on_error=lambda e: messagebox.showerror("Error", f"Failed to load '{sheet_name}': {e}"))
+
+    @perf.timed("gui.show_sheet")
+    def show_sheet(self, sheet):
+        self.table.set_source(sheet)
+        if not self.painted:
+            self.painted = True
+            self.root.after_idle(self.report_first_paint)
+        self.show_price_chart(sheet.title)
+
+    def show_price_chart(self, sheet_name, start_date=None, end_date=None):
+        """Chart one product's prices, from the coarsest rollup that still fills the width for long histories."""
+        if self.chart is None:
+            self.pending_chart = (self.show_price_chart, (sheet_name, start_date, end_date))
+            return
+        width = self.chart.pixel_width()
+        granularity = None
+        if self.rollups is not None and self.index is not None and self.index.products[sheet_name]["rows"] > width:
+            granularity = self.rollups.pick(sheet_name, width, start_date, end_date)
+        if granularity is None:
+            series = self.series_cache.get(self.workbook, sheet_name)
+            transaction_dates, _, prices = series.between(start_date, end_date)
+        else:
+            transaction_dates, prices = self.rollups.series(sheet_name, granularity, start_date, end_date).envelope()
+        self.chart_view = (sheet_name, start_date, end_date, granularity)
+        self.update_chart(transaction_dates, prices)
+
+    def refresh_price_chart(self, sheet_name, changed):
+        """Redraw the price chart after rows changed from index ``changed`` on.
+
+        The full, unfiltered series of a sheet only redraws its tail; a
+        filtered range or a rollup is charted again.
+        """
+        if self.chart is not None and self.chart_view == (sheet_name, None, None, None) and 'Price' in self.chart.series \
+                and sheet_name in self.series_cache:
+            series = self.series_cache.get(self.workbook, sheet_name)
+            if len(series):
+                self.chart.update_tail('Price', series.dates, series.price, changed)
+                return
+        self.show_price_chart(sheet_name)
 
-        self.chart_canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-        self.chart_canvas.draw()
-        self.chart_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        plt.close(fig)  # Close the figure to free up memory
+    @perf.timed("gui.update_chart")
+    def update_chart(self, transaction_dates, prices):
+        if not len(prices):
+            self.chart.show_message('No data in the specified date range')
+        else:
+            self.chart.show_series({'Price': (transaction_dates, prices)},
+                                   'Product Prices Over Time', 'Transaction Date', 'Price')
 
+    @perf.timed("gui.update_chart_with_filter")
     def update_chart_with_filter(self):
+        if self.workbook is None:
+            return
+        perf.begin_action("filter")
 
         try:
             start_datetime_str = self.start_date_entry.get()
@@ -220,58 +490,111 @@ class ProductApp:
 
 
         if self.apply_all_sheets_var.get():
-            # Destroy previous chart canvas
-            if self.chart_canvas:
-                self.chart_canvas.get_tk_widget().destroy()
-
-            all_data = {}
-            for sheet_name in self.sheets:
-                ws = self.workbook[sheet_name]
-                data = [row for row in ws.iter_rows(min_row = 2 , values_only = True)]
-                changes_in_price = []
-                prev_price = None
-                for row in data:
-                    transaction_date = datetime.strptime(row[0] , "%Y-%m-%d %H:%M:%S").date()
-                    if start_date <= transaction_date <= end_date:
-                        price = row[4]  # 5th is the price
-                        if prev_price is not None:
-                            change = price - prev_price
-                            changes_in_price.append(change)
-                        prev_price = price
-                all_data[sheet_name] = changes_in_price
-
-            #chart
-            fig , ax = plt.subplots(figsize = (7 , 8))
-            for sheet_name , changes_in_price in all_data.items():
-                ax.plot(changes_in_price , label = sheet_name)
-            ax.set_xlabel('Time')
-            ax.set_ylabel('Change in Price')
-            ax.set_title('Change in Price Over Time for All Sheets')
-            # Panel guide on the right side
-            ax.legend()
-            plt.xticks(rotation = 45)
-            self.chart_canvas = FigureCanvasTkAgg(fig , master = self.chart_frame)
-            self.chart_canvas.draw()
-            self.chart_canvas.get_tk_widget().pack(fill = tk.BOTH , expand = True)
-            plt.close(fig)  # freeing up the memory problem
+            # Jobs run in order, so this sees every save queued before it; the reader overlays the journal
+            self.worker.cancel("read" , group = "aggregate")
+            self.worker.submit("read" , aggregate_file , storage_file_path , list(self.sheets) , start_date , end_date ,
+                               on_done = self.show_aggregate , group = "aggregate" ,
+                               on_error = lambda e: messagebox.showerror("Error" , f"Failed to aggregate sheets: {e}"))
         else:
-            ws = self.workbook[self.sheets[self.current_sheet_index]]
-            data = [row for row in ws.iter_rows(min_row = 2 , values_only = True)]
-            filtered_data = []
-            for row in data:
-                transaction_date = datetime.strptime(row[0] , "%Y-%m-%d %H:%M:%S").date()
-                if start_date <= transaction_date <= end_date:
-                    filtered_data.append(row)
-            self.update_chart(filtered_data)
+            self.show_price_chart(self.sheets[self.current_sheet_index] , start_date , end_date)
 
 
+    @perf.timed("gui.show_aggregate")
+    def show_aggregate(self, results):
+        """Chart per-product price changes, biggest movers first in the legend."""
+        if self.chart is None:
+            self.pending_chart = (self.show_aggregate, (results,))
+            return
+        all_data = {}
+        for sheet_name , total_change in top_movers(results , len(results)):
+            changes_in_price = results[sheet_name]["changes"]
+            all_data[f"{sheet_name} ({total_change:+d})"] = (np.arange(changes_in_price.size) , changes_in_price)
+        self.chart_view = None
+
+        # Panel guide on the right side
+        self.chart.show_series(all_data , 'Change in Price Over Time for All Sheets' , 'Time' , 'Change in Price' , legend = True)
+
+    def show_analytics_gui(self):
+        """Compute the inventory analytics of every product on the I/O worker, then chart them."""
+        if self.workbook is None:
+            return
+        perf.begin_action("analytics")
+        try:
+            start_date, end_date = (datetime.strptime(entry.get(), "%Y-%m-%d").date() if entry.get() else None
+                                    for entry in (self.start_date_entry, self.end_date_entry))
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid dates in the format YYYY-MM-DD, or leave them empty.")
+            return
+        self.worker.cancel("read", group="analytics")
+        self.worker.submit("read", analyze_file, storage_file_path, list(self.sheets), start_date, end_date,
+                           on_done=self.show_analytics, group="analytics",
+                           on_error=lambda e: messagebox.showerror("Error", f"Failed to compute the analytics: {e}"))
+
+    @perf.timed("gui.show_analytics")
+    def show_analytics(self, report):
+        """Chart the catalog's inventory value and sum up the leaders of the other metrics."""
+        if self.chart is None:
+            self.pending_chart = (self.show_analytics, (report,))
+            return
+        self.chart_view = None
+        if not report["dates"].size:
+            self.chart.show_message('No data in the specified date range')
+            self.analytics_label.config(text="")
+            return
+        self.chart.show_series({'Inventory value': (report["dates"], report["value"])},
+                               'Inventory Value Over Time', 'Date', 'Stock × Price')
+        summary = []
+        for metric, title in (("turnover", "Top turnover"), ("volatility", "Most volatile")):
+            leaders = ranked(report, metric, 1)
+            if leaders:
+                summary.append(f"{title}: {leaders[0][0]} ({leaders[0][1]:.2f})")
+        if report["drops"]:
+            units, sheet_name, when = report["drops"][0]
+            summary.append(f"Largest drop: {sheet_name} (-{units} on {when:%Y-%m-%d})")
+        self.analytics_label.config(text="   ".join(summary))
+
+    def find_product(self, event=None):
+        """Show the next product matching the search box after the shown one, wrapping around."""
+        query = self.search_entry.get().strip()
+        if not query or self.workbook is None:
+            return
+        if self.search is None:
+            self.search_label.config(text="The search is still loading...")
+            return
+        perf.begin_action("search")
+        if query == self.search_query:
+            # Same query again: move on from the shown product
+            positions = {title: position for position, title in enumerate(self.sheets)}
+            following = [title for title in self.search_results if positions[title] > self.current_sheet_index]
+            title = following[0] if following else (self.search_results or [None])[0]
+        else:
+            try:
+                self.search_results = self.search.search(query)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            self.search_query = query
+            title = self.search_results[0] if self.search_results else None
+        if title is None:
+            self.search_label.config(text="No products match.")
+            return
+        self.search_label.config(text=f"{self.search_results.index(title) + 1} of {len(self.search_results)}: {title}")
+        self.current_sheet_index = self.sheets.index(title)
+        self.display_sheet(title)
+
     def next_sheet(self):
+        if self.workbook is None:
+            return
         if self.current_sheet_index < len(self.sheets) - 2:
+            perf.begin_action("navigate")
             self.current_sheet_index += 1
             self.display_sheet(self.sheets[self.current_sheet_index])
 
     def prev_sheet(self):
+        if self.workbook is None:
+            return
         if self.current_sheet_index > 0:
+            perf.begin_action("navigate")
             self.current_sheet_index -= 1
             self.display_sheet(self.sheets[self.current_sheet_index])
 
@@ -285,12 +608,8 @@ class ProductApp:
         self.handle_product(mode="delete")
 
     def delete_last_row_gui(self):
-        success, msg = delete_last_row(excel_file_path, self.current_sheet_index)
-        if success:
-            messagebox.showinfo("Success", msg)
-        else:
-            messagebox.showerror("Error", msg)
-        self.load_data()
+        perf.begin_action("delete_last_row")
+        self.run_write(delete_last_row, storage_file_path, self.sheets[self.current_sheet_index])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+import json
+import os
+import time
+
+from utils import JOURNAL_SUFFIX
+
+SEQ_PROPERTY = "journal_seq"
+
+
+def journal_path(file_name: str) -> str:
+    """Path of the sidecar journal kept next to a workbook."""
+    return file_name + JOURNAL_SUFFIX
+
+
+def has_pending_records(file_name: str) -> bool:
+    """Whether the journal may hold changes the xlsx file doesn't have yet."""
+    path = journal_path(file_name)
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def get_journal_seq(wb) -> int:
+    """Sequence number of the last journal record folded into the workbook."""
+    if SEQ_PROPERTY in wb.custom_doc_props.names:
+        return int(wb.custom_doc_props[SEQ_PROPERTY].value)
+    return 0
+
+
+def set_journal_seq(wb, seq: int) -> None:
+    if SEQ_PROPERTY in wb.custom_doc_props.names:
+        wb.custom_doc_props[SEQ_PROPERTY].value = seq
+    else:
+        from openpyxl.packaging.custom import IntProperty
+        wb.custom_doc_props.append(IntProperty(name=SEQ_PROPERTY, value=seq))
+
+
+def fsync_dir(path: str) -> None:
+    """Make a rename inside ``path`` durable where the platform allows it."""
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return  # Directories can't be opened on Windows
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """Append-only log of workbook operations, one JSON record per line.
+
+    Every record gets an increasing ``seq``; the workbook stores the last
+    folded ``seq`` so a crash during compaction never applies a record twice.
+    """
+
+    def __init__(self, file_name: str, base_seq: int = 0):
+        self.path = journal_path(file_name)
+        self.size = 0
+        self.first_ts = None
+        self.last_seq = base_seq
+        self.tail_checked = False  # Readers open journals too, so only the first append cuts a torn tail
+        for record in self.records():
+            self.last_seq = max(self.last_seq, record["seq"])
+            if self.first_ts is None:
+                self.first_ts = record["ts"]
+        if os.path.exists(self.path):
+            self.size = os.path.getsize(self.path)
+
+    def drop_torn_tail(self) -> None:
+        """Cut a partial last line left by a crash mid-append, so the next record starts on its own line."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - 4096)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b"\n")
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position != end:
+                f.truncate(position)
+                f.flush()
+                os.fsync(f.fileno())
+        self.size = position
+
+    def records(self, after_seq: int = 0) -> list:
+        """Read acknowledged records, skipping a torn trailing write."""
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Crashed mid-append, never acknowledged
+                record = json.loads(line)
+                if record["seq"] > after_seq:
+                    records.append(record)
+        return records
+
+    def append(self, record: dict) -> int:
+        """Durably write one record and return its sequence number."""
+        if not self.tail_checked:
+            self.drop_torn_tail()
+            self.tail_checked = True
+        self.last_seq += 1
+        record = dict(record, seq=self.last_seq, ts=time.time())
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if self.first_ts is None:
+            self.first_ts = record["ts"]
+        self.size += len(line)
+        return self.last_seq
+
+    def age(self) -> float:
+        """Seconds since the oldest record still in the journal."""
+        return time.time() - self.first_ts if self.first_ts is not None else 0.0
+
+    def needs_compaction(self, max_bytes: int, max_age: float) -> bool:
+        return bool(self.size) and (self.size >= max_bytes or self.age() >= max_age)
+
+    def discard_through(self, seq: int) -> None:
+        """Drop records already folded into the workbook."""
+        remaining = self.records(after_seq=seq)
+        if not remaining:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.size = 0
+            self.first_ts = None
+            return
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for record in remaining:
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_dir(os.path.dirname(self.path))
+        self.size = os.path.getsize(self.path)
+        self.first_ts = remaining[0]["ts"]
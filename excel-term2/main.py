@@ -1,19 +1,38 @@
+import csv
+import json
 import os
-from typing import Union
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional, Union
 
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Protection, PatternFill
-from openpyxl.worksheet.datavalidation import DataValidation
 from datetime import datetime
-from utils import data_folder, excel_file_path
+from utils import data_folder, excel_file_path, HEADERS, DATE_FORMAT, FLUSH_EVERY, FLUSH_INTERVAL, \
+    BULK_WRITE_ONLY_ROWS, BULK_IMPORT_CHUNK, JOURNAL_WRITES, JOURNAL_MAX_BYTES, JOURNAL_MAX_AGE
+from journal import Journal, journal_path, get_journal_seq, set_journal_seq, fsync_dir
+from metadata import MetadataIndex, restored_title, parse_date, file_stamp, json_row
+from reader import WorkbookReader
+from rollups import Rollups
+from search import ProductSearch
+from sqlite_store import SQLiteStore
+from backends import is_sqlite, open_reader
+from client import get_client
+import perf
+import events
 
+# openpyxl is imported by the functions using it, so importing this module
+# has no side effects and stays cheap for SQLite stores and the GUI start-up
 
-def create_excel_file() -> None:
+
+def create_excel_file(file_name: str = excel_file_path) -> None:
     """Create an Excel file in given path."""
-    if not os.path.exists(data_folder):
-        os.makedirs(data_folder)
+    folder = os.path.dirname(file_name) or data_folder
+    if not os.path.exists(folder):
+        os.makedirs(folder)
 
-    if not os.path.exists(excel_file_path):
+    if not os.path.exists(file_name):
+        from openpyxl import Workbook
         wb = Workbook()
         ws = wb.active
 
@@ -21,60 +40,169 @@ def create_excel_file() -> None:
         apply_header_styles(ws)
         apply_data_validation(ws)
 
-        wb.save(excel_file_path)
-        print(f"Created new Excel file: {excel_file_path}")
+        wb.save(file_name)
+        print(f"Created new Excel file: {file_name}")
     else:
-        print(f"Excel file '{excel_file_path}' already exists.")
+        print(f"Excel file '{file_name}' already exists.")
+
+def header_fill():
+    from openpyxl.styles import PatternFill
+    return PatternFill(start_color="FFA500", end_color="FFA500", fill_type="solid")
+
+def header_row(ws, values) -> list:
+    """Build a styled header row for a write-only worksheet."""
+    from openpyxl.cell import WriteOnlyCell
+    fill = header_fill()
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.fill = fill
+        cells.append(cell)
+    return cells
 
 def apply_header_styles(ws) -> None:
     """Apply styles to the header row."""
-    header_fill = PatternFill(start_color="FFA500", end_color="FFA500", fill_type="solid")
+    fill = header_fill()
     for col in range(1, ws.max_column + 1):
         cell = ws.cell(row=1, column=col)
         #! Requires a researching
         # cell.protection = Protection(locked=True)
-        cell.fill = header_fill
+        cell.fill = fill
 
     #!f
     # ws.protection.sheet = True
 def apply_data_validation(ws) -> None:
-    """Apply data validation to the sheets """
+    """Apply data validation to the sheets (regular or write-only)."""
+    from openpyxl.worksheet.datavalidation import DataValidation
 
     #! Formula1 : less than 255 char
     dv_text = DataValidation(type="textLength", operator="lessThan", formula1="255", showErrorMessage=True)
     dv_text.error = "Please enter a valid text."
     dv_text.errorTitle = "Invalid Text"
-    ws.add_data_validation(dv_text)
+    ws.data_validations.append(dv_text)
     dv_text.add(f"B2:B1000")  # Name
     dv_text.add(f"C2:C1000")  # Description
 
     dv_int = DataValidation(type="whole", operator="greaterThan", formula1=0, showErrorMessage=True)
     dv_int.error = "Please enter a valid integer."
     dv_int.errorTitle = "Invalid Integer"
-    ws.add_data_validation(dv_int)
+    ws.data_validations.append(dv_int)
     dv_int.add(f"D2:D1000")  # Stock
     dv_int.add(f"E2:E1000")  # price
 
-    dv_date = DataValidation(type="date", formula1="1900-01-01", showErrorMessage=True)
+    # Dates are stored as datetime cells; Excel wants the bound as a formula, not a string
+    dv_date = DataValidation(type="date", operator="greaterThanOrEqual", formula1="DATE(1900,1,1)", showErrorMessage=True)
     dv_date.error = "Please enter a valid date."
     dv_date.errorTitle = "Invalid Date"
-    ws.add_data_validation(dv_date)
+    ws.data_validations.append(dv_date)
     dv_date.add(f"A2:A1000")
 
 
+def create_storage(file_name: str = excel_file_path) -> None:
+    """Create an empty store, a workbook or an SQLite database depending on the path."""
+    if is_sqlite(file_name):
+        SQLiteStore(file_name).close()
+    else:
+        create_excel_file(file_name)
+
+
+@perf.timed("prepare_workbook")
 def prepare_workbook(excel_file: str):
-    """Load the workbook or create if it doesn't exist."""
+    """Load the workbook (with any journaled changes) or create if it doesn't exist."""
+    from openpyxl import load_workbook
     if not os.path.exists(excel_file):
-        create_excel_file()
-    return load_workbook(excel_file)
+        create_excel_file(excel_file)
+    wb = load_workbook(excel_file)
+    perf.count("workbook_parse")
+
+    # Merge operations still waiting in the journal
+    if os.path.exists(journal_path(excel_file)):
+        for record in Journal(excel_file).records(after_seq=get_journal_seq(wb)):
+            apply_record(wb, record)
+            set_journal_seq(wb, record["seq"])
+    return wb
 
-def save_changes(wb, excel_file: str) -> None:
+@perf.timed("save_changes")
+def save_changes(wb, excel_file: str) -> bool:
     try:
         wb.save(excel_file)
+        if perf.recorder.enabled:
+            perf.observe("save_bytes", os.path.getsize(excel_file))
         print('Saved Successfully')
+        return True
     except Exception as e:
         print(f"Failed to save the file: {e}")
         print("There is a chance that this file is in use.")
+        return False
+
+
+@perf.timed("load_index")
+def load_index(file_name: str) -> MetadataIndex:
+    """Load the sidecar metadata index, rebuilding it if the workbook changed."""
+    if is_sqlite(file_name):
+        # The database's own indexes answer this without a sidecar
+        with SQLiteStore(file_name) as store:
+            return store.metadata_index()
+
+    index = MetadataIndex.load(file_name)
+    if index is not None:
+        return index
+
+    if os.path.exists(journal_path(file_name)) or not os.path.exists(file_name):
+        wb = prepare_workbook(file_name)
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(file_name, read_only=True)
+        perf.count("workbook_parse")
+    index = MetadataIndex.from_workbook(wb, get_journal_seq(wb))
+    wb.close()
+    index.save(file_name)
+    return index
+
+
+@perf.timed("load_rollups")
+def load_rollups(file_name: str) -> Rollups:
+    """Open the price/stock rollups, rebuilding them if the storage changed without them."""
+    if is_sqlite(file_name):
+        # The store brings its rollups up to date when it opens
+        SQLiteStore(file_name).close()
+        return Rollups(sqlite3.connect(file_name, check_same_thread=False))
+
+    rollups = Rollups.open(file_name)
+    if rollups.stamp() != file_stamp(file_name):
+        reader = WorkbookReader(file_name)
+        try:
+            rollups.clear()
+            for title in reader.sheetnames:
+                rollups.add_rows(title, reader[title].iter_rows(min_row=2, values_only=True))
+        finally:
+            reader.close()
+        rollups.save(file_name)
+    return rollups
+
+
+def product_search(file_name: str) -> ProductSearch:
+    """Build a search over every product of a store (see ``search.ProductSearch``).
+
+    To query repeatedly, keep it and pass the change events
+    (``events.subscribe``) to it and its ``index``; ``search_products``
+    builds one per call.
+    """
+    index = load_index(file_name)
+    rollups = load_rollups(file_name)
+    try:
+        search = ProductSearch(index, rollups)
+    finally:
+        rollups.close()
+    # Without the rollups a deleted row keeps the price change day it had
+    search.rollups = None
+    return search
+
+
+@perf.timed("search_products")
+def search_products(file_name: str, query: str) -> list:
+    """Titles of the products matching a query such as ``"stock<10"`` or ``"changed<7d"`` (see ``search.parse_query``)."""
+    return product_search(file_name).search(query)
 
 
 def validate_sheet_exists(file_name: str , sheet_name: str, flag: bool = False) -> Union[bool , str]:
@@ -83,125 +211,879 @@ def validate_sheet_exists(file_name: str , sheet_name: str, flag: bool = False)
         msg = f"Excel file '{file_name}' does not exist."
         print(msg)
         return False , msg
-    wb = prepare_workbook(file_name)
+    index = load_index(file_name)
     # For add operation
     if flag:
-        if sheet_name in wb.sheetnames:
+        if index.has_sheet(sheet_name):
             msg = f"Product sheet '{sheet_name}' already exist."
             print(msg)
             return False , msg
         else:
             return True, ""
-    if sheet_name not in wb.sheetnames:
+    if not index.has_sheet(sheet_name):
         msg = f"Product sheet '{sheet_name}' does not exist."
         print(msg)
         return False , msg
     return True , ""
 
 
-def add_product( file_name: str , name: str , description: str , stock: int , price: int ) -> Union[bool , str]:
-    """Add a new product with the current date."""
-    sheet_name = name.lower()
-    is_valid , msg = validate_sheet_exists(file_name , sheet_name, flag = True)
-    if not is_valid:
-        return False , msg
+def worksheet_row(row) -> list:
+    """A store row as written to a worksheet, with the transaction date as a datetime cell."""
+    row = list(row)
+    if row and isinstance(row[0], str):
+        row[0] = parse_date(row[0]) or row[0]
+    return row
 
-    wb = prepare_workbook(file_name)
-    ws = wb.create_sheet(title = sheet_name , index = 0)  # Add the sheet as the first sheet
-    ws.append(["Transaction Date" , "Name" , "Description" , "Stock" , "Price"])
 
-    # Apply header styles and data validation for the product sheet
-    apply_header_styles(ws)
-    apply_data_validation(ws)
+def title_error(title) -> Optional[str]:
+    """Why a worksheet can't be titled ``title``, None if it can."""
+    from openpyxl.workbook.child import INVALID_TITLE_REGEX
+    if not title:
+        return "The product name must not be empty."
+    match = INVALID_TITLE_REGEX.search(str(title))
+    if match:
+        return f"The product name must not contain '{match.group(0)}'."
+    return None
 
-    ws.append([datetime.now().strftime("%Y-%m-%d %H:%M:%S") , name , description , stock , price])
-    save_changes(wb , file_name)
-    msg = f"Product sheet '{sheet_name}' added successfully."
-    print(msg)
-    return True , msg
 
+def record_error(index: MetadataIndex, record: dict) -> Optional[str]:
+    """Why ``apply_record`` would reject a record on the workbook ``index`` describes, None if it wouldn't."""
+    title = record["sheet"]
+    if record["op"] == "add":
+        if index.free_title(title) != title:
+            return f"Product sheet '{title}' already exist."
+        return title_error(title)
+    if not index.has_sheet(title):
+        return f"Product sheet '{title}' does not exist."
+    if record.get("title"):
+        return title_error(record["title"])
+    return None
 
-def edit_product( file_name: str , current_sheet_index:int , name = None , description = None , stock = None , price = None ) -> Union[bool , str]:
-    """Edit an existing product by adding a new record with updated data."""
-    wb = prepare_workbook(file_name)
-    ws = wb.worksheets[current_sheet_index]
-    
-    sheet_name = ws.title
-    is_valid , msg = validate_sheet_exists(file_name , sheet_name)
-    if not is_valid:
-        return False , msg
-    
-
-    # Retrieve the last row's values in case if given parameters were null
-    last_row = ws.max_row
-    last_record = {ws.cell(row = 1 , column = col).value: ws.cell(row = last_row , column = col).value for col in range(1 , ws.max_column + 1)}
-
-    # Prepare the new record with existing values and update with provided arguments
-    new_record = {
-        "Transaction Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S") ,
-        "Name": name if name is not None else last_record["Name"] ,
-        "Description": description if description is not None else last_record["Description"] ,
-        "Stock": stock if stock is not None else last_record["Stock"] ,
-        "Price": price if price is not None else last_record["Price"]
-    }
 
-    ws.append([new_record["Transaction Date"] , new_record["Name"] , new_record["Description"] , new_record["Stock"] , new_record['Price']])
-    if name and name.lower() != last_record['Name'].lower():  # Check for case-insensitive name change
-        ws.title = name
-    save_changes(wb , file_name)
-    msg = f"Product sheet '{sheet_name}' updated successfully."
-    print(msg)
-    return True , msg
+def apply_record(wb, record: dict) -> None:
+    """Apply one store operation (as written to the journal) to a workbook."""
+    match record["op"]:
+        case "add":
+            ws = wb.create_sheet(title=record["sheet"], index=0)  # Add the sheet as the first sheet
+            ws.append(HEADERS)
 
+            # Apply header styles and data validation for the product sheet
+            apply_header_styles(ws)
+            apply_data_validation(ws)
+            ws.append(worksheet_row(record["row"]))
+        case "append":
+            ws = wb[record["sheet"]]
+            ws.append(worksheet_row(record["row"]))
+            if record.get("title"):
+                ws.title = record["title"]
+        case "delete_last_row":
+            ws = wb[record["sheet"]]
+            if record.get("title"):
+                ws.title = record["title"]
+            ws.delete_rows(ws.max_row)
+        case "delete_sheet":
+            del wb[record["sheet"]]
+        case op:
+            raise ValueError(f"Unknown journal operation '{op}'.")
 
-def delete_product_sheet( file_name: str , sheet_name: str ) -> Union[bool , str]:
-    """Delete a product sheet."""
-    is_valid , msg = validate_sheet_exists(file_name , sheet_name)
-    if not is_valid:
-        return False , msg
 
+def compact_journal(file_name: str) -> bool:
+    """Fold pending journal records into the workbook and trim the journal."""
+    if not os.path.exists(journal_path(file_name)):
+        return True
     wb = prepare_workbook(file_name)
-    del wb[sheet_name]
-    save_changes(wb , file_name)
-    msg = f"Product sheet '{sheet_name}' deleted successfully."
-    print(msg)
-    return True , msg
-
-def delete_last_row(file_name: str , sheet_index: int ) -> Union[bool, str]:
-    "Delete the last row of data from given index."
+    return write_compacted(wb, file_name, Journal(file_name, get_journal_seq(wb)))
+
+
+def write_compacted(wb, file_name: str, journal: Journal) -> bool:
+    """Save a workbook that already holds every journal record, then trim the journal."""
+    set_journal_seq(wb, journal.last_seq)
+    if not save_replacing(wb, file_name):
+        return False
+    journal.discard_through(journal.last_seq)
+    return True
+
+
+def replace_file(tmp_file: str, file_name: str) -> None:
+    """Durably move a fully written temporary file over ``file_name``."""
+    with open(tmp_file, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_file, file_name)
+    fsync_dir(os.path.dirname(file_name))
+
+
+def save_replacing(wb, file_name: str) -> bool:
+    """Save to a temporary file and swap it in, so readers holding the old file open keep a consistent copy."""
+    tmp_file = file_name + ".tmp"
+    if not save_changes(wb, tmp_file):
+        return False
     try:
-        wb = prepare_workbook(file_name)
-        sheet_names = wb.sheetnames
+        replace_file(tmp_file, file_name)
+    except OSError as e:
+        print(f"Failed to replace the file: {e}")
+        print("There is a chance that this file is in use.")
+        return False
+    return True
 
-        if sheet_index < 0:
-            return False, "Invalid Sheet Index."
-        
-        ws = wb[sheet_names[sheet_index]]
-
-        last_row = ws.max_row
-
-        # Validation for header 
-        if last_row > 1:
-            # To update the title of worksheet
-            new_title = ws.cell(row=last_row - 1, column=1).value
-            if new_title:
-                ws.title = str(new_title)
-            ws.delete_rows(last_row)
-            save_changes(wb, file_name)
-            return True, f"Last row of {sheet_names[sheet_index]} deleted successfully."
+
+class ProductStore:
+    """Keep one workbook in memory and write it back on a schedule.
+
+    Changes are saved after ``flush_every`` operations, ``flush_interval``
+    seconds after the first unsaved change, or on an explicit ``flush``/``close``.
+    Pass ``0`` to disable either trigger.
+
+    With ``journal=True`` every operation is instead appended (and fsynced)
+    to a sidecar journal before it is acknowledged, and the journal is folded
+    into the workbook once it passes ``JOURNAL_MAX_BYTES`` or
+    ``JOURNAL_MAX_AGE`` seconds, or when ``compact`` is called.
+
+    Lookups go through the metadata index; the workbook itself is only
+    parsed when an operation needs it.
+
+    Change events (see ``events``) are emitted once an operation is on disk:
+    right after its journal record, or by the flush that saves it, until
+    when they wait in ``unsaved_events``.
+    """
+
+    def __init__(self, file_name: str, flush_every: int = FLUSH_EVERY, flush_interval: float = FLUSH_INTERVAL, journal: bool = JOURNAL_WRITES):
+        self.file_name = file_name
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.index = load_index(file_name)
+        self.rollups = load_rollups(file_name)
+        self.rollups_stale = False  # an update failed, leave them unsaved so the next load rebuilds them
+        self.journal = Journal(file_name, self.index.journal_seq) if journal else None
+        self.pending = 0
+        self.unsaved_events = []
+        self._wb = None
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def wb(self):
+        """The workbook, parsed on first use."""
+        with self._lock:
+            if self._wb is None:
+                self._wb = prepare_workbook(self.file_name)
+            return self._wb
+
+    @property
+    def sheetnames(self) -> list:
+        return self.index.sheetnames
+
+    def sheet_name(self, sheet: Union[int, str]) -> Optional[str]:
+        """The title of a sheet given by title or position, None if there is no such sheet."""
+        if isinstance(sheet, str):
+            return sheet if self.index.has_sheet(sheet) else None
+        return self.index.sheet_at(sheet)
+
+    def _apply(self, record: dict, removed=None, day_rows=None) -> None:
+        """Log or schedule an operation for saving, apply it in memory and emit its change events.
+
+        With a journal the record is written before anything changes, so an
+        operation that fails to log is not applied. ``removed`` is the row a
+        ``delete_last_row`` takes away and ``day_rows`` the rows left on its day.
+
+        Raises ValueError, before logging anything, for a record that
+        replaying the journal would reject.
+        """
+        error = record_error(self.index, record)
+        if error is not None:
+            raise ValueError(error)
+        if self.journal is not None:
+            seq = self.journal.append(record)
+        # A journaled operation only touches the workbook if it is already loaded
+        if self.journal is None or self._wb is not None:
+            apply_record(self.wb, record)
+        self.index.apply(record, self._wb)
+        self._update_rollups(self.rollups.apply_record, record, removed, day_rows)
+        if self.journal is None:
+            self.unsaved_events += events.record_events(record, removed, record.get("last"))
+            self._changed()
+            return
+        # The index is saved when the journal is folded, loading replays the records after its seq
+        self.index.journal_seq = seq
+        if not self.rollups_stale:
+            self.rollups.save(self.file_name)
+        events.emit_record(record, removed, record.get("last"))
+        if self.journal.needs_compaction(JOURNAL_MAX_BYTES, JOURNAL_MAX_AGE):
+            self.compact()
+
+    def _update_rollups(self, update, *args) -> None:
+        """Run one rollups update; if it fails, the rollups are rolled back and left for the next load to rebuild."""
+        if self.rollups_stale:
+            return
+        try:
+            update(*args)
+        except sqlite3.Error as e:
+            print(f"Failed to update the rollups, they will be rebuilt: {e}")
+            self.rollups.conn.rollback()
+            self.rollups_stale = True
+
+    def _changed(self) -> None:
+        """Count an unsaved change and flush if the schedule says so."""
+        self.pending += 1
+        if self.flush_every and self.pending >= self.flush_every:
+            self.flush()
+        elif self.flush_interval and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> bool:
+        """Write pending changes to disk, then emit their change events."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.pending:
+                return True
+            if not save_replacing(self.wb, self.file_name):
+                return False
+            self.pending = 0
+            self.save_sidecars()
+            saved, self.unsaved_events = self.unsaved_events, []
+            for event in saved:
+                events.emit(event)
+            return True
+
+    def compact(self) -> bool:
+        """Fold the journal into the workbook now."""
+        with self._lock:
+            if self.journal is None:
+                return self.flush()
+            if write_compacted(self.wb, self.file_name, self.journal):
+                self.pending = 0
+                self.save_sidecars()
+                return True
+            return False
+
+    def save_sidecars(self) -> None:
+        """Stamp the index and rollups with the file state they now match."""
+        self.index.save(self.file_name)
+        if not self.rollups_stale:
+            self.rollups.save(self.file_name)
+
+    def discard(self) -> None:
+        """Drop the changes not saved yet, and their events, going back to the file on disk.
+
+        Journaled operations are on disk already and are kept.
+        """
+        with self._lock:
+            if self.journal is not None or not self.pending:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            # Closing rolls back the rollups' uncommitted changes
+            self.rollups.close()
+            self._wb = None
+            self.pending = 0
+            self.unsaved_events = []
+            self.index = load_index(self.file_name)
+            self.rollups = load_rollups(self.file_name)
+            self.rollups_stale = False
+
+    def close(self) -> bool:
+        if self.journal is not None and self.journal.needs_compaction(JOURNAL_MAX_BYTES, JOURNAL_MAX_AGE):
+            saved = self.compact()
         else:
-            return False, "Cannot delete the header."
-        
+            saved = self.flush()
+        # Unsaved rollup changes are rolled back along with the unsaved workbook
+        self.rollups.close()
+        return saved
+
+    def validate_sheet_exists(self, sheet_name: str, flag: bool = False) -> Union[bool, str]:
+        """Validate if a sheet exists in the loaded workbook."""
+        # For add operation
+        if flag:
+            if self.index.has_sheet(sheet_name):
+                msg = f"Product sheet '{sheet_name}' already exist."
+                print(msg)
+                return False, msg
+            return True, ""
+        if not self.index.has_sheet(sheet_name):
+            msg = f"Product sheet '{sheet_name}' does not exist."
+            print(msg)
+            return False, msg
+        return True, ""
+
+    def add_product(self, name: str, description: str, stock: int, price: int) -> Union[bool, str]:
+        """Add a new product with the current date."""
+        with self._lock:
+            sheet_name = name.lower()
+            is_valid, msg = self.validate_sheet_exists(sheet_name, flag=True)
+            if not is_valid:
+                return False, msg
+
+            try:
+                self._apply({
+                    "op": "add",
+                    "sheet": sheet_name,
+                    "row": [datetime.now().strftime(DATE_FORMAT), name, description, stock, price],
+                })
+            except ValueError as e:
+                print(e)
+                return False, str(e)
+            msg = f"Product sheet '{sheet_name}' added successfully."
+            print(msg)
+            return True, msg
+
+    def edit_product(self, sheet: Union[int, str], name=None, description=None, stock=None, price=None) -> Union[bool, str]:
+        """Edit an existing product, given by title or position, by adding a new record with updated data."""
+        with self._lock:
+            sheet_name = self.sheet_name(sheet)
+            if sheet_name is None:
+                return False, "Invalid Sheet Index." if isinstance(sheet, int) else f"Product sheet '{sheet}' does not exist."
+
+            # Retrieve the last row's values in case if given parameters were null
+            last_record = self.index.last_record(sheet_name)
+            if last_record is None:
+                return False, f"Product sheet '{sheet_name}' has no records."
+
+            # Prepare the new record with existing values and update with provided arguments
+            new_record = {
+                "Transaction Date": datetime.now().strftime(DATE_FORMAT),
+                "Name": name if name is not None else last_record["Name"],
+                "Description": description if description is not None else last_record["Description"],
+                "Stock": stock if stock is not None else last_record["Stock"],
+                "Price": price if price is not None else last_record["Price"]
+            }
+
+            record = {"op": "append", "sheet": sheet_name, "row": [new_record[header] for header in HEADERS]}
+            if name and name.lower() != str(last_record['Name']).lower():  # Check for case-insensitive name change
+                record["title"] = self.index.free_title(name, sheet_name)
+            try:
+                self._apply(record)
+            except ValueError as e:
+                print(e)
+                return False, str(e)
+            msg = f"Product sheet '{sheet_name}' updated successfully."
+            print(msg)
+            return True, msg
+
+    def delete_product_sheet(self, sheet_name: str) -> Union[bool, str]:
+        """Delete a product sheet."""
+        with self._lock:
+            is_valid, msg = self.validate_sheet_exists(sheet_name)
+            if not is_valid:
+                return False, msg
+
+            self._apply({"op": "delete_sheet", "sheet": sheet_name})
+            msg = f"Product sheet '{sheet_name}' deleted successfully."
+            print(msg)
+            return True, msg
+
+    def delete_last_row(self, sheet: Union[int, str]) -> Union[bool, str]:
+        "Delete the last row of data from the sheet given by title or position."
+        with self._lock:
+            sheet_name = self.sheet_name(sheet)
+            if sheet_name is None:
+                return False, "Invalid Sheet Index." if isinstance(sheet, int) else f"Product sheet '{sheet}' does not exist."
+            if not self.index.products[sheet_name]["rows"]:
+                return False, "Cannot delete the header."
+
+            ws = self.wb[sheet_name]
+            last_row = ws.max_row
+
+            # Validation for header
+            if last_row <= 1:
+                return False, "Cannot delete the header."
+
+            record = {"op": "delete_last_row", "sheet": ws.title}
+            removed = next(ws.iter_rows(min_row=last_row, max_row=last_row, values_only=True))
+            # The row left last, so the record can be replayed without the workbook
+            record["last"] = json_row(next(ws.iter_rows(min_row=last_row - 1, max_row=last_row - 1, values_only=True))) \
+                if last_row > 2 else None
+            # Rows sharing the removed row's day, for the daily rollup
+            day_rows = []
+            removed_date = parse_date(removed[0])
+            for row in range(last_row - 1, 1, -1):
+                date = parse_date(ws.cell(row=row, column=1).value)
+                if removed_date is None or date is None or date.date() != removed_date.date():
+                    break
+                day_rows.insert(0, next(ws.iter_rows(min_row=row, max_row=row, values_only=True)))
+            # Undo a rename done by the deleted record
+            if last_row > 2:
+                title = restored_title(ws.cell(row=2, column=2).value, ws.cell(row=last_row - 1, column=2).value,
+                                       ws.cell(row=last_row, column=2).value)
+                # Keep the current title when another product took the old one meanwhile
+                if title and title_error(title) is None and self.index.free_title(title, ws.title) == title:
+                    record["title"] = title
+            self._apply(record, removed, day_rows)
+            return True, f"Last row of {sheet_name} deleted successfully."
+
+    def import_rows(self, new_sheets: list, spool: "ImportSpool") -> None:
+        """Create ``new_sheets`` and append each sheet's spooled ``bulk_import`` records, as one unsaved change.
+
+        The rows go straight into the workbook, so the store must not keep a journal.
+        """
+        with self._lock:
+            if self.journal is not None:
+                raise ValueError("Imports write the workbook directly, open the store without a journal.")
+            wb = self.wb
+            for sheet_name in new_sheets:
+                ws = wb.create_sheet(title=sheet_name, index=0)
+                ws.append(HEADERS)
+                apply_header_styles(ws)
+                apply_data_validation(ws)
+            for sheet_name in spool.sheets():
+                ws = wb[sheet_name]
+                title, last_record = ws.title, None
+                if ws.max_row > 1:
+                    last_record = next(ws.iter_rows(min_row=ws.max_row, values_only=True))
+                for records in spool.chunks(sheet_name):
+                    rows, title = merge_import_rows(title, last_record, records)
+                    for row in rows:
+                        ws.append(row)
+                    last_record = rows[-1]
+                ws.title = title
+                self.index.update_sheet(ws)
+                if title != sheet_name:
+                    self._update_rollups(self.rollups.drop, sheet_name)
+                self._update_rollups(self.rollups.rebuild, title, ws.iter_rows(min_row=2, values_only=True))
+            self._changed()
+
+
+def open_store(file_name: str, **kwargs):
+    """Open the store for a path: SQLite for database suffixes, the workbook otherwise."""
+    if is_sqlite(file_name):
+        return SQLiteStore(file_name, **kwargs)
+    return ProductStore(file_name, **kwargs)
+
+
+def run_store_op(file_name: str, op: str, *args) -> Union[bool, str]:
+    """Run one store method in a short session, reporting a failed final save as a failure."""
+    store = open_store(file_name, flush_interval=0)
+    try:
+        result = getattr(store, op)(*args)
+    finally:
+        saved = store.close()
+    if result[0] and not saved:
+        return False, f"Failed to save '{file_name}', it may be in use."
+    return result
+
+
+@perf.timed("add_product")
+def add_product( file_name: str , name: str , description: str , stock: int , price: int ) -> Union[bool , str]:
+    """Add a new product with the current date."""
+    client = get_client(file_name)
+    if client is not None:
+        return client.request("add_product" , name , description , stock , price)
+    return run_store_op(file_name , "add_product" , name , description , stock , price)
+
+
+def daemon_sheet(file_name: str , sheet: Union[int , str]) -> Optional[str]:
+    """The title to send the daemon for a sheet given by title or position.
+
+    Positions shift as other clients add and delete sheets, so only titles
+    go over the socket; the daemon checks the title under its own lock.
+    """
+    if isinstance(sheet , str):
+        return sheet
+    return load_index(file_name).sheet_at(sheet)
+
+
+@perf.timed("edit_product")
+def edit_product( file_name: str , sheet: Union[int , str] , name = None , description = None , stock = None , price = None ) -> Union[bool , str]:
+    """Edit an existing product, given by title or position, by adding a new record with updated data."""
+    client = get_client(file_name)
+    if client is not None:
+        title = daemon_sheet(file_name , sheet)
+        if title is None:
+            return False, "Invalid Sheet Index."
+        return client.request("edit_product" , title , name , description , stock , price)
+    return run_store_op(file_name , "edit_product" , sheet , name , description , stock , price)
+
+
+@perf.timed("delete_product_sheet")
+def delete_product_sheet( file_name: str , sheet_name: str ) -> Union[bool , str]:
+    """Delete a product sheet."""
+    client = get_client(file_name)
+    if client is not None:
+        return client.request("delete_product_sheet" , sheet_name)
+    return run_store_op(file_name , "delete_product_sheet" , sheet_name)
+
+@perf.timed("delete_last_row")
+def delete_last_row(file_name: str , sheet: Union[int , str] ) -> Union[bool, str]:
+    "Delete the last row of data from the sheet given by title or position."
+    client = get_client(file_name)
+    if client is not None:
+        title = daemon_sheet(file_name , sheet)
+        if title is None:
+            return False, "Invalid Sheet Index."
+        return client.request("delete_last_row" , title)
+    try:
+        return run_store_op(file_name , "delete_last_row" , sheet)
     except Exception as e:
         return False, f"Failed to delete last row: {e}"
 
-# Example usage
-create_excel_file()
-#! 1
-add_product(excel_file_path,  "ProductA Name", "Initial stock", 100, 2000)
-add_product(excel_file_path,"ProductMilad Name", "Initial stock", 100, 200)
-#? 2
-# edit_product(excel_file_path,1, "test12", description="Stock reduced", stock=80, price = 1551)
-# edit_product(excel_file_path,1, name="Updated ProductA Name", stock=60)
-# edit_product(excel_file_path,1, "ProductA", description="Final update")
-# delete_product_sheet(excel_file_path, "test12")
+def read_import_rows(source: Union[str, Iterable[dict]]):
+    """Yield ``(line_no, record, error)`` from an iterable, a CSV file or a JSONL file."""
+    if not isinstance(source, str):
+        for line_no, record in enumerate(source, start=1):
+            yield line_no, record, None
+    elif source.endswith(".csv"):
+        with open(source, newline="", encoding="utf-8") as f:
+            # Line 1 is the CSV header
+            for line_no, record in enumerate(csv.DictReader(f), start=2):
+                yield line_no, record, None
+    elif source.endswith(".jsonl"):
+        with open(source, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line), None
+                except ValueError as e:
+                    yield line_no, None, f"Invalid JSON: {e}"
+    else:
+        raise ValueError(f"Unsupported import file '{source}', expected .csv or .jsonl")
+
+
+def _import_value(record: dict, key: str):
+    """Return a record field with blanks (empty CSV cells) as None."""
+    value = record.get(key)
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value == "" else value
+
+
+def normalize_import_record(record: dict) -> dict:
+    """Validate one import record, raising ValueError with the reject reason."""
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a mapping.")
+
+    op = _import_value(record, "op")
+    if op is not None and str(op).lower() not in ("add", "edit"):
+        raise ValueError(f"Unknown op '{op}', expected 'add' or 'edit'.")
+
+    row = {"op": str(op).lower() if op else None}
+    for key in ("name", "description"):
+        value = _import_value(record, key)
+        if value is not None and len(str(value)) >= 255:
+            raise ValueError(f"{key} must be shorter than 255 characters.")
+        row[key] = None if value is None else str(value)
+    for key in ("stock", "price"):
+        value = _import_value(record, key)
+        try:
+            row[key] = None if value is None else int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} must be an integer, got '{value}'.")
+
+    date = _import_value(record, "date")
+    if date is None:
+        date = datetime.now()
+    elif not isinstance(date, datetime):
+        try:
+            date = datetime.strptime(str(date), DATE_FORMAT)
+        except ValueError:
+            raise ValueError(f"date must match {DATE_FORMAT}, got '{date}'.")
+    row["date"] = date.replace(microsecond=0)
+
+    product = _import_value(record, "product")
+    row["product"] = str(product) if product is not None else None
+    if row["product"] is None and row["name"] is None:
+        raise ValueError("Either product or name is required.")
+    return row
+
+
+def merge_import_rows(title: str, last_record, pending: list):
+    """Fill pending records from the previous row and track renames like ``edit_product``."""
+    rows = []
+    for record in pending:
+        if last_record is None:
+            values = {"Name": None, "Description": None, "Stock": None, "Price": None}
+        else:
+            values = dict(zip(HEADERS, last_record))
+        new_row = [
+            record["date"],
+            record["name"] if record["name"] is not None else values["Name"],
+            record["description"] if record["description"] is not None else values["Description"],
+            record["stock"] if record["stock"] is not None else values["Stock"],
+            record["price"] if record["price"] is not None else values["Price"],
+        ]
+        if last_record is not None and record["name"] and record["name"].lower() != str(values["Name"]).lower():
+            title = record["name"]
+        rows.append(new_row)
+        last_record = new_row
+    return rows, title
+
+
+class ImportSpool:
+    """Validated ``bulk_import`` records, kept in a temporary SQLite file grouped by sheet.
+
+    Records are buffered ``chunk`` at a time and read back in chunks of the
+    same size, so an import of any length holds one chunk in memory.
+    """
+
+    def __init__(self, chunk: int = BULK_IMPORT_CHUNK):
+        self.chunk = chunk
+        fd, self.path = tempfile.mkstemp(suffix=".db", prefix="import-")
+        os.close(fd)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("CREATE TABLE records (sheet TEXT, seq INTEGER, date TEXT, name TEXT, description TEXT, "
+                          "stock INTEGER, price INTEGER, PRIMARY KEY (sheet, seq)) WITHOUT ROWID")
+        self.counts = {}  # sheet title -> records spooled, in first-seen order
+        self._buffer = []
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def __contains__(self, sheet_name: str) -> bool:
+        return sheet_name in self.counts
+
+    def add(self, sheet_name: str, record: dict) -> None:
+        seq = self.counts.get(sheet_name, 0)
+        self.counts[sheet_name] = seq + 1
+        self._buffer.append((sheet_name, seq, record["date"].strftime(DATE_FORMAT), record["name"],
+                             record["description"], record["stock"], record["price"]))
+        if len(self._buffer) >= self.chunk:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self.conn:
+            self.conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", self._buffer)
+        self._buffer = []
+
+    def sheets(self) -> list:
+        return list(self.counts)
+
+    def chunks(self, sheet_name: str):
+        """Yield a sheet's records in import order, ``chunk`` at a time."""
+        self._flush()
+        cursor = self.conn.execute("SELECT date, name, description, stock, price FROM records WHERE sheet = ? "
+                                   "ORDER BY seq", (sheet_name,))
+        while True:
+            rows = cursor.fetchmany(self.chunk)
+            if not rows:
+                return
+            yield [{"date": datetime.strptime(date, DATE_FORMAT), "name": name, "description": description,
+                    "stock": stock, "price": price} for date, name, description, stock, price in rows]
+
+    def close(self) -> None:
+        self.conn.close()
+        os.remove(self.path)
+
+
+@perf.timed("bulk_import")
+def bulk_import(file_name: str, source: Union[str, Iterable[dict]], write_only_threshold: int = BULK_WRITE_ONLY_ROWS) -> dict:
+    """Apply product creations and transaction rows in one pass with a single save.
+
+    Each record has ``op`` ("add", "edit" or blank to pick by existence),
+    ``product`` (target sheet for edits, defaults to the lowercased name),
+    ``name``, ``description``, ``stock``, ``price`` and an optional ``date``.
+    Blank fields of an edit are filled from the previous row. Bad rows are
+    reported in ``rejected`` and do not abort the batch. Valid rows are
+    spooled to a temporary file (``ImportSpool``) rather than held in memory.
+    Imports of at least ``write_only_threshold`` rows are streamed into a
+    write-only workbook; SQLite stores take the whole import in one transaction.
+    """
+    started = time.perf_counter()
+    if get_client(file_name) is not None:
+        return {"applied": 0, "rejected": [(None, f"A server owns '{file_name}', stop it before importing.")],
+                "seconds": 0.0, "rows_per_sec": 0.0}
+    if not os.path.exists(file_name):
+        create_storage(file_name)
+    # The import writes the workbook directly, so start from a folded journal
+    if not is_sqlite(file_name) and not compact_journal(file_name):
+        return {"applied": 0, "rejected": [(None, "Failed to compact the journal.")], "seconds": 0.0, "rows_per_sec": 0.0}
+
+    existing = set(load_index(file_name).sheetnames)
+
+    new_sheets = []     # in creation order
+    spool = ImportSpool()
+    rejected = []
+    applied = 0
+
+    try:
+        for line_no, record, error in read_import_rows(source):
+            try:
+                if error:
+                    raise ValueError(error)
+                row = normalize_import_record(record)
+                sheet_name = row["product"] or row["name"].lower()
+                if sheet_name not in existing and sheet_name not in spool:
+                    sheet_name = sheet_name.lower()
+                known = sheet_name in existing or sheet_name in spool
+                op = row["op"] or ("edit" if known else "add")
+                if op == "add":
+                    if known:
+                        raise ValueError(f"Product sheet '{sheet_name}' already exist.")
+                    if None in (row["name"], row["description"], row["stock"], row["price"]):
+                        raise ValueError("name, description, stock and price are required for adding a product.")
+                    error = title_error(sheet_name)
+                    if error:
+                        raise ValueError(error)
+                    new_sheets.append(sheet_name)
+                elif not known:
+                    raise ValueError(f"Product sheet '{sheet_name}' does not exist.")
+                elif row["name"] and title_error(row["name"]):
+                    # The name may rename the sheet
+                    raise ValueError(title_error(row["name"]))
+                spool.add(sheet_name, row)
+                applied += 1
+            except ValueError as e:
+                rejected.append((line_no, str(e)))
+
+        if applied:
+            if is_sqlite(file_name):
+                saved = _bulk_write_sqlite(file_name, new_sheets, spool)
+            elif applied >= write_only_threshold:
+                saved = _bulk_write_streaming(file_name, new_sheets, spool)
+            else:
+                saved = _bulk_write_in_memory(file_name, new_sheets, spool)
+            if not saved:
+                rejected.append((None, "Failed to save the file."))
+                applied = 0
+    finally:
+        spool.close()
+
+    if applied:
+        events.emit({"type": "reset"})
+    seconds = time.perf_counter() - started
+    report = {
+        "applied": applied,
+        "rejected": rejected,
+        "seconds": seconds,
+        "rows_per_sec": applied / seconds if seconds else 0.0,
+    }
+    print(f"Imported {applied} rows ({report['rows_per_sec']:.0f} rows/s), rejected {len(rejected)}.")
+    return report
+
+
+def _bulk_write_in_memory(file_name: str, new_sheets: list, spool: ImportSpool) -> bool:
+    """Apply an import through a regular workbook, for imports small enough to hold."""
+    with ProductStore(file_name, flush_every=0, flush_interval=0, journal=False) as store:
+        store.import_rows(new_sheets, spool)
+        return store.flush()
+
+
+def _bulk_write_sqlite(file_name: str, new_sheets: list, spool: ImportSpool) -> bool:
+    """Apply an import to an SQLite store in a single transaction."""
+    try:
+        with SQLiteStore(file_name) as store, store.conn:
+            for sheet_name in new_sheets:
+                store.create_product(sheet_name)
+            for sheet_name in spool.sheets():
+                title, last_record = sheet_name, store.last_row(sheet_name)
+                for records in spool.chunks(sheet_name):
+                    rows, new_title = merge_import_rows(title, last_record, records)
+                    title = store.append_rows(title, rows, new_title)
+                    last_record = rows[-1]
+        return True
+    except sqlite3.Error as e:
+        print(f"Failed to write the database: {e}")
+        return False
+
+
+def write_only_sheet(wb, title: str, last_row: int):
+    """Create a sheet in a write-only workbook that declares its dimension up front."""
+    from openpyxl.utils import get_column_letter
+    ws = wb.create_sheet(title)
+    # Write-only sheets carry no <dimension> unless told, and read-only
+    # loads of such a file have to scan every sheet to size it
+    ws.calculate_dimension = lambda: f"A1:{get_column_letter(len(HEADERS))}{last_row}"
+    return ws
+
+
+def _bulk_write_streaming(file_name: str, new_sheets: list, spool: ImportSpool) -> bool:
+    """Rewrite the workbook row by row from a read-only source into a write-only target."""
+    from openpyxl import Workbook, load_workbook
+    index = load_index(file_name)
+    src = load_workbook(file_name, read_only=True)
+    out = Workbook(write_only=True)
+    set_journal_seq(out, get_journal_seq(src))
+
+    def write_sheet(title, rows, last_record):
+        existing_rows = index.products[title]["rows"] if rows is not None else 0
+        ws = write_only_sheet(out, title, 1 + existing_rows + spool.counts.get(title, 0))
+        ws.append(header_row(ws, HEADERS if rows is None else next(rows, HEADERS)))
+        if rows is not None:
+            for row in rows:
+                ws.append(row)
+                last_record = row
+        new_title = title
+        for records in spool.chunks(title):
+            new_rows, new_title = merge_import_rows(new_title, last_record, records)
+            for row in new_rows:
+                ws.append(row)
+            last_record = new_rows[-1]
+        ws.title = new_title
+        apply_data_validation(ws)
+
+    # add_product inserts every new sheet in front of the existing ones
+    for sheet_name in reversed(new_sheets):
+        write_sheet(sheet_name, None, None)
+    for sheet_name in src.sheetnames:
+        write_sheet(sheet_name, src[sheet_name].iter_rows(values_only=True), None)
+    src.close()
+
+    return save_replacing(out, file_name)
+
+
+def export_xlsx(file_name: str, xlsx_file: str) -> bool:
+    """Write a store of either backend out in the workbook layout.
+
+    Every product becomes a sheet, in store order, with the header fill and
+    data validation of ``add_product``. Rows are streamed, so the export
+    never holds more than one product in memory.
+    """
+    from openpyxl import Workbook
+    reader = open_reader(file_name)
+    out = Workbook(write_only=True)
+    try:
+        for title in reader.sheetnames:
+            sheet = reader[title]
+            ws = write_only_sheet(out, title, sheet.max_row)
+            ws.append(header_row(ws, sheet.columns))
+            for row in sheet.iter_rows(min_row=2, values_only=True):
+                ws.append(worksheet_row(row))
+            apply_data_validation(ws)
+    finally:
+        reader.close()
+
+    if not save_replacing(out, xlsx_file):
+        return False
+    print(f"Exported {len(reader.sheetnames)} sheets to {xlsx_file}")
+    return True
+
+
+def import_xlsx(xlsx_file: str, file_name: str) -> bool:
+    """Replace the contents of an SQLite store with the products of a workbook."""
+    reader = WorkbookReader(xlsx_file)
+    try:
+        with SQLiteStore(file_name) as store, store.conn:
+            store.clear()
+            for title in reader.sheetnames:
+                sheet = reader[title]
+                store.create_product(title, header=sheet.columns[0] is not None, first=False)
+                store.append_rows(title, sheet.iter_rows(min_row=2, values_only=True))
+    except sqlite3.Error as e:
+        print(f"Failed to import '{xlsx_file}': {e}")
+        return False
+    finally:
+        reader.close()
+    events.emit({"type": "reset"})
+    print(f"Imported {len(reader.sheetnames)} sheets into {file_name}")
+    return True
+
+
+if __name__ == "__main__":
+    # Example usage
+    create_excel_file()
+    #! 1
+    add_product(excel_file_path,  "ProductA Name", "Initial stock", 100, 2000)
+    add_product(excel_file_path,"ProductMilad Name", "Initial stock", 100, 200)
+    #? 2
+    # edit_product(excel_file_path,1, "test12", description="Stock reduced", stock=80, price = 1551)
+    # edit_product(excel_file_path,1, name="Updated ProductA Name", stock=60)
+    # edit_product(excel_file_path,1, "ProductA", description="Final update")
+    # delete_product_sheet(excel_file_path, "test12")
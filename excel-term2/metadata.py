@@ -0,0 +1,241 @@
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from journal import Journal, has_pending_records
+from utils import HEADERS, DATE_FORMAT, INDEX_SUFFIX, JOURNAL_SUFFIX
+
+
+def index_path(file_name: str) -> str:
+    """Path of the sidecar metadata index kept next to a workbook."""
+    return file_name + INDEX_SUFFIX
+
+
+def file_stamp(file_name: str) -> list:
+    """mtime/size of the workbook and its journal, used to detect a stale index."""
+    stamp = []
+    for path in (file_name, file_name + JOURNAL_SUFFIX):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stamp += [stat.st_mtime_ns, stat.st_size]
+        else:
+            stamp += [None, None]
+    return stamp
+
+
+def workbook_stamp(file_name: str) -> list:
+    """mtime/size of the workbook alone; the journal is replayed on top of what it stamps."""
+    return file_stamp(file_name)[:2]
+
+
+def date_key(value) -> Optional[str]:
+    """Transaction date as a sortable string."""
+    if isinstance(value, datetime):
+        return value.strftime(DATE_FORMAT)
+    return None if value is None else str(value)
+
+
+def parse_date(value) -> Optional[datetime]:
+    """Transaction date as a datetime, whether stored natively or as a string."""
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.strptime(str(value), DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def restored_title(first_name, prev_name, last_name) -> Optional[str]:
+    """Title to go back to when the row that renamed a product is deleted, else None."""
+    if not prev_name or str(prev_name).lower() == str(last_name).lower():
+        return None
+    # add_product titles the sheet with the lowercased name
+    if str(prev_name).lower() == str(first_name).lower():
+        return str(prev_name).lower()
+    return str(prev_name)
+
+
+def json_row(row) -> list:
+    """A row with its date as a string, as kept in JSON sidecars and change events."""
+    return [date_key(row[0])] + list(row[1:]) if row else row
+
+
+class MetadataIndex:
+    """Sheet order plus each product's last record, row count and date range.
+
+    Answers existence checks and "current values" lookups without opening
+    the workbook. ``products`` has an entry for every sheet, including the
+    default one with no data rows.
+    """
+
+    def __init__(self, sheetnames: list = None, products: dict = None, journal_seq: int = 0):
+        self.sheetnames = sheetnames or []
+        self.products = products or {}
+        self.journal_seq = journal_seq
+
+    @staticmethod
+    def sheet_entry(rows) -> dict:
+        """Summarize the data rows (header excluded) of one sheet."""
+        entry = {"last": None, "rows": 0, "min_date": None, "max_date": None}
+        for row in rows:
+            entry["last"] = row
+            entry["rows"] += 1
+            date = date_key(row[0]) if row else None
+            if date is not None:
+                if entry["min_date"] is None or date < entry["min_date"]:
+                    entry["min_date"] = date
+                if entry["max_date"] is None or date > entry["max_date"]:
+                    entry["max_date"] = date
+        entry["last"] = json_row(entry["last"])
+        return entry
+
+    @classmethod
+    def from_workbook(cls, wb, journal_seq: int = 0) -> "MetadataIndex":
+        """Build the index with one pass over a (possibly read-only) workbook."""
+        index = cls(list(wb.sheetnames), {}, journal_seq)
+        for title in index.sheetnames:
+            index.products[title] = cls.sheet_entry(wb[title].iter_rows(min_row=2, values_only=True))
+        return index
+
+    @classmethod
+    def load(cls, file_name: str) -> Optional["MetadataIndex"]:
+        """Read the sidecar index, or None when it is missing or stale.
+
+        The index is saved when the workbook is, so journal records written
+        since are replayed on top of it.
+        """
+        try:
+            with open(index_path(file_name), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("stamp") != workbook_stamp(file_name):
+            return None
+        index = cls(data["sheetnames"], data["products"], data.get("journal_seq", 0))
+        if has_pending_records(file_name):
+            for record in Journal(file_name).records(after_seq=index.journal_seq):
+                if record["op"] == "delete_last_row" and "last" not in record:
+                    return None  # Logged without the new last row, rebuild from the workbook
+                index.apply(record)
+                index.journal_seq = record["seq"]
+        return index
+
+    def save(self, file_name: str) -> None:
+        """Write the index stamped with the current workbook state.
+
+        ``journal_seq`` tells ``load`` which journal records it already holds.
+        """
+        data = {
+            "stamp": workbook_stamp(file_name),
+            "journal_seq": self.journal_seq,
+            "sheetnames": self.sheetnames,
+            "products": self.products,
+        }
+        tmp_path = index_path(file_name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, index_path(file_name))
+
+    def has_sheet(self, title: str) -> bool:
+        return title in self.products
+
+    def sheet_at(self, sheet_index: int) -> Optional[str]:
+        if 0 <= sheet_index < len(self.sheetnames):
+            return self.sheetnames[sheet_index]
+        return None
+
+    def last_record(self, title: str) -> Optional[dict]:
+        """Latest row of a product as a header -> value mapping."""
+        entry = self.products.get(title)
+        if entry is None or entry["last"] is None:
+            return None
+        return dict(zip(HEADERS, entry["last"]))
+
+    def free_title(self, title: str, current: str = None) -> str:
+        """The title a worksheet gets when created as, or renamed from ``current`` to, ``title``.
+
+        openpyxl numbers a title another sheet already uses, ignoring case
+        and counting ``current`` as taken, so the record carries the final
+        title and the index, rollups and events agree with the workbook.
+        """
+        from openpyxl.workbook.child import avoid_duplicate_name
+        if title == current:
+            return title
+        candidate = avoid_duplicate_name(self.sheetnames, title)
+        while candidate != title:
+            title, candidate = candidate, avoid_duplicate_name(self.sheetnames, candidate)
+        return title
+
+    def _rename(self, title: str, new_title: str) -> None:
+        self.products[new_title] = self.products.pop(title)
+        self.sheetnames[self.sheetnames.index(title)] = new_title
+
+    def apply(self, record: dict, wb=None) -> None:
+        """Update the index for one store operation (see ``main.apply_record``).
+
+        ``delete_last_row`` takes the new last row from the record, or failing
+        that from the already updated workbook; the other operations are
+        applied from the record alone.
+        """
+        title = record["sheet"]
+        match record["op"]:
+            case "add":
+                self.sheetnames.insert(0, title)
+                self.products[title] = self.sheet_entry([record["row"]])
+            case "append":
+                entry = self.products[title]
+                row = json_row(record["row"])
+                entry["last"] = row
+                entry["rows"] += 1
+                if row[0] is not None:
+                    if entry["min_date"] is None or row[0] < entry["min_date"]:
+                        entry["min_date"] = row[0]
+                    if entry["max_date"] is None or row[0] > entry["max_date"]:
+                        entry["max_date"] = row[0]
+                if record.get("title"):
+                    self._rename(title, record["title"])
+            case "delete_last_row":
+                new_title = record.get("title") or title
+                if new_title != title:
+                    self._rename(title, new_title)
+                if "last" in record:
+                    self._remove_last(new_title, record["last"])
+                else:
+                    self.update_sheet(wb[new_title])
+            case "delete_sheet":
+                del self.products[title]
+                self.sheetnames.remove(title)
+
+    def apply_event(self, event: dict) -> None:
+        """Update the index for one change event (see ``events``), without a workbook."""
+        title = event.get("sheet")
+        match event["type"]:
+            case "sheet_added":
+                self.apply({"op": "add", "sheet": title, "row": event["row"]})
+            case "row_appended":
+                self.apply({"op": "append", "sheet": title, "row": event["row"]})
+            case "sheet_renamed":
+                self._rename(title, event["title"])
+            case "row_removed":
+                self._remove_last(title, event["last"])
+            case "sheet_deleted":
+                self.apply({"op": "delete_sheet", "sheet": title})
+
+    def _remove_last(self, title: str, last) -> None:
+        """Drop a product's last row; ``last`` is the row now last (a ``json_row``)."""
+        entry = self.products[title]
+        entry["rows"] -= 1
+        entry["last"] = last
+        # Rows are kept in date order, so the new last row holds the latest date
+        entry["max_date"] = last[0] if last else None
+        if not entry["rows"]:
+            entry["min_date"] = None
+
+    def update_sheet(self, ws) -> None:
+        """Recompute one sheet's entry from the worksheet."""
+        if ws.title not in self.products:
+            # New or renamed sheet: resync the order and drop titles that are gone
+            self.sheetnames = list(ws.parent.sheetnames)
+            self.products = {title: entry for title, entry in self.products.items() if title in self.sheetnames}
+        self.products[ws.title] = self.sheet_entry(ws.iter_rows(min_row=2, values_only=True))
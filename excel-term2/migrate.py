@@ -0,0 +1,72 @@
+"""Convert string transaction dates of a workbook to native datetime cells.
+
+Usage::
+
+    python migrate.py [workbook.xlsx]
+
+Workbooks written before dates were stored natively hold "Transaction Date"
+as ``DATE_FORMAT`` strings. The migration streams every sheet from a
+read-only source into a write-only copy, converting those cells, and swaps
+the copy in atomically. Rows already holding datetimes are left alone, so
+running it twice is harmless.
+"""
+import sys
+import time
+
+from openpyxl import Workbook, load_workbook
+
+from backends import is_sqlite
+from journal import get_journal_seq, set_journal_seq
+from main import header_row, apply_data_validation, write_only_sheet, save_replacing
+from metadata import MetadataIndex, parse_date, file_stamp
+from rollups import Rollups
+from utils import excel_file_path
+
+
+def migrate_dates(file_name: str = excel_file_path) -> dict:
+    """Rewrite a workbook with datetime date cells; returns how many cells were converted."""
+    started = time.perf_counter()
+    if is_sqlite(file_name):
+        print(f"{file_name} is a database, its dates need no migration.")
+        return {"converted": 0, "seconds": 0.0}
+    # The data doesn't change, so a fresh index and rollups stay valid for the new file
+    index = MetadataIndex.load(file_name)
+    rollups = Rollups.open(file_name)
+    rollups_fresh = rollups.stamp() == file_stamp(file_name)
+
+    src = load_workbook(file_name, read_only=True)
+    out = Workbook(write_only=True)
+    set_journal_seq(out, get_journal_seq(src))
+    converted = 0
+    for title in src.sheetnames:
+        src_ws = src[title]
+        # Sheets written without a <dimension> can't declare one either
+        ws = write_only_sheet(out, title, src_ws.max_row) if src_ws.max_row else out.create_sheet(title)
+        rows = src_ws.iter_rows(values_only=True)
+        ws.append(header_row(ws, next(rows, [None])))
+        for row in rows:
+            if row and isinstance(row[0], str):
+                date = parse_date(row[0])
+                if date is not None:
+                    row = (date,) + tuple(row[1:])
+                    converted += 1
+            ws.append(row)
+        apply_data_validation(ws)
+    src.close()
+
+    if not save_replacing(out, file_name):
+        rollups.close()
+        return {"converted": 0, "seconds": time.perf_counter() - started}
+    if index is not None:
+        index.save(file_name)
+    if rollups_fresh:
+        rollups.save(file_name)
+    rollups.close()
+
+    report = {"converted": converted, "seconds": time.perf_counter() - started}
+    print(f"Converted {converted} dates in {file_name} ({report['seconds']:.1f}s).")
+    return report
+
+
+if __name__ == "__main__":
+    migrate_dates(sys.argv[1] if len(sys.argv) > 1 else excel_file_path)
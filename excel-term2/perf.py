@@ -0,0 +1,198 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from utils import PERF_ENABLED, PERF_MAX_SAMPLES, PERF_TRACE_EVENTS
+
+
+class _NoSpan:
+    """Shared do-nothing context manager returned while recording is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    def __init__(self, recorder: "PerfRecorder", name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.record(self.name, self.started, time.perf_counter())
+        return False
+
+
+def percentile(samples, fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty sample."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _summary(samples, count: int, total: float) -> dict:
+    return {
+        "count": count,
+        "total": total,
+        "mean": total / count if count else 0.0,
+        "p50": percentile(samples, 0.5) if samples else 0.0,
+        "p95": percentile(samples, 0.95) if samples else 0.0,
+        "max": max(samples) if samples else 0.0,
+    }
+
+
+class PerfRecorder:
+    """Timing spans, counters and sampled values for the hot paths.
+
+    While ``enabled`` is False every hook returns after one attribute check,
+    so the instrumentation can stay in place. Durations and values keep the
+    last ``max_samples`` samples per name for the percentiles; counts and
+    totals are exact. Counters are also attributed to the current user
+    action (see ``begin_action``) to tell e.g. how often one click parsed
+    the workbook.
+    """
+
+    def __init__(self, enabled: bool = PERF_ENABLED, max_samples: int = PERF_MAX_SAMPLES, trace_events: int = PERF_TRACE_EVENTS):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.trace_events = trace_events
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.origin = time.perf_counter()
+            self.spans = defaultdict(lambda: [0, 0.0, deque(maxlen=self.max_samples)])   # name -> [count, total, samples]
+            self.values = defaultdict(lambda: [0, 0.0, deque(maxlen=self.max_samples)])  # name -> [count, total, samples]
+            self.counters = defaultdict(int)
+            self.actions = defaultdict(int)                           # action -> times started
+            self.action_counters = defaultdict(lambda: defaultdict(int))  # action -> counter -> count
+            self.action = None
+            self.events = deque(maxlen=self.trace_events)              # (name, start, duration, thread id)
+
+    def span(self, name: str):
+        """Context manager timing a block under ``name``."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name)
+
+    def timed(self, name: str):
+        """Decorator timing every call of a function under ``name``."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, started, time.perf_counter())
+            return wrapper
+        return decorator
+
+    def record(self, name: str, started: float, finished: float) -> None:
+        duration = finished - started
+        with self._lock:
+            entry = self.spans[name]
+            entry[0] += 1
+            entry[1] += duration
+            entry[2].append(duration)
+            self.events.append((name, started, duration, threading.get_ident()))
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += amount
+            if self.action is not None:
+                self.action_counters[self.action][name] += amount
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample of a quantity, e.g. the bytes written by a save."""
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self.values[name]
+            entry[0] += 1
+            entry[1] += value
+            entry[2].append(value)
+
+    def begin_action(self, name: str) -> None:
+        """Attribute the counters from now on to a new user action called ``name``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.action = name
+            self.actions[name] += 1
+
+    def snapshot(self) -> dict:
+        """Current statistics as plain data (seconds for spans)."""
+        with self._lock:
+            return {
+                "spans": {name: _summary(samples, count, total) for name, (count, total, samples) in self.spans.items()},
+                "values": {name: _summary(samples, count, total) for name, (count, total, samples) in self.values.items()},
+                "counters": dict(self.counters),
+                "actions": {
+                    action: {
+                        "count": times,
+                        "per_action": {name: value / times for name, value in self.action_counters[action].items()},
+                    }
+                    for action, times in self.actions.items()
+                },
+            }
+
+    def export_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def export_trace(self, path: str) -> None:
+        """Write the recent spans in the Chrome trace event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = [{
+            "name": name,
+            "ph": "X",
+            "ts": (started - self.origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": pid,
+            "tid": tid,
+        } for name, started, duration, tid in events]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+    def format_table(self) -> str:
+        """Plain-text summary for the GUI panel."""
+        data = self.snapshot()
+        lines = [f"{'span':28s} {'calls':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'total s':>8s}"]
+        for name, s in sorted(data["spans"].items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"{name:28s} {s['count']:6d} {s['p50'] * 1000:9.1f} {s['p95'] * 1000:9.1f} {s['total']:8.2f}")
+        for name, s in sorted(data["values"].items()):
+            lines.append(f"{name:28s} {s['count']:6d} p50 {s['p50']:.0f} p95 {s['p95']:.0f} mean {s['mean']:.0f}")
+        if data["counters"]:
+            lines.append("")
+            lines.append("  ".join(f"{name}={value}" for name, value in sorted(data["counters"].items())))
+        for action, a in sorted(data["actions"].items()):
+            per_action = ", ".join(f"{name} {value:.1f}" for name, value in sorted(a["per_action"].items()))
+            lines.append(f"{action} x{a['count']}: {per_action or '-'}")
+        return "\n".join(lines)
+
+
+recorder = PerfRecorder()
+span = recorder.span
+timed = recorder.timed
+count = recorder.count
+observe = recorder.observe
+begin_action = recorder.begin_action
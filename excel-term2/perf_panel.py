@@ -0,0 +1,77 @@
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from perf import PerfRecorder
+from utils import PERF_PANEL_REFRESH_MS
+
+
+class PerfPanel:
+    """Toggleable panel showing a ``PerfRecorder``'s spans, counters and per-action counts.
+
+    The text is refreshed every ``refresh_ms`` while the panel is shown;
+    hiding it stops the refresh, and unchecking "Record" stops recording.
+    """
+
+    def __init__(self, master, recorder: PerfRecorder, refresh_ms: int = PERF_PANEL_REFRESH_MS):
+        self.recorder = recorder
+        self.refresh_ms = refresh_ms
+        self.visible = False
+        self._after_id = None
+        self._grid_options = {}
+
+        self.frame = tk.Frame(master, bg="gray")
+        controls = tk.Frame(self.frame, bg="gray")
+        controls.pack(fill=tk.X)
+
+        self.record_var = tk.BooleanVar(value=recorder.enabled)
+        tk.Checkbutton(controls, text="Record", variable=self.record_var, bg="gray",
+                       command=self.on_record).pack(side=tk.LEFT)
+        tk.Button(controls, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Export JSON", command=self.export_json).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Export trace", command=self.export_trace).pack(side=tk.LEFT, padx=5)
+
+        self.text = tk.Text(self.frame, height=12, font=("Courier", 9), state=tk.DISABLED)
+        self.text.pack(fill=tk.BOTH, expand=True)
+
+    def grid(self, **kwargs) -> None:
+        """Remember where the panel goes; it stays hidden until ``toggle``."""
+        self._grid_options = kwargs
+
+    def toggle(self) -> None:
+        if self.visible:
+            self.frame.grid_remove()
+            if self._after_id is not None:
+                self.frame.after_cancel(self._after_id)
+                self._after_id = None
+        else:
+            self.frame.grid(**self._grid_options)
+            self.refresh()
+        self.visible = not self.visible
+
+    def on_record(self) -> None:
+        self.recorder.enabled = self.record_var.get()
+
+    def reset(self) -> None:
+        self.recorder.reset()
+        self.refresh(reschedule=False)
+
+    def refresh(self, reschedule: bool = True) -> None:
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, self.recorder.format_table() if self.recorder.enabled or self.recorder.spans
+                         else "Recording is off. Check \"Record\" to collect timings.")
+        self.text.config(state=tk.DISABLED)
+        if reschedule:
+            self._after_id = self.frame.after(self.refresh_ms, self.refresh)
+
+    def export_json(self) -> None:
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            self.recorder.export_json(path)
+            messagebox.showinfo("Exported", f"Statistics written to {path}")
+
+    def export_trace(self) -> None:
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Chrome trace", "*.json")])
+        if path:
+            self.recorder.export_trace(path)
+            messagebox.showinfo("Exported", f"Trace written to {path}")
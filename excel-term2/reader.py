@@ -0,0 +1,234 @@
+import io
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+
+from journal import Journal, get_journal_seq, has_pending_records
+from metadata import parse_date
+import perf
+from utils import HEADERS, SHEET_CACHE_SIZE, CANCEL_CHECK_ROWS
+from worker import check_cancelled
+
+
+class RowSource(ABC):
+    """Range access to the data rows (header excluded) of one sheet.
+
+    Subclasses provide ``columns``, ``__len__``, ``rows`` and ``date_at``.
+    """
+
+    columns = HEADERS
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def rows(self, start: int, stop: int) -> list:
+        """Data rows ``start`` (inclusive) to ``stop`` (exclusive), 0-based."""
+
+    @abstractmethod
+    def date_at(self, position: int):
+        """Transaction date of the data row at ``position``."""
+
+    def find_date(self, target: datetime) -> int:
+        """Position of the first row on or after ``target`` (rows are in date order)."""
+        return bisect_left(range(len(self)), target, key=lambda i: parse_date(self.date_at(i)) or datetime.min)
+
+
+def sheet_row(row) -> tuple:
+    """A journal record or change event row as a worksheet would return it."""
+    # Records carry the date as a string, the workbook as a datetime cell
+    return (parse_date(row[0]),) + tuple(row[1:])
+
+
+class LazySheet(RowSource):
+    """One sheet's rows, read from ``rows`` (header first) only as far as they are asked for.
+
+    Rows already read are kept, so showing the first page of a 100k-row
+    sheet reads one page and scrolling on reads the rest as it is reached.
+    ``row_count`` is the number of data rows ``rows`` holds, when known
+    without reading them (the worksheet dimension); otherwise they are
+    counted up front. Rows appended since are kept in ``tail``.
+    """
+
+    def __init__(self, title: str, rows, row_count: int = None):
+        self.title = title
+        self._stream = iter(rows)
+        header = next(self._stream, None)
+        self.columns = list(header) if header else HEADERS
+        self._read = []
+        self._lock = threading.RLock()
+        self.tail = []
+        self._file_rows = row_count  # rows of ``rows`` still in the sheet
+        if row_count is None:
+            self._read_until(None)
+
+    def _read_until(self, stop) -> None:
+        """Read rows from the stream until ``stop`` are kept (all of them for None)."""
+        while stop is None or len(self._read) < stop:
+            row = next(self._stream, None)
+            if row is None:
+                # Counting, or the dimension overstated the rows
+                self._file_rows = len(self._read) if self._file_rows is None else min(self._file_rows, len(self._read))
+                return
+            self._read.append(row)
+            if len(self._read) % CANCEL_CHECK_ROWS == 0:
+                check_cancelled()
+
+    @property
+    def max_row(self) -> int:
+        return len(self) + 1
+
+    def iter_rows(self, min_row: int = 1, max_row: int = None, values_only: bool = True):
+        """Subset of ``Worksheet.iter_rows`` (values only) so readers can share code."""
+        if min_row <= 1:
+            yield tuple(self.columns)
+        stop = len(self) if max_row is None else min(max_row - 1, len(self))
+        for start in range(max(min_row - 2, 0), stop, CANCEL_CHECK_ROWS):
+            yield from self.rows(start, min(start + CANCEL_CHECK_ROWS, stop))
+
+    def __len__(self) -> int:
+        return self._file_rows + len(self.tail)
+
+    def rows(self, start: int, stop: int) -> list:
+        with self._lock:
+            self._read_until(min(stop, self._file_rows))
+            start, stop, file_rows = max(start, 0), min(stop, len(self)), self._file_rows
+            return self._read[start:min(stop, file_rows)] + \
+                self.tail[max(start - file_rows, 0):max(stop - file_rows, 0)]
+
+    def date_at(self, position: int):
+        return self.rows(position, position + 1)[0][0]
+
+    def append(self, row) -> None:
+        with self._lock:
+            self.tail.append(sheet_row(row))
+
+    def pop(self) -> None:
+        with self._lock:
+            if self.tail:
+                self.tail.pop()
+            elif self._file_rows:
+                self._file_rows -= 1
+
+
+class WorkbookReader:
+    """Read-only view of the workbook that parses sheets on demand.
+
+    Opening only reads the workbook structure. A sheet is read lazily (see
+    ``LazySheet``) and kept in an LRU of ``cache_size`` sheets, so memory
+    follows what is being viewed rather than the catalog size. Pending
+    journal records are overlaid, giving the same view as
+    ``main.prepare_workbook``.
+
+    The compressed file is read into memory and closed right away: saves
+    swap in a new file (``main.save_replacing``), which Windows refuses
+    while the old one is open, and the reader keeps seeing the file as it
+    was when opened.
+    """
+
+    def __init__(self, file_name: str, cache_size: int = SHEET_CACHE_SIZE):
+        from openpyxl import load_workbook
+        with open(file_name, "rb") as f:
+            self.wb = load_workbook(io.BytesIO(f.read()), read_only=True)
+        perf.count("workbook_open")
+        self.cache_size = cache_size
+        self._sheets = OrderedDict()  # title -> LazySheet, least recently used first
+        self._lock = threading.Lock()
+
+        # title -> (title in the xlsx or None for journaled sheets, journaled row ops)
+        self.sheetnames = list(self.wb.sheetnames)
+        self._origin = {title: (title, []) for title in self.sheetnames}
+        if has_pending_records(file_name):
+            for record in Journal(file_name).records(after_seq=get_journal_seq(self.wb)):
+                self._overlay(record)
+
+    def _overlay(self, record: dict) -> None:
+        """Fold one journal record into the sheet list and per-sheet row ops."""
+        title = record["sheet"]
+        match record["op"]:
+            case "add":
+                self.sheetnames.insert(0, title)
+                self._origin[title] = (None, [("append", record["row"])])
+            case "append" | "delete_last_row":
+                self._origin[title][1].append(("append", record["row"]) if record["op"] == "append" else ("pop",))
+                if record.get("title"):
+                    self._rename(title, record["title"])
+            case "delete_sheet":
+                del self._origin[title]
+                self.sheetnames.remove(title)
+                self._sheets.pop(title, None)
+
+    def _rename(self, title: str, new_title: str) -> None:
+        self._origin[new_title] = self._origin.pop(title)
+        self.sheetnames[self.sheetnames.index(title)] = new_title
+        sheet = self._sheets.pop(title, None)
+        if sheet is not None:
+            sheet.title = new_title
+            self._sheets[new_title] = sheet
+
+    def apply_event(self, event: dict) -> None:
+        """Fold a change event (see ``events``) into the view without re-reading the file.
+
+        Parsed sheets are patched in place, the others replay the change
+        when they are parsed.
+        """
+        title = event["sheet"]
+        with self._lock:
+            sheet = self._sheets.get(title)
+            match event["type"]:
+                case "sheet_added":
+                    self._overlay({"op": "add", "sheet": title, "row": event["row"]})
+                case "row_appended":
+                    self._overlay({"op": "append", "sheet": title, "row": event["row"]})
+                    if sheet is not None:
+                        sheet.append(event["row"])
+                case "row_removed":
+                    self._overlay({"op": "delete_last_row", "sheet": title})
+                    if sheet is not None:
+                        sheet.pop()
+                case "sheet_renamed":
+                    self._rename(title, event["title"])
+                case "sheet_deleted":
+                    self._overlay({"op": "delete_sheet", "sheet": title})
+
+    @perf.timed("reader.open_sheet")
+    def _open(self, title: str) -> LazySheet:
+        perf.count("sheet_open")
+        source, ops = self._origin[title]
+        if source is None:
+            sheet = LazySheet(title, [tuple(HEADERS)], 0)
+        else:
+            ws = self.wb[source]
+            # The dimension gives the row count without reading the rows
+            sheet = LazySheet(title, ws.iter_rows(values_only=True), max(ws.max_row - 1, 0) if ws.max_row else None)
+        for op in ops:
+            if op[0] == "append":
+                sheet.append(op[1])
+            else:
+                sheet.pop()
+        return sheet
+
+    def __contains__(self, title: str) -> bool:
+        return title in self._sheets
+
+    def __getitem__(self, title: str) -> LazySheet:
+        with self._lock:
+            sheet = self._sheets.get(title)
+            if sheet is not None:
+                self._sheets.move_to_end(title)
+                return sheet
+            if title not in self._origin:
+                raise KeyError(f"Worksheet {title} does not exist.")
+
+            sheet = self._open(title)
+            self._sheets[title] = sheet
+            while len(self._sheets) > self.cache_size:
+                self._sheets.popitem(last=False)
+            return sheet
+
+    def close(self) -> None:
+        self._sheets.clear()
+        self.wb.close()
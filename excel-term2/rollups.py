@@ -0,0 +1,273 @@
+import json
+import sqlite3
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+
+from metadata import parse_date, file_stamp
+from utils import ROLLUP_SUFFIX, ROLLUP_GRANULARITIES
+
+# One row per product, granularity ("day", "week" or "month") and bucket,
+# keyed by the ISO date the bucket starts on (weeks start on Monday).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    product TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    open INTEGER,
+    high INTEGER,
+    low INTEGER,
+    close INTEGER,
+    stock INTEGER,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (product, granularity, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Rows are appended in date order, so a later row closes the bucket
+UPSERT = """
+INSERT INTO rollups (product, granularity, bucket, open, high, low, close, stock, count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (product, granularity, bucket) DO UPDATE SET
+    high = MAX(high, excluded.high), low = MIN(low, excluded.low),
+    close = excluded.close, stock = excluded.stock, count = count + excluded.count
+"""
+
+
+def rollup_path(file_name: str) -> str:
+    """Path of the sidecar rollups kept next to a workbook."""
+    return file_name + ROLLUP_SUFFIX
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_end(start: date, granularity: str) -> date:
+    """First day of the next bucket."""
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def fold_row(buckets: dict, row) -> None:
+    """Fold one transaction row into ``{(granularity, bucket): [open, high, low, close, stock, count]}``."""
+    when = parse_date(row[0]) if row else None
+    if when is None:
+        return
+    row = tuple(row) + (None,) * (5 - len(row))
+    stock = row[3] if row[3] is not None else 0
+    price = row[4] if row[4] is not None else 0
+    for granularity in ROLLUP_GRANULARITIES:
+        key = (granularity, bucket_start(when.date(), granularity).isoformat())
+        values = buckets.get(key)
+        if values is None:
+            buckets[key] = [price, price, price, price, stock, 1]
+        else:
+            values[1] = max(values[1], price)
+            values[2] = min(values[2], price)
+            values[3] = price
+            values[4] = stock
+            values[5] += 1
+
+
+def bucket_rows(rows) -> dict:
+    buckets = {}
+    for row in rows:
+        fold_row(buckets, row)
+    return buckets
+
+
+class RollupSeries:
+    """Columns of one product's buckets at one granularity, oldest first."""
+
+    def __init__(self, granularity: str, rows: list):
+        self.granularity = granularity
+        columns = list(zip(*rows)) or [()] * 7
+        self.dates = np.array(columns[0], dtype="datetime64[D]").astype("datetime64[s]")
+        self.open, self.high, self.low, self.close, self.stock, self.count = (
+            np.array(column, dtype=np.int64) for column in columns[1:])
+
+    def __len__(self) -> int:
+        return self.dates.size
+
+    def ends(self) -> np.ndarray:
+        if self.granularity == "month":
+            return (self.dates.astype("datetime64[M]") + 1).astype("datetime64[s]")
+        return self.dates + np.timedelta64(7 if self.granularity == "week" else 1, "D")
+
+    def envelope(self):
+        """``(dates, prices)`` drawing each bucket as open, low/high, high/low, close across its span.
+
+        The line keeps the range of every bucket like the decimated raw
+        series does, in the order the bucket most likely moved.
+        """
+        span = self.ends() - self.dates
+        rising = self.close >= self.open
+        x = np.column_stack([self.dates, self.dates + span // 3, self.dates + 2 * span // 3,
+                             self.dates + span - np.timedelta64(1, "s")])
+        y = np.column_stack([self.open, np.where(rising, self.low, self.high), np.where(rising, self.high, self.low),
+                             self.close])
+        return x.ravel(), y.ravel()
+
+
+class Rollups:
+    """Daily, weekly and monthly open/high/low/close price, last stock and count per product.
+
+    Kept up to date by the stores as rows are added and removed; nothing is
+    committed here, the owner of the connection commits with its own writes.
+    A sidecar (``open``) records the workbook stamp it matches in
+    ``rollup_meta``, like the metadata index.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, file_name: str) -> "Rollups":
+        """The sidecar rollups of a workbook, created empty if missing."""
+        conn = sqlite3.connect(rollup_path(file_name), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return cls(conn)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def stamp(self) -> Optional[list]:
+        row = self.conn.execute("SELECT value FROM rollup_meta WHERE key = 'stamp'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, file_name: str) -> None:
+        """Commit, stamped with the current workbook and journal state."""
+        self.conn.execute("INSERT OR REPLACE INTO rollup_meta (key, value) VALUES ('stamp', ?)",
+                          (json.dumps(file_stamp(file_name)),))
+        self.conn.commit()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone() is None
+
+    # Updates
+
+    def merge(self, title: str, buckets: dict) -> None:
+        """Fold buckets of rows appended after the existing ones (see ``fold_row``)."""
+        self.conn.executemany(UPSERT, ((title, granularity, key, *values) for (granularity, key), values in buckets.items()))
+
+    def add_rows(self, title: str, rows) -> None:
+        self.merge(title, bucket_rows(rows))
+
+    def remove_row(self, title: str, removed, day_rows: list) -> None:
+        """Correct the buckets of a deleted last row; ``day_rows`` are the rows left on its day."""
+        when = parse_date(removed[0]) if removed else None
+        if when is None:
+            return
+        day = when.date()
+        values = bucket_rows(day_rows).get(("day", day.isoformat()))
+        self.conn.execute("DELETE FROM rollups WHERE product = ? AND granularity = 'day' AND bucket = ?",
+                          (title, day.isoformat()))
+        if values is not None:
+            self.conn.execute("INSERT INTO rollups VALUES (?, 'day', ?, ?, ?, ?, ?, ?, ?)", (title, day.isoformat(), *values))
+        # The high or low may have been the deleted row: refold the coarser buckets from their days
+        for granularity in ROLLUP_GRANULARITIES:
+            if granularity != "day":
+                self._refold(title, granularity, bucket_start(day, granularity))
+
+    def _refold(self, title: str, granularity: str, start: date) -> None:
+        days = self.conn.execute(
+            "SELECT open, high, low, close, stock, count FROM rollups WHERE product = ? AND granularity = 'day' "
+            "AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (title, start.isoformat(), bucket_end(start, granularity).isoformat())).fetchall()
+        self.conn.execute("DELETE FROM rollups WHERE product = ? AND granularity = ? AND bucket = ?",
+                          (title, granularity, start.isoformat()))
+        if days:
+            self.conn.execute("INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                              (title, granularity, start.isoformat(), days[0][0], max(day[1] for day in days),
+                               min(day[2] for day in days), days[-1][3], days[-1][4], sum(day[5] for day in days)))
+
+    def rename(self, title: str, new_title: str) -> None:
+        """Move a product's buckets to a title no product uses (see ``MetadataIndex.free_title``)."""
+        if new_title and new_title != title:
+            # Buckets left under the free title belong to no product
+            self.drop(new_title)
+            self.conn.execute("UPDATE rollups SET product = ? WHERE product = ?", (new_title, title))
+
+    def drop(self, title: str) -> None:
+        self.conn.execute("DELETE FROM rollups WHERE product = ?", (title,))
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM rollups")
+
+    def rebuild(self, title: str, rows) -> None:
+        """Recompute one product from all its data rows."""
+        self.drop(title)
+        self.add_rows(title, rows)
+
+    def apply_record(self, record: dict, removed=None, day_rows: list = None) -> None:
+        """Update for one journal record (see ``main.apply_record``).
+
+        A ``delete_last_row`` also needs the ``removed`` row and the rows
+        left on its day.
+        """
+        title = record["sheet"]
+        match record["op"]:
+            case "add":
+                self.add_rows(title, [record["row"]])
+            case "append":
+                self.add_rows(title, [record["row"]])
+                self.rename(title, record.get("title"))
+            case "delete_last_row":
+                self.remove_row(title, removed, day_rows or [])
+                self.rename(title, record.get("title"))
+            case "delete_sheet":
+                self.drop(title)
+
+    # Queries
+
+    def _range(self, granularity: str, start: date = None, end: date = None):
+        # A bucket counts when any of its days falls in the range
+        return (bucket_start(start, granularity).isoformat() if start else "",
+                end.isoformat() if end else "9999-12-31")
+
+    def bucket_count(self, title: str, granularity: str, start: date = None, end: date = None) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM rollups WHERE product = ? AND granularity = ? AND bucket >= ? AND bucket <= ?",
+            (title, granularity, *self._range(granularity, start, end))).fetchone()[0]
+
+    def series(self, title: str, granularity: str, start: date = None, end: date = None) -> RollupSeries:
+        rows = self.conn.execute(
+            "SELECT bucket, open, high, low, close, stock, count FROM rollups "
+            "WHERE product = ? AND granularity = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+            (title, granularity, *self._range(granularity, start, end))).fetchall()
+        return RollupSeries(granularity, rows)
+
+    def price_change_day(self, title: str) -> Optional[str]:
+        """ISO date of the latest day the price moved, from within the day or against the day before."""
+        later = None
+        for bucket, open_price, high, low, close in self.conn.execute(
+                "SELECT bucket, open, high, low, close FROM rollups WHERE product = ? AND granularity = 'day' "
+                "ORDER BY bucket DESC", (title,)):
+            if later is not None and later[1] != close:
+                return later[0]
+            if high != low:
+                return bucket
+            later = (bucket, open_price)
+        return None
+
+    def pick(self, title: str, points: int, start: date = None, end: date = None) -> Optional[str]:
+        """The coarsest granularity with at least ``points`` buckets in the range, else None."""
+        for granularity in ROLLUP_GRANULARITIES:
+            if self.bucket_count(title, granularity, start, end) >= points:
+                return granularity
+        return None
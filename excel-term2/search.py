@@ -0,0 +1,262 @@
+import re
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Optional
+
+import perf
+from metadata import date_key, parse_date
+from utils import DATE_FORMAT
+
+TOKEN = re.compile(r"\w+")
+FILTER = re.compile(r"^(price|stock|date|changed)(<=|>=|<|>|=)(.+)$")
+AGE = re.compile(r"^(\d+)d$")
+RANGE_FIELDS = ("price", "stock", "date", "changed")
+
+
+def tokens(*texts) -> set:
+    """Lowercased words of the given texts."""
+    return {token for text in texts if text is not None for token in TOKEN.findall(str(text).lower())}
+
+
+def trigrams(token: str) -> set:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def number(value) -> Optional[int]:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def day_key(value) -> Optional[str]:
+    date = parse_date(value)
+    return date.date().isoformat() if date is not None else None
+
+
+def half_open(op: str, value, following) -> tuple:
+    """``(low, high)`` keys, low inclusive and high exclusive, for ``field op value``."""
+    return {"<": (None, value), "<=": (None, following), ">": (following, None), ">=": (value, None),
+            "=": (value, following)}[op]
+
+
+def field_bounds(field: str, op: str, value: str, now: datetime) -> tuple:
+    """Bounds for one ``field op value`` filter of ``parse_query``."""
+    if field in ("price", "stock"):
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError(f"'{value}' is not a number.") from None
+        return half_open(op, value, value + 1)
+
+    # Transaction dates are DATE_FORMAT strings, price change days ISO dates
+    key = (lambda moment: moment.strftime(DATE_FORMAT)) if field == "date" else (lambda moment: moment.date().isoformat())
+    age = AGE.match(value)
+    if age:
+        moment = now - timedelta(days=int(age.group(1)))
+        if op == "=":
+            day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+            return key(day), key(day + timedelta(days=1))
+        # Younger than the age means later than the moment
+        return (key(moment), None) if op in ("<", "<=") else (None, key(moment))
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"'{value}' is not a date (YYYY-MM-DD) or an age in days (7d).") from None
+    return half_open(op, key(day), key(day + timedelta(days=1)))
+
+
+def parse_query(text: str, now: datetime = None) -> dict:
+    """Turn a search box query into ``ProductSearch.query`` arguments.
+
+    Terms are separated by spaces and must all match:
+
+    - ``word`` matches products with a name or description word starting with it,
+      ``*part`` those with a word containing it;
+    - ``price``/``stock`` followed by ``<``, ``<=``, ``>``, ``>=`` or ``=`` and a
+      number filter on the current values (``stock<10``);
+    - ``date`` (last transaction) and ``changed`` (last price change) compare
+      with a ``YYYY-MM-DD`` date or an age in days: ``changed<7d`` is a price
+      change in the last 7 days, ``date>30d`` no transaction for 30 days.
+
+    Raises ValueError for a filter it can't read.
+    """
+    now = now or datetime.now()
+    criteria = {"words": [], "parts": []}
+    for term in text.lower().split():
+        match = FILTER.match(term)
+        if match is None:
+            criteria["parts" if term.startswith("*") else "words"].extend(TOKEN.findall(term))
+            continue
+        field, op, value = match.groups()
+        low, high = field_bounds(field, op, value, now)
+        # Repeated filters on a field narrow each other
+        old_low, old_high = criteria.get(field, (None, None))
+        criteria[field] = (low if old_low is None else old_low if low is None else max(low, old_low),
+                           high if old_high is None else old_high if high is None else min(high, old_high))
+    return criteria
+
+
+class SortedIndex:
+    """``(key, title)`` pairs kept sorted for range lookups."""
+
+    def __init__(self):
+        self.pairs = []
+
+    def add(self, key, title: str) -> None:
+        if key is not None:
+            insort(self.pairs, (key, title))
+
+    def remove(self, key, title: str) -> None:
+        if key is None:
+            return
+        position = bisect_left(self.pairs, (key, title))
+        if position < len(self.pairs) and self.pairs[position] == (key, title):
+            del self.pairs[position]
+
+    def range(self, low=None, high=None) -> set:
+        """Titles with ``low <= key < high``; a missing bound is open."""
+        start = 0 if low is None else bisect_left(self.pairs, (low,))
+        end = len(self.pairs) if high is None else bisect_left(self.pairs, (high,))
+        return {title for _, title in self.pairs[start:end]}
+
+
+class ProductSearch:
+    """Find products across the catalog by the words of their title, name and
+    description, their current price and stock, their last transaction date
+    and the day their price last changed.
+
+    Built once from a ``MetadataIndex`` (plus the rollups for the price change
+    days) and kept current with ``apply_event``, so a query only looks up
+    in-memory indexes: the words are kept sorted for prefix matches and by
+    trigram for substrings, the values in sorted lists for ranges.
+    """
+
+    def __init__(self, index, rollups=None):
+        self.index = index
+        self.rollups = rollups
+        self.products = {}  # title -> its last row, tokens and keys
+        self.postings = {}  # word -> titles
+        self.vocabulary = []  # sorted words
+        self.trigrams = {}  # trigram -> words
+        self.ranges = {field: SortedIndex() for field in RANGE_FIELDS}
+        for title, entry in index.products.items():
+            if entry["last"] is not None:
+                self._add(title, entry["last"], rollups.price_change_day(title) if rollups is not None else None)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _add(self, title: str, row, changed: Optional[str]) -> None:
+        row = list(row) + [None] * (5 - len(row))
+        product = self.products[title] = {
+            "row": row, "tokens": tokens(title, row[1], row[2]),
+            "price": number(row[4]), "stock": number(row[3]), "date": date_key(row[0]), "changed": changed}
+        for field in RANGE_FIELDS:
+            self.ranges[field].add(product[field], title)
+        for token in product["tokens"]:
+            titles = self.postings.get(token)
+            if titles is None:
+                titles = self.postings[token] = set()
+                insort(self.vocabulary, token)
+                for trigram in trigrams(token):
+                    self.trigrams.setdefault(trigram, set()).add(token)
+            titles.add(title)
+
+    def _remove(self, title: str) -> Optional[dict]:
+        product = self.products.pop(title, None)
+        if product is None:
+            return None
+        for field in RANGE_FIELDS:
+            self.ranges[field].remove(product[field], title)
+        for token in product["tokens"]:
+            titles = self.postings[token]
+            titles.discard(title)
+            if not titles:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+                for trigram in trigrams(token):
+                    words = self.trigrams[trigram]
+                    words.discard(token)
+                    if not words:
+                        del self.trigrams[trigram]
+        return product
+
+    def apply_event(self, event: dict) -> None:
+        """Update for one change event (see ``events``); a "reset" needs a new search.
+
+        A removed row may send it back to the rollups, so apply events once
+        their operation is saved, as the GUI and daemon clients get them.
+        """
+        title = event.get("sheet")
+        match event["type"]:
+            case "sheet_added":
+                self._remove(title)
+                self._add(title, event["row"], None)
+            case "row_appended":
+                old = self._remove(title)
+                changed = old["changed"] if old else None
+                if old is not None and old["price"] != number(event["row"][4]):
+                    changed = day_key(event["row"][0]) or changed
+                self._add(title, event["row"], changed)
+            case "row_removed":
+                old = self._remove(title)
+                if event["last"] is None:
+                    return
+                changed = old["changed"] if old else None
+                removed_day = day_key(event["row"][0]) if event["row"] else None
+                # The removed row may have been the latest price change
+                if self.rollups is not None and (changed is None or removed_day is None or removed_day >= changed):
+                    changed = self.rollups.price_change_day(title)
+                self._add(title, event["last"], changed)
+            case "sheet_renamed":
+                old = self._remove(title)
+                if old is not None:
+                    self._add(event["title"], old["row"], old["changed"])
+            case "sheet_deleted":
+                self._remove(title)
+
+    def _words(self, prefix: str) -> set:
+        titles = set()
+        position = bisect_left(self.vocabulary, prefix)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix):
+            titles |= self.postings[self.vocabulary[position]]
+            position += 1
+        return titles
+
+    def _parts(self, part: str) -> set:
+        if len(part) >= 3:
+            candidates = set.intersection(*(self.trigrams.get(trigram, set()) for trigram in trigrams(part)))
+        else:
+            candidates = self.vocabulary
+        titles = set()
+        for token in candidates:
+            if part in token:
+                titles |= self.postings[token]
+        return titles
+
+    @perf.timed("search.query")
+    def query(self, words=(), parts=(), **ranges) -> list:
+        """Titles matching every criterion, in sheet order.
+
+        ``words`` are word prefixes, ``parts`` word substrings, and each of
+        ``price``, ``stock``, ``date`` and ``changed`` may be given a
+        ``(low, high)`` range, low inclusive and high exclusive (see
+        ``parse_query``). Products without data rows never match.
+        """
+        matches = None
+        for field, (low, high) in ranges.items():
+            if field not in RANGE_FIELDS:
+                raise ValueError(f"Unknown search field '{field}'.")
+            found = self.ranges[field].range(low, high)
+            matches = found if matches is None else matches & found
+        for word in words:
+            found = self._words(word.lower())
+            matches = found if matches is None else matches & found
+        for part in parts:
+            found = self._parts(part.lower())
+            matches = found if matches is None else matches & found
+        if matches is None:
+            matches = set(self.products)
+        return [title for title in self.index.sheetnames if title in matches]
+
+    def search(self, text: str) -> list:
+        """Titles matching a search box query (see ``parse_query``), in sheet order."""
+        return self.query(**parse_query(text))
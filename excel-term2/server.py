@@ -0,0 +1,223 @@
+"""Write daemon: one process owning the storage file for several clients.
+
+Usage::
+
+    python server.py [datas/products.xlsx]
+
+The daemon listens on a Unix socket next to the file (see
+``client.socket_path``). Clients send newline-delimited JSON requests
+``{"id", "op", "args"}`` naming a ``ProductStore`` method; the daemon applies
+them one at a time in arrival order and saves once per batch, so operators
+writing together share saves instead of each rewriting the workbook. Every
+request is acknowledged with ``{"id", "result", "changes"}`` once its batch
+is on disk, and every other connection is sent ``{"changes"}`` for it. When
+the save fails the batch is dropped and each of its operations is
+acknowledged as a failure, so nothing is reported done that is not on disk.
+Change events carry the operation's ``seq`` so clients can spot
+notifications that overtook each other. Sheets travel as titles, never as
+positions, which other clients' operations may shift.
+
+While the daemon runs, ``main.py``'s functions and the GUI find its socket
+and go through it instead of opening the file themselves.
+"""
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+import events
+import perf
+from client import socket_path, send_message
+from main import open_store
+from utils import storage_file_path, SERVER_BATCH_SIZE, SERVER_BATCH_WAIT
+
+OPERATIONS = ("add_product", "edit_product", "delete_product_sheet", "delete_last_row")
+
+
+class Connection:
+    """One client connection; replies and notifications may be sent from any thread."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, message: dict) -> bool:
+        try:
+            with self.lock:
+                send_message(self.sock, message)
+            return True
+        except OSError:
+            return False
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        connection = Connection(self.request)
+        server = self.server.product_server
+        server.connect(connection)
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                    request_id, op, args = message["id"], message["op"], message.get("args", [])
+                except (ValueError, KeyError, TypeError):
+                    continue  # Not a request, nothing to answer
+                if op not in OPERATIONS:
+                    connection.send({"id": request_id, "error": f"Unknown operation '{op}'."})
+                    continue
+                server.submit(connection, request_id, op, args)
+        finally:
+            server.disconnect(connection)
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ProductServer:
+    """Own the store of ``file_name`` and serve it on ``path``.
+
+    A single thread applies the queued operations. It takes whatever queued
+    up while the previous batch was being saved (at most ``batch_size``,
+    waiting up to ``batch_wait`` seconds for more), applies it, saves once
+    and then acknowledges the whole batch. A batch that fails to save is
+    discarded from the store and acknowledged as failed.
+    """
+
+    def __init__(self, file_name: str = storage_file_path, path: str = None, batch_size: int = SERVER_BATCH_SIZE,
+                 batch_wait: float = SERVER_BATCH_WAIT):
+        self.file_name = file_name
+        self.path = path or socket_path(file_name)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        # Saves are driven by the batches, not the store's own schedule
+        self.store = open_store(file_name, flush_every=0, flush_interval=0)
+        self.seq = 0
+        self.connections = []
+        self._connections_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._server = None
+        self._thread = None
+
+    def connect(self, connection: Connection) -> None:
+        with self._connections_lock:
+            self.connections.append(connection)
+
+    def disconnect(self, connection: Connection) -> None:
+        with self._connections_lock:
+            if connection in self.connections:
+                self.connections.remove(connection)
+
+    def submit(self, connection: Connection, request_id, op: str, args: list) -> None:
+        self._queue.put((connection, request_id, op, args))
+
+    def start(self) -> bool:
+        """Bind the socket and start serving in background threads; False if another daemon is running."""
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                print(f"A server is already running on '{self.path}'.")
+                return False
+            except OSError:
+                os.remove(self.path)  # Left behind by a daemon that is gone
+            finally:
+                probe.close()
+        self._server = UnixServer(self.path, RequestHandler)
+        self._server.product_server = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"Serving '{self.file_name}' on '{self.path}'.")
+        return True
+
+    def stop(self) -> bool:
+        """Stop accepting requests, finish the queued ones and save."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        return self.store.close()
+
+    def _next_batch(self) -> list:
+        """Block for one operation, then take what else is queued; ``None`` ends the batch and the loop."""
+        batch = [self._queue.get()]
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.batch_wait) if self.batch_wait else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            stopping = batch[-1] is None
+            requests = [request for request in batch if request is not None]
+            if requests:
+                self._apply_batch(requests)
+            if stopping:
+                return
+
+    def _apply_batch(self, requests: list) -> None:
+        with perf.span("server.batch"):
+            applied = []
+            for connection, request_id, op, args in requests:
+                self.seq += 1
+                queued = len(self.store.unsaved_events)
+                try:
+                    with events.capture() as changes:
+                        result = getattr(self.store, op)(*args)
+                except Exception as e:
+                    result = False, f"Failed to perform product operation: {e}"
+                # Emitted already (journal, SQLite) or waiting for the flush
+                changes = changes + self.store.unsaved_events[queued:]
+                applied.append((connection, request_id, result, [dict(event, seq=self.seq) for event in changes]))
+            saved = self.store.flush()
+            if not saved:
+                # Go back to the file on disk rather than report changes it does not have
+                self.store.discard()
+        perf.observe("server.batch_size", len(requests))
+        if not saved:
+            print(f"Could not save '{self.file_name}', dropped a batch of {len(requests)} operations.")
+
+        with self._connections_lock:
+            connections = list(self.connections)
+        for connection, request_id, (success, msg), changes in applied:
+            if changes and not saved:
+                success, msg = False, f"Failed to save '{self.file_name}', it may be in use."
+                changes = []
+            connection.send({"id": request_id, "result": [success, msg], "changes": changes})
+            if changes:
+                for other in connections:
+                    if other is not connection:
+                        other.send({"changes": changes})
+
+
+def serve(file_name: str = storage_file_path) -> None:
+    """Run a daemon for ``file_name`` until interrupted."""
+    server = ProductServer(file_name)
+    if not server.start():
+        return
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    print("Server stopped.")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else storage_file_path)
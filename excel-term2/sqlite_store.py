@@ -0,0 +1,438 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+from metadata import MetadataIndex, date_key, restored_title, parse_date
+from reader import RowSource
+from rollups import Rollups, fold_row
+import events
+from utils import HEADERS, DATE_FORMAT, SQLITE_FETCH_ROWS
+from worker import check_cancelled
+
+# ``position`` keeps the workbook's sheet order (add_product puts new products
+# first) and ``header`` tells product sheets from the workbook's default sheet.
+# Rows are keyed by their 1-based position in the product, so reading a page,
+# the last record or a single row is a primary key lookup.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL,
+    header INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS products_position ON products (position);
+CREATE TABLE IF NOT EXISTS transactions (
+    product_id INTEGER NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    name TEXT,
+    description TEXT,
+    stock INTEGER,
+    price INTEGER,
+    PRIMARY KEY (product_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (product_id, date);
+"""
+
+ROW_COLUMNS = "date, name, description, stock, price"
+DEFAULT_SHEET = "Sheet"
+
+
+def connect(file_name: str) -> sqlite3.Connection:
+    """Open (creating if needed) a database in WAL mode with the schema in place."""
+    folder = os.path.dirname(file_name)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    # Connections are shared with the GUI's I/O worker, callers serialize access
+    conn = sqlite3.connect(file_name, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def db_row(row) -> tuple:
+    """A worksheet row as transaction column values, padded to the five headers."""
+    row = (tuple(row) + (None,) * len(HEADERS))[:len(HEADERS)]
+    return (date_key(row[0]),) + row[1:]
+
+
+class SQLiteStore:
+    """Products and transactions in an SQLite database, with the ProductStore interface.
+
+    Every operation is committed before it returns, so there is nothing to
+    schedule; WAL mode lets readers run while a write is in progress. Looking
+    up, appending or removing a product's last row are primary key operations,
+    O(log n) however many transactions are stored.
+    """
+
+    def __init__(self, file_name: str, flush_every=None, flush_interval=None, journal=None):
+        # The schedule and journal options only apply to ProductStore
+        self.file_name = file_name
+        self.conn = connect(file_name)
+        self.rollups = Rollups(self.conn)
+        # Change events are emitted after each commit, none wait for a flush
+        self.unsaved_events = []
+        self._lock = threading.RLock()
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM products LIMIT 1").fetchone() is None:
+                # Mirror the default sheet of a new workbook
+                self.create_product(DEFAULT_SHEET, header=False)
+            elif self.rollups.is_empty() and self.conn.execute("SELECT 1 FROM transactions LIMIT 1").fetchone():
+                self.rebuild_rollups()  # A database written before rollups existed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def sheetnames(self) -> list:
+        return [title for title, in self.conn.execute("SELECT title FROM products ORDER BY position")]
+
+    def flush(self) -> bool:
+        return True
+
+    def compact(self) -> bool:
+        return True
+
+    def discard(self) -> None:
+        pass  # Every operation is committed already
+
+    def close(self) -> bool:
+        self.conn.close()
+        return True
+
+    def sheet_at(self, sheet_index: int) -> Optional[str]:
+        if sheet_index < 0:
+            return None
+        row = self.conn.execute("SELECT title FROM products ORDER BY position LIMIT 1 OFFSET ?", (sheet_index,)).fetchone()
+        return row[0] if row else None
+
+    def sheet_name(self, sheet: Union[int, str]) -> Optional[str]:
+        """The title of a product given by title or position, None if there is no such product."""
+        if isinstance(sheet, str):
+            return sheet if self.product_id(sheet) is not None else None
+        return self.sheet_at(sheet)
+
+    def product_id(self, title: str) -> Optional[int]:
+        row = self.conn.execute("SELECT id FROM products WHERE title = ?", (title,)).fetchone()
+        return row[0] if row else None
+
+    def row_count(self, product_id: int) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM transactions WHERE product_id = ?", (product_id,)).fetchone()[0]
+
+    def row_at(self, product_id: int, seq: int) -> Optional[tuple]:
+        return self.conn.execute(f"SELECT {ROW_COLUMNS} FROM transactions WHERE product_id = ? AND seq = ?",
+                                 (product_id, seq)).fetchone()
+
+    def last_row(self, title: str) -> Optional[tuple]:
+        product_id = self.product_id(title)
+        if product_id is None:
+            return None
+        return self.row_at(product_id, self.row_count(product_id))
+
+    def free_title(self, title: str, current: str = None) -> str:
+        """``title``, numbered like openpyxl does when another product already uses it."""
+        taken = {name.lower() for name in self.sheetnames if name != current}
+        candidate, number = title, 0
+        while candidate.lower() in taken:
+            number += 1
+            candidate = f"{title}{number}"
+        return candidate
+
+    # The building blocks below don't commit; callers wrap them in ``with store.conn``
+
+    def create_product(self, title: str, header: bool = True, first: bool = True) -> int:
+        """Insert an empty product in front of (or after) the others and return its id."""
+        edge = "MIN(position), 0) - 1" if first else "MAX(position), -1) + 1"
+        position = self.conn.execute(f"SELECT COALESCE({edge} FROM products").fetchone()[0]
+        return self.conn.execute("INSERT INTO products (title, position, header) VALUES (?, ?, ?)",
+                                 (title, position, int(header))).lastrowid
+
+    def append_rows(self, title: str, rows, new_title: str = None) -> str:
+        """Append worksheet rows to a product, renaming it afterwards if asked; returns the title."""
+        product_id = self.product_id(title)
+        start = self.row_count(product_id)
+        buckets = {}
+
+        def insert_values():
+            for seq, row in enumerate(rows, start=start + 1):
+                fold_row(buckets, row)
+                yield (product_id, seq) + db_row(row)
+
+        self.conn.executemany(f"INSERT INTO transactions (product_id, seq, {ROW_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              insert_values())
+        self.rollups.merge(title, buckets)
+        if new_title and new_title != title:
+            new_title = self.free_title(new_title, title)
+            self.conn.execute("UPDATE products SET title = ? WHERE id = ?", (new_title, product_id))
+            self.rollups.rename(title, new_title)
+            title = new_title
+        return title
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM transactions")
+        self.conn.execute("DELETE FROM products")
+        self.rollups.clear()
+
+    def rebuild_rollups(self) -> None:
+        self.rollups.clear()
+        for product_id, title in self.conn.execute("SELECT id, title FROM products").fetchall():
+            self.rollups.add_rows(title, self.conn.execute(
+                f"SELECT {ROW_COLUMNS} FROM transactions WHERE product_id = ? ORDER BY seq", (product_id,)))
+
+    def metadata_index(self) -> MetadataIndex:
+        """The metadata index, answered by index lookups instead of a scan."""
+        index = MetadataIndex()
+        with self._lock:
+            products = self.conn.execute(
+                "SELECT id, title, "
+                "(SELECT MIN(date) FROM transactions WHERE product_id = p.id), "
+                "(SELECT MAX(date) FROM transactions WHERE product_id = p.id) "
+                "FROM products p ORDER BY position").fetchall()
+            for product_id, title, min_date, max_date in products:
+                rows = self.row_count(product_id)
+                last = self.row_at(product_id, rows) if rows else None
+                index.sheetnames.append(title)
+                index.products[title] = {"last": list(last) if last else None, "rows": rows,
+                                         "min_date": min_date, "max_date": max_date}
+        return index
+
+    def validate_sheet_exists(self, sheet_name: str, flag: bool = False) -> Union[bool, str]:
+        """Validate if a product exists in the database."""
+        exists = self.product_id(sheet_name) is not None
+        # For add operation
+        if flag:
+            if exists:
+                msg = f"Product sheet '{sheet_name}' already exist."
+                print(msg)
+                return False, msg
+            return True, ""
+        if not exists:
+            msg = f"Product sheet '{sheet_name}' does not exist."
+            print(msg)
+            return False, msg
+        return True, ""
+
+    def add_product(self, name: str, description: str, stock: int, price: int) -> Union[bool, str]:
+        """Add a new product with the current date."""
+        with self._lock:
+            sheet_name = name.lower()
+            is_valid, msg = self.validate_sheet_exists(sheet_name, flag=True)
+            if not is_valid:
+                return False, msg
+
+            row = [datetime.now().strftime(DATE_FORMAT), name, description, stock, price]
+            with self.conn:
+                self.create_product(sheet_name)
+                self.append_rows(sheet_name, [row])
+            events.emit_record({"op": "add", "sheet": sheet_name, "row": row})
+            msg = f"Product sheet '{sheet_name}' added successfully."
+            print(msg)
+            return True, msg
+
+    def edit_product(self, sheet: Union[int, str], name=None, description=None, stock=None, price=None) -> Union[bool, str]:
+        """Edit an existing product, given by title or position, by adding a new record with updated data."""
+        with self._lock:
+            sheet_name = self.sheet_name(sheet)
+            if sheet_name is None:
+                return False, "Invalid Sheet Index." if isinstance(sheet, int) else f"Product sheet '{sheet}' does not exist."
+
+            # Retrieve the last row's values in case if given parameters were null
+            last_row = self.last_row(sheet_name)
+            if last_row is None:
+                return False, f"Product sheet '{sheet_name}' has no records."
+            last_record = dict(zip(HEADERS, last_row))
+
+            new_record = {
+                "Transaction Date": datetime.now().strftime(DATE_FORMAT),
+                "Name": name if name is not None else last_record["Name"],
+                "Description": description if description is not None else last_record["Description"],
+                "Stock": stock if stock is not None else last_record["Stock"],
+                "Price": price if price is not None else last_record["Price"]
+            }
+
+            new_title = None
+            if name and name.lower() != str(last_record['Name']).lower():  # Check for case-insensitive name change
+                new_title = name
+            row = [new_record[header] for header in HEADERS]
+            with self.conn:
+                new_title = self.append_rows(sheet_name, [row], new_title)
+            events.emit_record({"op": "append", "sheet": sheet_name, "row": row, "title": new_title})
+            msg = f"Product sheet '{sheet_name}' updated successfully."
+            print(msg)
+            return True, msg
+
+    def delete_product_sheet(self, sheet_name: str) -> Union[bool, str]:
+        """Delete a product and its transactions."""
+        with self._lock:
+            is_valid, msg = self.validate_sheet_exists(sheet_name)
+            if not is_valid:
+                return False, msg
+
+            with self.conn:
+                self.conn.execute("DELETE FROM products WHERE title = ?", (sheet_name,))
+                self.rollups.drop(sheet_name)
+            events.emit_record({"op": "delete_sheet", "sheet": sheet_name})
+            msg = f"Product sheet '{sheet_name}' deleted successfully."
+            print(msg)
+            return True, msg
+
+    def delete_last_row(self, sheet: Union[int, str]) -> Union[bool, str]:
+        "Delete the last row of data from the product given by title or position."
+        with self._lock:
+            sheet_name = self.sheet_name(sheet)
+            if sheet_name is None:
+                return False, "Invalid Sheet Index." if isinstance(sheet, int) else f"Product sheet '{sheet}' does not exist."
+            product_id = self.product_id(sheet_name)
+            rows = self.row_count(product_id)
+            if not rows:
+                return False, "Cannot delete the header."
+
+            removed = self.row_at(product_id, rows)
+            last = self.row_at(product_id, rows - 1) if rows > 1 else None
+
+            # Undo a rename done by the deleted record
+            title = None
+            if last is not None:
+                title = restored_title(self.row_at(product_id, 1)[1], last[1], removed[1])
+
+            with self.conn:
+                self.conn.execute("DELETE FROM transactions WHERE product_id = ? AND seq = ?", (product_id, rows))
+                removed_date = parse_date(removed[0])
+                if removed_date is not None:
+                    # Rows left on the removed row's day, for the daily rollup
+                    day = removed_date.date()
+                    self.rollups.remove_row(sheet_name, removed, self.conn.execute(
+                        f"SELECT {ROW_COLUMNS} FROM transactions WHERE product_id = ? AND date >= ? AND date < ? "
+                        "ORDER BY seq", (product_id, day.isoformat(), (day + timedelta(days=1)).isoformat())).fetchall())
+                if title and title != sheet_name:
+                    title = self.free_title(title, sheet_name)
+                    self.conn.execute("UPDATE products SET title = ? WHERE id = ?", (title, product_id))
+                    self.rollups.rename(sheet_name, title)
+            events.emit_record({"op": "delete_last_row", "sheet": sheet_name, "title": title}, removed, last)
+            return True, f"Last row of {sheet_name} deleted successfully."
+
+
+class SQLiteSheet(RowSource):
+    """One product read from the database a range of rows at a time.
+
+    Offers the same read interface as ``reader.LazySheet`` without holding
+    the rows in memory.
+    """
+
+    def __init__(self, reader: "SQLiteReader", title: str, product_id: int, header: bool, row_count: int):
+        self.reader = reader
+        self.title = title
+        self.product_id = product_id
+        self.columns = HEADERS if header else [None]
+        self._len = row_count
+
+    @property
+    def max_row(self) -> int:
+        return self._len + 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def rows(self, start: int, stop: int) -> list:
+        return self.reader.query(f"SELECT {ROW_COLUMNS} FROM transactions WHERE product_id = ? AND seq > ? AND seq <= ? "
+                                 "ORDER BY seq", (self.product_id, start, stop))
+
+    def iter_rows(self, min_row: int = 1, max_row: int = None, values_only: bool = True):
+        """Subset of ``Worksheet.iter_rows`` (values only), fetched in chunks."""
+        if min_row <= 1:
+            yield tuple(self.columns)
+        stop = self._len if max_row is None else min(max_row - 1, self._len)
+        for start in range(max(min_row - 2, 0), stop, SQLITE_FETCH_ROWS):
+            check_cancelled()
+            yield from self.rows(start, min(start + SQLITE_FETCH_ROWS, stop))
+
+    def date_at(self, position: int):
+        rows = self.reader.query("SELECT date FROM transactions WHERE product_id = ? AND seq = ?",
+                                 (self.product_id, position + 1))
+        return rows[0][0] if rows else None
+
+    def find_date(self, target: datetime) -> int:
+        rows = self.reader.query("SELECT seq FROM transactions WHERE product_id = ? AND date >= ? ORDER BY date, seq LIMIT 1",
+                                 (self.product_id, date_key(target)))
+        return rows[0][0] - 1 if rows else self._len
+
+
+class SQLiteReader:
+    """Read view of a database with the ``reader.WorkbookReader`` interface.
+
+    Sheets are handles that query their rows on demand, so nothing is parsed
+    up front and every product counts as loaded.
+    """
+
+    def __init__(self, file_name: str):
+        self.conn = connect(file_name)
+        self._lock = threading.RLock()
+        self._products = {}  # title -> (id, header)
+        self._sheets = {}    # title -> SQLiteSheet handed out
+        self.sheetnames = []
+        for product_id, title, header in self.query("SELECT id, title, header FROM products ORDER BY position"):
+            self._products[title] = (product_id, bool(header))
+            self.sheetnames.append(title)
+
+    def query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def __contains__(self, title: str) -> bool:
+        return title in self._products
+
+    def __getitem__(self, title: str) -> SQLiteSheet:
+        with self._lock:
+            sheet = self._sheets.get(title)
+            if sheet is not None:
+                return sheet
+            if title not in self._products:
+                raise KeyError(f"Worksheet {title} does not exist.")
+            product_id, header = self._products[title]
+            sheet = SQLiteSheet(self, title, product_id, header, self._row_count(product_id))
+            self._sheets[title] = sheet
+            return sheet
+
+    def _row_count(self, product_id: int) -> int:
+        return self.query("SELECT COALESCE(MAX(seq), 0) FROM transactions WHERE product_id = ?", (product_id,))[0][0]
+
+    def apply_event(self, event: dict) -> None:
+        """Catch up with a change already committed to the database (see ``events``).
+
+        Counts are re-read rather than adjusted, so a handle created after the
+        commit isn't counted twice.
+        """
+        title = event["sheet"]
+        with self._lock:
+            match event["type"]:
+                case "sheet_added":
+                    rows = self.query("SELECT id, header FROM products WHERE title = ?", (title,))
+                    if rows and title not in self._products:
+                        self._products[title] = (rows[0][0], bool(rows[0][1]))
+                        self.sheetnames.insert(0, title)
+                case "row_appended" | "row_removed":
+                    sheet = self._sheets.get(title)
+                    if sheet is not None:
+                        sheet._len = self._row_count(sheet.product_id)
+                case "sheet_renamed":
+                    self._products[event["title"]] = self._products.pop(title)
+                    self.sheetnames[self.sheetnames.index(title)] = event["title"]
+                    sheet = self._sheets.pop(title, None)
+                    if sheet is not None:
+                        sheet.title = event["title"]
+                        self._sheets[event["title"]] = sheet
+                case "sheet_deleted":
+                    self._products.pop(title, None)
+                    self._sheets.pop(title, None)
+                    if title in self.sheetnames:
+                        self.sheetnames.remove(title)
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,154 @@
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, messagebox
+
+import perf
+from utils import TABLE_PAGE_SIZES, TABLE_PAGE_SIZE, TABLE_BUFFER_ROWS
+
+
+class VirtualTable:
+    """Treeview that only holds the visible page of a row source (see ``reader.RowSource``).
+
+    Scrolling, paging and jump-to-date move a window over the source and
+    re-materialize at most ``page_size`` items, so a sheet with 100k rows
+    opens as fast as one with ten. Rows are fetched from the source with
+    ``buffer_rows`` extra on each side so small scrolls don't hit it again.
+    """
+
+    def __init__(self, master, page_size: int = TABLE_PAGE_SIZE, buffer_rows: int = TABLE_BUFFER_ROWS):
+        self.source = None
+        self.offset = 0
+        self.page_size = page_size
+        self.buffer_rows = buffer_rows
+        self._buffer = []
+        self._buffer_start = 0
+
+        self.frame = tk.Frame(master, bg="gray")
+        self.tree = ttk.Treeview(self.frame, show='headings', height=page_size)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky=tk.NSEW)
+        self.scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_mousewheel)
+
+        # Paging controls
+        controls = tk.Frame(self.frame, bg="gray")
+        controls.grid(row=1, column=0, columnspan=2, sticky=tk.EW, pady=5)
+
+        tk.Button(controls, text="<<", command=lambda: self.scroll_to(self.offset - self.page_size)).pack(side=tk.LEFT)
+        tk.Button(controls, text=">>", command=lambda: self.scroll_to(self.offset + self.page_size)).pack(side=tk.LEFT)
+        self.position_label = tk.Label(controls, text="", bg="gray")
+        self.position_label.pack(side=tk.LEFT, padx=10)
+
+        tk.Label(controls, text="Rows per page:", bg="gray").pack(side=tk.LEFT)
+        self.page_size_var = tk.StringVar(value=str(page_size))
+        page_size_box = ttk.Combobox(controls, textvariable=self.page_size_var, values=TABLE_PAGE_SIZES, width=5, state="readonly")
+        page_size_box.bind("<<ComboboxSelected>>", self.on_page_size)
+        page_size_box.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(controls, text="Jump to (YYYY-MM-DD):", bg="gray").pack(side=tk.LEFT)
+        self.jump_entry = tk.Entry(controls, width=12)
+        self.jump_entry.bind("<Return>", lambda event: self.jump_to_date())
+        self.jump_entry.pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Go", command=self.jump_to_date).pack(side=tk.LEFT)
+
+    def grid(self, **kwargs) -> None:
+        self.frame.grid(**kwargs)
+
+    def set_source(self, source) -> None:
+        """Show a new row source from its first page."""
+        self.source = source
+        self.tree["columns"] = source.columns
+        for col in source.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=100)
+        self.offset = 0
+        self._buffer = []
+        self.render()
+
+    def scroll_to(self, offset: int) -> None:
+        total = len(self.source) if self.source is not None else 0
+        self.offset = max(0, min(offset, total - self.page_size))
+        self.render()
+
+    def window_rows(self) -> list:
+        """Rows of the current page, refilling the buffer when the page leaves it."""
+        start, stop = self.offset, self.offset + self.page_size
+        buffer_stop = self._buffer_start + len(self._buffer)
+        if start < self._buffer_start or (stop > buffer_stop and buffer_stop < len(self.source)) or not self._buffer:
+            self._buffer_start = max(0, start - self.buffer_rows)
+            self._buffer = self.source.rows(self._buffer_start, stop + self.buffer_rows)
+        return self._buffer[start - self._buffer_start:stop - self._buffer_start]
+
+    @perf.timed("table.render")
+    def render(self) -> None:
+        """Replace the Treeview items with the current window of rows."""
+        self.tree.delete(*self.tree.get_children())
+        if self.source is None:
+            return
+        for row in self.window_rows():
+            self.tree.insert("", "end", values=row)
+        self.update_position()
+
+    def update_position(self) -> None:
+        """Sync the scrollbar and the "x-y of n" label with the offset and source size."""
+        total = len(self.source)
+        last = min(self.offset + self.page_size, total)
+        if total:
+            self.scrollbar.set(self.offset / total, last / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.position_label.config(text=f"{self.offset + 1 if total else 0}-{last} of {total}")
+
+    def row_appended(self) -> None:
+        """The source grew by one row at the end: insert its item if it lands on this page."""
+        total = len(self.source)
+        self._buffer = []  # Refetched on the next scroll
+        if self.offset <= total - 1 < self.offset + self.page_size:
+            self.tree.insert("", "end", values=self.source.rows(total - 1, total)[0])
+        self.update_position()
+
+    def row_removed(self) -> None:
+        """The source lost its last row: delete its item if it was on this page."""
+        total = len(self.source)
+        self._buffer = []
+        if self.offset and self.offset >= total:
+            self.scroll_to(total - self.page_size)  # The page is now empty
+            return
+        if self.offset <= total < self.offset + self.page_size:
+            items = self.tree.get_children()
+            if items:
+                self.tree.delete(items[-1])
+        self.update_position()
+
+    def on_scrollbar(self, action, amount, unit=None) -> None:
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.source)))
+        elif action == "scroll":
+            step = self.page_size if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_mousewheel(self, event) -> str:
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def on_page_size(self, event=None) -> None:
+        self.page_size = int(self.page_size_var.get())
+        self.tree.configure(height=self.page_size)
+        self.scroll_to(self.offset)
+
+    def jump_to_date(self) -> None:
+        if self.source is None:
+            return
+        try:
+            target = datetime.strptime(self.jump_entry.get(), "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid date in the format YYYY-MM-DD.")
+            return
+        self.scroll_to(self.source.find_date(target))
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def xlsx_file(tmp_path):
+    """An empty workbook store."""
+    import main
+    file_name = str(tmp_path / "products.xlsx")
+    main.create_storage(file_name)
+    return file_name
+
+
+@pytest.fixture
+def sqlite_file(tmp_path):
+    """An empty SQLite store."""
+    import main
+    file_name = str(tmp_path / "products.db")
+    main.create_storage(file_name)
+    return file_name
+
+
+@pytest.fixture(params=["xlsx", "sqlite"])
+def store_file(request, tmp_path):
+    """An empty store of each backend."""
+    import main
+    file_name = str(tmp_path / ("products.xlsx" if request.param == "xlsx" else "products.db"))
+    main.create_storage(file_name)
+    return file_name
@@ -0,0 +1,55 @@
+from datetime import date, datetime
+
+import numpy as np
+
+import aggregate
+import main
+from aggregate import aggregate_file, aggregate_workbook, summarize, top_movers
+from timeseries import SheetSeries
+
+
+def fill(file_name):
+    rows = []
+    for product, prices in (("a", [100, 110, 90]), ("b", [50, 50, 80]), ("c", [10, 5, 1])):
+        rows.append({"name": product, "description": "test", "stock": 1, "price": prices[0], "date": "2024-01-01 00:00:00"})
+        for day, price in enumerate(prices[1:], start=2):
+            rows.append({"product": product, "price": price, "date": f"2024-01-0{day} 00:00:00"})
+    main.bulk_import(file_name, rows)
+
+
+def test_summarize():
+    series = SheetSeries([datetime(2024, 1, day) for day in (1, 2, 3)], [1, 1, 1], [100, 110, 90])
+    summary = summarize(series, date(2024, 1, 2))
+    assert summary["changes"].tolist() == [-20]
+    assert summary["total_change"] == -20
+    assert summarize(series, date(2025, 1, 1))["volatility"] == 0.0
+
+
+def test_in_process_and_pool_agree(store_file, monkeypatch):
+    fill(store_file)
+    names = ["a", "b", "c"]
+    reader = main.open_reader(store_file)
+    expected = aggregate_workbook(reader, names)
+    reader.close()
+    assert {name: result["total_change"] for name, result in expected.items()} == {"a": -10, "b": 30, "c": -9}
+
+    in_process = aggregate_file(store_file, names, workers=1)
+    monkeypatch.setattr(aggregate, "AGGREGATE_MIN_PARALLEL_SHEETS", 1)
+    pooled = aggregate_file(store_file, names, workers=2)
+    assert list(pooled) == names
+    for name in names:
+        assert np.array_equal(pooled[name]["changes"], expected[name]["changes"])
+        assert np.array_equal(in_process[name]["price"], expected[name]["price"])
+
+
+def test_file_aggregation_sees_journaled_changes(xlsx_file):
+    fill(xlsx_file)
+    with main.ProductStore(xlsx_file, journal=True) as store:
+        store.edit_product(store.sheetnames.index("a"), price=200)
+    assert aggregate_file(xlsx_file, ["a"], workers=1)["a"]["total_change"] == 100
+
+
+def test_top_movers():
+    results = {name: {"total_change": change} for name, change in (("a", -10), ("b", 30), ("c", -9))}
+    assert top_movers(results, 2) == [("b", 30), ("a", -10)]
+    assert top_movers({}) == []
@@ -0,0 +1,98 @@
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+import analytics
+import main
+
+HISTORY = {
+    "widget": [("2024-01-01 10:00:00", 10, 100), ("2024-01-02 09:00:00", 6, 110), ("2024-01-02 18:00:00", 9, 99),
+               ("2024-01-04 12:00:00", 2, 120)],
+    "gadget": [("2023-12-30 08:00:00", 5, 50), ("2024-01-03 08:00:00", 4, 50), ("2024-01-05 20:00:00", 1, 40)],
+    "gizmo": [("2024-01-06 00:00:00", 3, 10)],
+}
+
+
+@pytest.fixture
+def catalog(xlsx_file):
+    records = []
+    for product, rows in HISTORY.items():
+        for i, (when, stock, price) in enumerate(rows):
+            if i == 0:
+                records.append({"name": product, "description": "test", "stock": stock, "price": price, "date": when})
+            else:
+                records.append({"product": product, "stock": stock, "price": price, "date": when})
+    main.bulk_import(xlsx_file, records)
+    return xlsx_file
+
+
+def brute_force(start: date, end: date) -> dict:
+    """The report's metrics computed row by row."""
+    rows = {product: [(datetime.strptime(when, "%Y-%m-%d %H:%M:%S"), stock, price) for when, stock, price in history]
+            for product, history in HISTORY.items()}
+    low = datetime.combine(start, datetime.min.time())
+    high = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    days = (end - start).days + 1
+    value = []
+    for day in range(days):
+        day_end = low + timedelta(days=day + 1)
+        value.append(sum(([stock * price for when, stock, price in history if when < day_end] or [0])[-1]
+                         for history in rows.values()))
+    report = {"value": value, "sold": {}, "turnover": {}, "volatility": {}, "drops": []}
+    for product, history in rows.items():
+        sold = 0
+        returns = []
+        stock_seconds = tracked = 0.0
+        for i, (when, stock, price) in enumerate(history):
+            following = history[i + 1][0] if i + 1 < len(history) else high
+            held = max((min(following, high) - max(when, low)).total_seconds(), 0)
+            stock_seconds += stock * held
+            tracked += held
+            if i and low <= when < high:
+                _, previous_stock, previous_price = history[i - 1]
+                sold += max(previous_stock - stock, 0)
+                if previous_stock > stock:
+                    report["drops"].append((previous_stock - stock, product, when))
+                if previous_price > 0:
+                    returns.append((price - previous_price) / previous_price)
+        average = stock_seconds / tracked if tracked else 0
+        report["sold"][product] = sold
+        report["turnover"][product] = sold / average if average else 0
+        mean = sum(returns) / len(returns) if returns else 0
+        report["volatility"][product] = math.sqrt(sum((r - mean) ** 2 for r in returns) / len(returns)) if returns else 0
+    report["drops"].sort(key=lambda drop: -drop[0])
+    return report
+
+
+@pytest.mark.parametrize("start, end", [(date(2024, 1, 1), date(2024, 1, 6)), (date(2024, 1, 2), date(2024, 1, 4))])
+def test_report_matches_brute_force(catalog, start, end):
+    report = analytics.analyze_file(catalog, start=start, end=end, workers=1)
+    expected = brute_force(start, end)
+    assert report["dates"][0] == np.datetime64(start) and report["dates"][-1] == np.datetime64(end)
+    assert report["value"].tolist() == expected["value"]
+    for metric in ("sold", "turnover", "volatility"):
+        got = dict(zip(report["products"], report[metric]))
+        for product, value in expected[metric].items():
+            assert got[product] == pytest.approx(value), (metric, product)
+    assert [(units, product) for units, product, _ in report["drops"]] == \
+        [(units, product) for units, product, _ in expected["drops"][:analytics.ANALYTICS_TOP]]
+
+
+def test_open_range_covers_every_transaction(catalog):
+    report = analytics.analyze_file(catalog, workers=1)
+    assert report["dates"][0] == np.datetime64("2023-12-30") and report["dates"][-1] == np.datetime64("2024-01-06")
+    assert report["value"].tolist() == brute_force(date(2023, 12, 30), date(2024, 1, 6))["value"]
+    assert analytics.ranked(report, "sold", 1) == [("widget", 11.0)]
+
+
+def test_command_line(catalog, capsys):
+    assert analytics.main([catalog, "--start", "2024-01-02", "--end", "2024-01-04", "--top", "1"]) == 0
+    out = capsys.readouterr().out
+    assert "Inventory value: 1141 on 2024-01-02, 440 on 2024-01-04" in out
+    assert out.count("  ") == 3
+    with pytest.raises(SystemExit):
+        analytics.main([catalog, "--start", "2024-02-01", "--end", "2024-01-01"])
+    with pytest.raises(SystemExit):
+        analytics.main([catalog, "--start", "yesterday"])
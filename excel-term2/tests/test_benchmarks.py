@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import run
+
+
+def op(seconds, peak=None):
+    return {"min": seconds, "median": seconds, "seconds": seconds, "peak_bytes": peak}
+
+
+def results(**ops):
+    return {"cases": {"xlsx-10x10": {"ops": ops}}}
+
+
+def test_compare_flags_slowdowns_beyond_the_noise():
+    baseline = results(load=op(0.1), tiny=op(0.001))
+    assert run.compare(results(load=op(0.14), tiny=op(0.01)), baseline, 0.5) == []
+    assert run.compare(results(load=op(0.2), tiny=op(0.001)), baseline, 0.5) == \
+        ["xlsx-10x10 load: 200.0 ms, baseline 100.0 ms"]
+
+
+def test_compare_flags_peak_memory_growth():
+    baseline = results(load=op(0.1, 1024 * 1024))
+    assert len(run.compare(results(load=op(0.1, 4 * 1024 * 1024)), baseline, 0.5)) == 1
+
+
+def test_compare_reports_ops_missing_from_the_baseline():
+    baseline = results(load=op(0.1))
+    lines = run.compare(results(load=op(0.1), analytics=op(0.1), generate=op(1.0)), baseline, 0.5)
+    assert len(lines) == 1 and lines[0].startswith("xlsx-10x10 analytics: not in the baseline")
+
+
+def test_cases_missing_from_the_baseline_are_listed():
+    current = {"cases": {"xlsx-10x10": {"ops": {}}, "sqlite-5x5": {"ops": {}}}}
+    assert run.missing_cases(current, results()) == ["sqlite-5x5"]
+    assert run.compare(current, results(), 0.5) == []
+
+
+def test_baseline_covers_every_measured_op():
+    import json
+    with open(run.BASELINE_FILE, encoding="utf-8") as f:
+        baseline = json.load(f)
+    for case in baseline["cases"].values():
+        assert {"import_main", "first_sheet", "analytics", "chart_rollups"} <= set(case["ops"])
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+import main
+
+RECORDS = [
+    {"name": "Widget", "description": "first", "stock": 10, "price": 100, "date": "2024-01-01 10:00:00"},
+    {"product": "widget", "stock": 7, "date": "2024-01-02 10:00:00"},
+    {"name": "Gadget", "description": "other", "stock": 3, "price": 50, "date": "2024-01-01 12:00:00"},
+    {"product": "gadget", "name": "Gizmo", "date": "2024-01-03 12:00:00"},
+]
+
+
+@pytest.mark.parametrize("threshold", [1000, 1], ids=["in_memory", "streaming"])
+def test_bulk_import(xlsx_file, threshold):
+    report = main.bulk_import(xlsx_file, RECORDS, write_only_threshold=threshold)
+    assert report["applied"] == 4
+    assert report["rejected"] == []
+    assert not os.path.exists(xlsx_file + ".tmp")
+
+    index = main.load_index(xlsx_file)
+    assert index.sheetnames[:2] == ["Gizmo", "widget"]
+    assert index.last_record("widget")["Stock"] == 7
+    gizmo = index.last_record("Gizmo")
+    assert (gizmo["Name"], gizmo["Description"], gizmo["Stock"], gizmo["Price"]) == ("Gizmo", "other", 3, 50)
+
+
+def test_bulk_import_sqlite(sqlite_file):
+    report = main.bulk_import(sqlite_file, RECORDS)
+    assert report["applied"] == 4
+    index = main.load_index(sqlite_file)
+    assert index.has_sheet("Gizmo")
+    assert index.last_record("widget")["Stock"] == 7
+
+
+def test_bulk_import_rejects_bad_rows(tmp_path, xlsx_file):
+    source = tmp_path / "rows.jsonl"
+    source.write_text("\n".join([
+        json.dumps(RECORDS[0]),
+        "{not json",
+        json.dumps({"name": "Widget", "description": "dup", "stock": 1, "price": 1, "op": "add"}),
+        json.dumps({"product": "missing", "stock": 1}),
+        json.dumps({"product": "widget", "stock": "many"}),
+    ]))
+    report = main.bulk_import(xlsx_file, str(source))
+    assert report["applied"] == 1
+    assert [line for line, _ in report["rejected"]] == [2, 3, 4, 5]
+
+
+def test_streaming_import_syncs_before_replacing(xlsx_file, monkeypatch):
+    calls = []
+    fsync, replace = os.fsync, os.replace
+    monkeypatch.setattr(os, "fsync", lambda fd: calls.append("fsync") or fsync(fd))
+    monkeypatch.setattr(os, "replace", lambda src, dst: calls.append(("replace", src)) or replace(src, dst))
+    main.bulk_import(xlsx_file, RECORDS, write_only_threshold=1)
+    position = calls.index(("replace", xlsx_file + ".tmp"))
+    assert "fsync" in calls[:position]
+
+
+def test_import_rows_refuses_a_journaled_store(xlsx_file):
+    with main.ProductStore(xlsx_file, journal=True) as store:
+        with pytest.raises(ValueError):
+            store.import_rows(["widget"], {})
+
+
+@pytest.mark.parametrize("threshold", [1000, 1], ids=["in_memory", "streaming"])
+def test_bulk_import_reads_the_spool_back_in_chunks(xlsx_file, monkeypatch, threshold):
+    spools = []
+    monkeypatch.setattr(main, "ImportSpool", lambda spool=main.ImportSpool: spools.append(spool(chunk=1)) or spools[-1])
+    report = main.bulk_import(xlsx_file, RECORDS + [{"product": "widget", "price": 90, "date": "2024-01-04 10:00:00"}],
+                              write_only_threshold=threshold)
+    assert report["applied"] == 5
+    assert not os.path.exists(spools[0].path)
+    index = main.load_index(xlsx_file)
+    assert index.sheetnames[:2] == ["Gizmo", "widget"]
+    assert (index.products["widget"]["rows"], index.last_record("widget")["Stock"], index.last_record("widget")["Price"]) \
+        == (3, 7, 90)
+
+
+def test_bulk_import_sqlite_in_chunks(sqlite_file, monkeypatch):
+    monkeypatch.setattr(main, "ImportSpool", lambda spool=main.ImportSpool: spool(chunk=1))
+    assert main.bulk_import(sqlite_file, RECORDS)["applied"] == 4
+    index = main.load_index(sqlite_file)
+    assert index.has_sheet("Gizmo") and not index.has_sheet("gadget")
+    assert index.last_record("Gizmo")["Stock"] == 3
+
+
+def test_bulk_import_rejects_names_a_sheet_cannot_take(xlsx_file):
+    report = main.bulk_import(xlsx_file, [
+        {"name": "Nuts/Bolts", "description": "x", "stock": 1, "price": 1},
+        RECORDS[0],
+        {"product": "widget", "name": "Wid[get]"},
+    ])
+    assert report["applied"] == 1
+    assert [line for line, _ in report["rejected"]] == [1, 3]
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+tk = pytest.importorskip("tkinter")
+pytest.importorskip("matplotlib")
+
+from chart import ChartRenderer, minmax_indices
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("No display to run Tk")
+    yield root
+    root.destroy()
+
+
+def test_short_series_is_kept_whole():
+    assert minmax_indices(np.arange(10), 5).tolist() == list(range(10))
+    assert minmax_indices(np.arange(10), 0).tolist() == list(range(10))
+
+
+def test_decimation_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 1000, 100_003)
+    indices = minmax_indices(y, 500)
+    assert indices.size <= 2 * 500 + 2
+    assert indices[0] == 0 and indices[-1] == y.size - 1
+    assert np.all(np.diff(indices) > 0)
+    assert y[indices].max() == y.max() and y[indices].min() == y.min()
+    size = -(-y.size // 500)
+    for start in range(0, y.size, size):
+        bucket = y[start:start + size]
+        kept = y[indices[(indices >= start) & (indices < start + size)]]
+        assert kept.max() == bucket.max() and kept.min() == bucket.min()
+
+
+def test_renderer_reuses_lines_and_decimates(root):
+    renderer = ChartRenderer(root)
+    x = np.arange(100_000)
+    renderer.show_series({"a": (x, np.sin(x / 1000.0)), "b": (x, x)}, "t", "x", "y", legend=True)
+    line = renderer.lines["a"]
+    assert len(line.get_xdata()) <= 2 * renderer.pixel_width() + 2
+    renderer.show_series({"a": (x[:10], x[:10])}, "t", "x", "y")
+    assert renderer.lines["a"] is line
+    assert "b" not in renderer.lines
+    assert line.get_marker() == "o"
+
+
+def test_tail_update_matches_a_full_decimation():
+    rng = np.random.default_rng(2)
+    y = rng.integers(0, 1000, 20_000)
+    previous = minmax_indices(y, 300)
+    for n in (20_001, 20_050, 19_990, 25_000):
+        grown = np.concatenate([y, rng.integers(0, 1000, max(n - y.size, 0))])[:n]
+        changed = min(n, y.size) - 1
+        assert minmax_indices(grown, 300, previous, changed).tolist() == minmax_indices(grown, 300).tolist()
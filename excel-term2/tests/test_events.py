@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+
+import pytest
+
+import client
+import events
+import main
+from journal import Journal
+from server import ProductServer
+
+
+@pytest.fixture
+def listener():
+    received = []
+    events.subscribe(received.append)
+    yield received
+    events.unsubscribe(received.append)
+
+
+def test_record_events():
+    row = ["2024-01-01 00:00:00", "W", "", 1, 1]
+    assert events.record_events({"op": "add", "sheet": "w", "row": row}) == [{"type": "sheet_added", "sheet": "w", "row": row}]
+    assert [event["type"] for event in events.record_events({"op": "append", "sheet": "w", "row": row, "title": "X"})] == \
+        ["row_appended", "sheet_renamed"]
+    removed = events.record_events({"op": "delete_last_row", "sheet": "X", "title": "w"}, row, None)
+    assert [event["type"] for event in removed] == ["sheet_renamed", "row_removed"]
+    assert removed[1]["sheet"] == "w" and removed[1]["last"] is None
+
+
+def test_capture_changes_only_sees_this_thread():
+    def other_thread():
+        events.emit({"type": "reset"})
+
+    def func():
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        events.emit({"type": "sheet_deleted", "sheet": "a"})
+        return "done"
+
+    assert events.capture_changes(func) == ("done", [{"type": "sheet_deleted", "sheet": "a"}])
+
+
+def test_flushed_store_emits_after_the_save(xlsx_file, listener, monkeypatch):
+    store = main.ProductStore(xlsx_file, flush_every=0, flush_interval=0, journal=False)
+    store.add_product("Widget", "first", 10, 100)
+    store.edit_product(0, stock=9)
+    assert listener == []
+
+    monkeypatch.setattr(main, "save_changes", lambda wb, file_name: False)
+    assert not store.flush()
+    assert listener == [] and len(store.unsaved_events) == 2
+    monkeypatch.undo()
+
+    assert store.flush()
+    assert [event["type"] for event in listener] == ["sheet_added", "row_appended"]
+    assert store.unsaved_events == []
+    store.close()
+
+
+def test_journaled_store_emits_after_the_record_is_written(xlsx_file):
+    logged = []
+
+    def on_event(event):
+        logged.append(len(Journal(xlsx_file).records()))
+
+    events.subscribe(on_event)
+    try:
+        with main.ProductStore(xlsx_file, journal=True) as store:
+            store.add_product("Widget", "first", 10, 100)
+            store.edit_product(0, stock=9)
+    finally:
+        events.unsubscribe(on_event)
+    assert logged == [1, 2]
+
+
+def test_sqlite_store_emits_after_the_commit(sqlite_file):
+    seen = []
+
+    def on_event(event):
+        conn = sqlite3.connect(sqlite_file)
+        seen.append(conn.execute("SELECT COUNT(*) FROM products WHERE title = 'widget'").fetchone()[0])
+        conn.close()
+
+    events.subscribe(on_event)
+    try:
+        main.add_product(sqlite_file, "Widget", "first", 10, 100)
+    finally:
+        events.unsubscribe(on_event)
+    assert seen == [1]
+
+
+def test_daemon_reports_a_failed_save_as_a_failure(xlsx_file, monkeypatch):
+    server = ProductServer(xlsx_file)
+    assert server.start()
+    other = client.StoreClient(server.path)
+    received = []
+    other.subscribe(received.extend)
+    try:
+        save_changes = main.save_changes
+        monkeypatch.setattr(main, "save_changes", lambda wb, file_name: False)
+        with events.capture() as changes:
+            success, msg = main.add_product(xlsx_file, "Widget", "first", 10, 100)
+        assert not success and msg == f"Failed to save '{xlsx_file}', it may be in use."
+        assert changes == [] and received == []
+
+        # The failed batch was dropped, not left to be saved later
+        monkeypatch.setattr(main, "save_changes", save_changes)
+        assert main.add_product(xlsx_file, "Gadget", "other", 3, 50)[0]
+        assert main.load_index(xlsx_file).sheetnames == ["gadget", "Sheet"]
+    finally:
+        other.close()
+        server.stop()
+        for path in list(client._clients):
+            client._clients.pop(path).close()
@@ -0,0 +1,41 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("tkinter")
+pytest.importorskip("matplotlib")
+
+import gui
+
+
+def test_import_prints_nothing(capsys):
+    import importlib
+    importlib.reload(gui)
+    assert capsys.readouterr().out == ""
+
+
+def test_prepare_chart_returns_the_rollups_error(xlsx_file, monkeypatch, capsys):
+    def broken(file_name):
+        raise sqlite3.DatabaseError("file is not a database")
+    monkeypatch.setattr(gui, "load_rollups", broken)
+    renderer, rollups, error = gui.prepare_chart(xlsx_file)
+    assert rollups is None
+    assert error == "Failed to load the rollups: file is not a database"
+    assert capsys.readouterr().out == ""
+
+
+def test_prepare_chart_opens_the_rollups(xlsx_file):
+    renderer, rollups, error = gui.prepare_chart(xlsx_file)
+    assert error is None and renderer.__name__ == "ChartRenderer"
+    rollups.close()
+
+
+def test_read_workbook_leaves_the_index_for_after_the_first_paint(xlsx_file, monkeypatch):
+    def not_yet(file_name):
+        raise AssertionError("the index is loaded before the first paint")
+    monkeypatch.setattr(gui, "load_index", not_yet)
+    reader = gui.read_workbook(xlsx_file, 0)
+    try:
+        assert reader.sheetnames == ["Sheet"]
+    finally:
+        reader.close()
@@ -0,0 +1,133 @@
+import json
+import os
+
+import pytest
+
+import main
+from journal import Journal, journal_path, get_journal_seq
+from metadata import MetadataIndex, index_path
+
+
+def journaled_store(file_name):
+    return main.ProductStore(file_name, flush_every=0, flush_interval=0, journal=True)
+
+
+def data_rows(file_name, title):
+    wb = main.prepare_workbook(file_name)
+    return [row[3] for row in wb[title].iter_rows(min_row=2, values_only=True)]
+
+
+def test_operations_are_journaled_without_saving_the_workbook(xlsx_file):
+    workbook = os.stat(xlsx_file).st_mtime_ns
+    with journaled_store(xlsx_file) as store:
+        store.add_product("Widget", "first", 10, 100)
+        store.edit_product(0, stock=9)
+    assert os.stat(xlsx_file).st_mtime_ns == workbook
+    assert [record["op"] for record in Journal(xlsx_file).records()] == ["add", "append"]
+    # Recovery folds the journal into the loaded workbook
+    assert data_rows(xlsx_file, "widget") == [10, 9]
+
+
+def test_index_is_saved_on_compaction_and_replays_the_journal(xlsx_file):
+    with journaled_store(xlsx_file) as store:
+        store.add_product("Widget", "first", 10, 100)
+        store.compact()
+    saved = os.stat(index_path(xlsx_file)).st_mtime_ns
+
+    with journaled_store(xlsx_file) as store:
+        store.edit_product(0, stock=9)
+        store.edit_product(0, stock=8)
+        store.delete_last_row(0)
+    assert os.stat(index_path(xlsx_file)).st_mtime_ns == saved
+
+    index = MetadataIndex.load(xlsx_file)
+    assert index is not None
+    assert index.journal_seq == 4
+    entry = index.products["widget"]
+    assert entry["rows"] == 2
+    assert entry["last"][3] == 9
+
+
+def test_record_logged_before_applying(xlsx_file, monkeypatch):
+    def fail(self, record):
+        raise OSError("disk full")
+
+    with journaled_store(xlsx_file) as store:
+        monkeypatch.setattr(Journal, "append", fail)
+        with pytest.raises(OSError):
+            store.add_product("Widget", "first", 10, 100)
+        assert not store.index.has_sheet("widget")
+        assert store.rollups.is_empty()
+        monkeypatch.undo()
+
+
+def test_torn_trailing_record_is_ignored(xlsx_file):
+    with journaled_store(xlsx_file) as store:
+        store.add_product("Widget", "first", 10, 100)
+    with open(journal_path(xlsx_file), "ab") as f:
+        f.write(b'{"op": "append", "sheet": "widget", "row": ["2024-01-01 00:00:00", "W", "", 1, 1], "se')
+    assert data_rows(xlsx_file, "widget") == [10]
+    assert main.load_index(xlsx_file).products["widget"]["rows"] == 1
+
+
+def test_append_after_a_torn_tail_starts_a_new_line(xlsx_file):
+    with journaled_store(xlsx_file) as store:
+        store.add_product("Widget", "first", 10, 100)
+    with open(journal_path(xlsx_file), "ab") as f:
+        f.write(b'{"op": "append", "sheet": "widget", "row": ["2024-01-01 00:00:00", "W", "", 1, 1], "se')
+    with journaled_store(xlsx_file) as store:
+        assert store.edit_product(0, stock=9)[0]
+    assert data_rows(xlsx_file, "widget") == [10, 9]
+    assert [record["seq"] for record in Journal(xlsx_file).records()] == [1, 2]
+    assert main.compact_journal(xlsx_file)
+    assert data_rows(xlsx_file, "widget") == [10, 9]
+
+
+def test_crash_between_fold_and_trim_applies_records_once(xlsx_file, monkeypatch):
+    with journaled_store(xlsx_file) as store:
+        store.add_product("Widget", "first", 10, 100)
+        store.edit_product(0, stock=9)
+        monkeypatch.setattr(Journal, "discard_through", lambda self, seq: None)
+        assert store.compact()
+        monkeypatch.undo()
+    assert len(Journal(xlsx_file).records()) == 2
+    assert get_journal_seq(main.prepare_workbook(xlsx_file)) == 2
+    assert data_rows(xlsx_file, "widget") == [10, 9]
+    assert main.load_index(xlsx_file).products["widget"]["rows"] == 2
+
+
+def test_records_without_the_last_row_rebuild_the_index(xlsx_file):
+    with journaled_store(xlsx_file) as store:
+        store.add_product("Widget", "first", 10, 100)
+        store.edit_product(0, stock=9)
+        store.compact()
+        store.delete_last_row(0)
+    path = journal_path(xlsx_file)
+    records = [json.loads(line) for line in open(path, encoding="utf-8")]
+    del records[-1]["last"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+    assert MetadataIndex.load(xlsx_file) is None
+    index = main.load_index(xlsx_file)
+    assert index.products["widget"]["rows"] == 1
+    assert index.products["widget"]["last"][3] == 10
+
+
+def test_compact_journal_folds_and_trims(xlsx_file):
+    with journaled_store(xlsx_file) as store:
+        store.add_product("Widget", "first", 10, 100)
+    assert main.compact_journal(xlsx_file)
+    assert not os.path.exists(journal_path(xlsx_file))
+    assert data_rows(xlsx_file, "widget") == [10]
+
+
+def test_record_replay_would_reject_is_not_journaled(xlsx_file):
+    with journaled_store(xlsx_file) as store:
+        success, msg = store.add_product("Nuts/Bolts", "first", 10, 100)
+        assert not success and "'/'" in msg
+        store.add_product("Widget", "first", 10, 100)
+        assert not store.edit_product(0, name="Wid[get]")[0]
+    assert [record["op"] for record in Journal(xlsx_file).records()] == ["add"]
+    assert data_rows(xlsx_file, "widget") == [10]
+    assert main.add_product(xlsx_file, "Gadget", "other", 1, 1)[0]
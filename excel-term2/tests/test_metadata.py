@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+
+import main
+from metadata import MetadataIndex, index_path, restored_title, parse_date, json_row
+
+
+def test_index_matches_the_workbook(xlsx_file):
+    main.add_product(xlsx_file, "Widget", "first", 10, 100)
+    main.edit_product(xlsx_file, 0, stock=9)
+    main.add_product(xlsx_file, "Gadget", "other", 3, 50)
+    index = main.load_index(xlsx_file)
+    assert index.sheetnames == ["gadget", "widget", "Sheet"]
+    assert index.sheet_at(1) == "widget"
+    assert index.sheet_at(3) is None
+    assert index.last_record("widget")["Stock"] == 9
+    assert index.products["widget"]["rows"] == 2
+    assert index.products["Sheet"] == {"last": None, "rows": 0, "min_date": None, "max_date": None}
+    assert index.last_record("Sheet") is None
+
+    rebuilt = MetadataIndex.from_workbook(main.prepare_workbook(xlsx_file))
+    assert rebuilt.products == index.products
+
+
+@pytest.mark.parametrize("journal", [False, True], ids=["flush", "journal"])
+def test_renaming_onto_a_taken_title_numbers_it_like_the_workbook(xlsx_file, journal):
+    with main.ProductStore(xlsx_file, flush_every=0, flush_interval=0, journal=journal) as store:
+        store.add_product("Alpha", "first", 10, 100)
+        store.add_product("Beta", "other", 3, 50)
+        assert store.edit_product(0, name="alpha")[0]
+        assert not store.add_product("ALPHA", "dup", 1, 1)[0]
+        assert store.sheetnames == list(store.wb.sheetnames) == ["alpha1", "alpha", "Sheet"]
+        assert [title for (title,) in store.rollups.conn.execute("SELECT DISTINCT product FROM rollups ORDER BY product")] == \
+            ["alpha", "alpha1"]
+    assert main.load_index(xlsx_file).sheetnames == ["alpha1", "alpha", "Sheet"]
+    assert main.delete_product_sheet(xlsx_file, "alpha1")[0]
+    assert main.load_index(xlsx_file).sheetnames == ["alpha", "Sheet"]
+
+
+def test_free_title():
+    index = MetadataIndex(["alpha", "Alpha1", "beta"], {})
+    assert index.free_title("gamma") == "gamma"
+    assert index.free_title("ALPHA") == "ALPHA2"
+    assert index.free_title("beta", "beta") == "beta"
+    # openpyxl counts the sheet being renamed as taken
+    assert index.free_title("Beta", "beta") == "Beta1"
+
+
+def test_stale_index_is_rebuilt(xlsx_file):
+    main.add_product(xlsx_file, "Widget", "first", 10, 100)
+    assert MetadataIndex.load(xlsx_file) is not None
+    wb = main.prepare_workbook(xlsx_file)
+    wb["widget"].append([datetime(2030, 1, 1), "Widget", "outside", 1, 1])
+    wb.save(xlsx_file)
+    assert MetadataIndex.load(xlsx_file) is None
+    assert main.load_index(xlsx_file).last_record("widget")["Description"] == "outside"
+
+
+def test_missing_or_corrupt_index(xlsx_file):
+    with open(index_path(xlsx_file), "w") as f:
+        f.write("{")
+    assert MetadataIndex.load(xlsx_file) is None
+    assert main.load_index(xlsx_file).sheetnames == ["Sheet"]
+
+
+def test_apply_event_follows_the_store():
+    index = MetadataIndex()
+    index.apply_event({"type": "sheet_added", "sheet": "a", "row": ["2024-01-01 00:00:00", "A", "", 1, 1]})
+    index.apply_event({"type": "row_appended", "sheet": "a", "row": ["2024-01-02 00:00:00", "A", "", 2, 1]})
+    index.apply_event({"type": "sheet_renamed", "sheet": "a", "title": "B"})
+    assert index.sheetnames == ["B"]
+    assert index.products["B"]["max_date"] == "2024-01-02 00:00:00"
+    index.apply_event({"type": "row_removed", "sheet": "B", "row": None, "last": ["2024-01-01 00:00:00", "A", "", 1, 1]})
+    assert index.products["B"]["rows"] == 1
+    assert index.last_record("B")["Stock"] == 1
+    index.apply_event({"type": "sheet_deleted", "sheet": "B"})
+    assert not index.has_sheet("B")
+
+
+def test_restored_title():
+    assert restored_title("Widget", "Widget", "Gadget") == "widget"
+    assert restored_title("Widget", "Gizmo", "Gadget") == "Gizmo"
+    assert restored_title("Widget", "Widget", "WIDGET") is None
+
+
+def test_dates_round_trip():
+    when = datetime(2024, 1, 2, 3, 4, 5)
+    assert parse_date(json_row([when])[0]) == when
+    assert parse_date("not a date") is None
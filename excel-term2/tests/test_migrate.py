@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from openpyxl import Workbook, load_workbook
+
+import main
+from metadata import MetadataIndex
+from migrate import migrate_dates
+from utils import HEADERS
+
+
+def string_dated_workbook(file_name):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "widget"
+    ws.append(HEADERS)
+    ws.append(["2024-01-01 10:00:00", "Widget", "d", 10, 100])
+    ws.append([datetime(2024, 1, 2, 10), "Widget", "d", 9, 100])
+    ws.append(["not a date", "Widget", "d", 8, 100])
+    wb.save(file_name)
+
+
+def dates(file_name):
+    wb = load_workbook(file_name, read_only=True)
+    try:
+        return [row[0] for row in wb["widget"].iter_rows(min_row=2, values_only=True)]
+    finally:
+        wb.close()
+
+
+def test_migration_converts_string_dates_once(tmp_path):
+    file_name = str(tmp_path / "old.xlsx")
+    string_dated_workbook(file_name)
+    assert migrate_dates(file_name)["converted"] == 1
+    assert dates(file_name) == [datetime(2024, 1, 1, 10), datetime(2024, 1, 2, 10), "not a date"]
+    assert migrate_dates(file_name)["converted"] == 0
+
+
+def test_fresh_sidecars_survive_the_migration(tmp_path):
+    file_name = str(tmp_path / "old.xlsx")
+    string_dated_workbook(file_name)
+    main.load_index(file_name)
+    main.load_rollups(file_name).close()
+    migrate_dates(file_name)
+    index = MetadataIndex.load(file_name)
+    assert index is not None and index.products["widget"]["rows"] == 3
+    rollups = main.load_rollups(file_name)
+    try:
+        assert rollups.bucket_count("widget", "day") == 2
+    finally:
+        rollups.close()
+
+
+def test_databases_are_left_alone(sqlite_file):
+    assert migrate_dates(sqlite_file)["converted"] == 0
@@ -0,0 +1,53 @@
+import json
+
+from perf import PerfRecorder, percentile
+
+
+def test_percentile_is_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.5) == 51
+    assert percentile(samples, 0.95) == 95
+    assert percentile([3.0], 0.95) == 3.0
+
+
+def test_disabled_recorder_records_nothing():
+    recorder = PerfRecorder(enabled=False)
+    with recorder.span("block"):
+        pass
+    recorder.timed("call")(lambda: None)()
+    recorder.count("parse")
+    recorder.observe("bytes", 10)
+    assert recorder.snapshot() == {"spans": {}, "values": {}, "counters": {}, "actions": {}}
+
+
+def test_spans_counters_and_actions(tmp_path):
+    recorder = PerfRecorder(enabled=True, max_samples=2)
+    for _ in range(3):
+        with recorder.span("block"):
+            pass
+    assert recorder.timed("call")(lambda x: x * 2)(4) == 8
+    recorder.begin_action("filter")
+    recorder.count("parse", 2)
+    recorder.begin_action("filter")
+    recorder.count("parse")
+    recorder.observe("bytes", 100)
+
+    data = recorder.snapshot()
+    assert data["spans"]["block"]["count"] == 3
+    assert data["spans"]["call"]["count"] == 1
+    assert data["counters"] == {"parse": 3}
+    assert data["actions"]["filter"] == {"count": 2, "per_action": {"parse": 1.5}}
+    assert data["values"]["bytes"]["mean"] == 100
+    assert "block" in recorder.format_table()
+
+    trace = tmp_path / "trace.json"
+    recorder.export_trace(str(trace))
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert len(events) == 4 and {event["ph"] for event in events} == {"X"}
+
+
+def test_reset_clears_everything():
+    recorder = PerfRecorder(enabled=True)
+    recorder.count("parse")
+    recorder.reset()
+    assert recorder.snapshot()["counters"] == {}
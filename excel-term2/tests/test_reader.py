@@ -0,0 +1,132 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+from reader import LazySheet, RowSource, WorkbookReader
+from utils import HEADERS
+
+
+def fill(file_name, products=3, rows=5):
+    records = []
+    for product in range(products):
+        records.append({"name": f"p{product}", "description": "d", "stock": 0, "price": 1, "date": "2024-01-01 00:00:00"})
+        records += [{"product": f"p{product}", "stock": row, "date": f"{datetime(2024, 1, 1) + timedelta(hours=row):%Y-%m-%d %H:%M:%S}"}
+                    for row in range(1, rows)]
+    main.bulk_import(file_name, records)
+
+
+def test_row_source_is_abstract():
+    with pytest.raises(TypeError):
+        RowSource()
+
+    class Partial(RowSource):
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_lazy_sheet_range_access():
+    sheet = LazySheet("p", [tuple(HEADERS)] + [(datetime(2024, 1, day), "P", "", day, 1) for day in range(1, 11)])
+    assert len(sheet) == 10
+    assert [row[3] for row in sheet.rows(2, 5)] == [3, 4, 5]
+    assert sheet.find_date(datetime(2024, 1, 4, 12)) == 4
+    assert sheet.find_date(datetime(2025, 1, 1)) == 10
+    sheet.append(["2024-01-11 00:00:00", "P", "", 11, 1])
+    assert sheet.date_at(10) == datetime(2024, 1, 11)
+
+
+def test_sheets_are_parsed_on_demand_and_evicted(xlsx_file):
+    fill(xlsx_file)
+    reader = WorkbookReader(xlsx_file, cache_size=2)
+    try:
+        assert "p0" not in reader
+        assert len(reader["p0"]) == 5
+        reader["p1"], reader["p2"]
+        assert "p0" not in reader and "p2" in reader
+        with pytest.raises(KeyError):
+            reader["missing"]
+    finally:
+        reader.close()
+
+
+def test_journal_is_overlaid(xlsx_file):
+    fill(xlsx_file)
+    with main.ProductStore(xlsx_file, journal=True) as store:
+        store.add_product("New", "d", 1, 1)
+        store.edit_product(store.sheetnames.index("p0"), name="Renamed", stock=99)
+        store.delete_last_row(store.sheetnames.index("p1"))
+    reader = WorkbookReader(xlsx_file)
+    try:
+        assert reader.sheetnames[:1] == ["new"]
+        assert "p0" not in reader.sheetnames
+        assert reader["Renamed"].rows(5, 6)[0][3] == 99
+        assert len(reader["p1"]) == 4
+    finally:
+        reader.close()
+
+
+def test_open_reader_survives_a_save(xlsx_file):
+    fill(xlsx_file)
+    reader = WorkbookReader(xlsx_file, cache_size=1)
+    try:
+        reader["p0"]
+        with main.ProductStore(xlsx_file, flush_every=1, journal=False) as store:
+            store.edit_product(store.sheetnames.index("p1"), stock=42)
+        # Parsed after the save, from the file as it was when opened
+        assert [row[3] for row in reader["p1"].rows(0, 5)] == [0, 1, 2, 3, 4]
+    finally:
+        reader.close()
+    reader = WorkbookReader(xlsx_file)
+    try:
+        assert reader["p1"].rows(5, 6)[0][3] == 42
+    finally:
+        reader.close()
+
+
+def test_lazy_sheet_reads_only_what_is_asked_for():
+    rows = iter([tuple(HEADERS)] + [(datetime(2024, 1, 1), "P", "", i, 1) for i in range(10_000)])
+    sheet = LazySheet("p", rows, 10_000)
+    assert len(sheet) == 10_000
+    assert [row[3] for row in sheet.rows(0, 3)] == [0, 1, 2]
+    assert len(sheet._read) == 3
+    sheet.pop()
+    sheet.append(["2024-01-02 00:00:00", "P", "", -1, 1])
+    assert [row[3] for row in sheet.rows(9_998, 10_000)] == [9_998, -1]
+    assert len(list(sheet.iter_rows(min_row=2))) == 10_000
+
+
+def test_lazy_sheet_trusts_the_rows_over_an_overstated_count():
+    sheet = LazySheet("p", [tuple(HEADERS), (None, "P", "", 1, 1)], 5)
+    assert [row[3] for row in sheet.rows(0, 5)] == [1]
+    assert len(sheet) == 1
+
+
+def test_reader_opens_a_large_sheet_without_reading_it(xlsx_file):
+    fill(xlsx_file, products=1, rows=3000)
+    reader = WorkbookReader(xlsx_file)
+    try:
+        sheet = reader["p0"]
+        assert len(sheet) == 3000
+        assert len(sheet.rows(0, 50)) == 50
+        assert len(sheet._read) == 50
+        assert sheet.rows(2999, 3000)[0][3] == 2999
+    finally:
+        reader.close()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="Needs /proc to list open files")
+def test_reader_does_not_keep_the_file_open(xlsx_file):
+    fill(xlsx_file)
+    reader = WorkbookReader(xlsx_file)
+    try:
+        reader["p0"].rows(0, 5)
+        open_files = [os.path.realpath(os.path.join("/proc/self/fd", fd)) for fd in os.listdir("/proc/self/fd")]
+        assert os.path.realpath(xlsx_file) not in open_files
+        assert main.add_product(xlsx_file, "New", "d", 1, 1)[0]
+        assert len(reader["p0"]) == 5
+    finally:
+        reader.close()
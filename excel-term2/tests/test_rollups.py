@@ -0,0 +1,109 @@
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+import main
+from metadata import file_stamp
+from rollups import Rollups, bucket_rows
+
+RECORDS = [
+    {"name": "Widget", "description": "first", "stock": 10, "price": 100, "date": "2024-01-01 10:00:00"},
+    {"product": "widget", "price": 120, "date": "2024-01-01 15:00:00"},
+    {"product": "widget", "stock": 7, "date": "2024-01-02 10:00:00"},
+    {"name": "Gadget", "description": "other", "stock": 3, "price": 50, "date": "2024-01-01 12:00:00"},
+    {"product": "gadget", "name": "Gizmo", "date": "2024-01-03 12:00:00"},
+]
+
+
+@pytest.fixture
+def rollups():
+    rollups = Rollups(sqlite3.connect(":memory:"))
+    yield rollups
+    rollups.close()
+
+
+def row(day, hour, stock, price):
+    return datetime(2024, 1, day, hour), "A", "", stock, price
+
+
+@pytest.mark.parametrize("threshold", [1000, 1], ids=["in_memory", "streaming"])
+def test_bulk_import_rebuilds_rollups(xlsx_file, threshold):
+    main.bulk_import(xlsx_file, RECORDS, write_only_threshold=threshold)
+    if threshold > len(RECORDS):
+        # The in-memory import saves its rollups with the workbook
+        saved = Rollups.open(xlsx_file)
+        assert saved.stamp() == file_stamp(xlsx_file)
+        saved.close()
+    rollups = main.load_rollups(xlsx_file)
+    try:
+        widget = rollups.series("widget", "day")
+        assert widget.open.tolist() == [100, 120]
+        assert widget.high.tolist() == [120, 120]
+        assert widget.stock.tolist() == [10, 7]
+        assert rollups.series("Gizmo", "month").count.tolist() == [2]
+        assert len(rollups.series("gadget", "day")) == 0
+    finally:
+        rollups.close()
+
+
+def test_remove_row_refolds_coarser_buckets(rollups):
+    rows = [row(1, 9, 10, 100), row(2, 9, 9, 150), row(2, 12, 8, 90)]
+    rollups.add_rows("A", rows)
+    rollups.remove_row("A", rows[-1], rows[1:2])
+    day = rollups.series("A", "day")
+    assert day.low.tolist() == [100, 150] and day.count.tolist() == [1, 1]
+    week = rollups.series("A", "week")
+    assert (week.low.tolist(), week.close.tolist(), week.count.tolist()) == ([100], [150], [2])
+
+    expected = Rollups(sqlite3.connect(":memory:"))
+    expected.add_rows("A", rows[:2])
+    for granularity in ("day", "week", "month"):
+        assert rollups.series("A", granularity).close.tolist() == expected.series("A", granularity).close.tolist()
+    expected.close()
+
+
+def test_price_change_day(rollups):
+    rollups.add_rows("A", [row(1, 9, 10, 100), row(2, 9, 9, 100), row(3, 9, 9, 100)])
+    assert rollups.price_change_day("A") is None
+    rollups.add_rows("A", [row(4, 9, 9, 110)])
+    assert rollups.price_change_day("A") == "2024-01-04"
+    rollups.add_rows("A", [row(5, 9, 9, 110), row(5, 10, 9, 120), row(5, 11, 9, 110)])
+    assert rollups.price_change_day("A") == "2024-01-05"
+
+
+def test_pick_prefers_the_coarsest_granularity(rollups):
+    rollups.merge("A", bucket_rows(row(day, 9, 1, day) for day in range(1, 29)))
+    assert rollups.pick("A", 20) == "day"
+    assert rollups.pick("A", 4) == "week"
+    assert rollups.pick("A", 1) == "month"
+    assert rollups.pick("A", 100) is None
+    assert rollups.pick("A", 5, date(2024, 1, 1), date(2024, 1, 7)) == "day"
+
+
+def test_rename_replaces_buckets_left_under_the_new_title(rollups):
+    rollups.add_rows("A", [row(1, 9, 10, 100)])
+    rollups.add_rows("B", [row(1, 9, 5, 50)])
+    rollups.rename("A", "B")
+    assert rollups.series("B", "day").close.tolist() == [100]
+    assert len(rollups.series("A", "day")) == 0
+
+
+@pytest.mark.parametrize("journal", [False, True], ids=["flush", "journal"])
+def test_failed_update_leaves_the_rollups_to_be_rebuilt(xlsx_file, monkeypatch, journal):
+    with main.ProductStore(xlsx_file, flush_every=0, flush_interval=0, journal=journal) as store:
+        store.add_product("Widget", "first", 10, 100)
+
+        def broken(*args):
+            raise sqlite3.IntegrityError("UNIQUE constraint failed")
+        monkeypatch.setattr(store.rollups, "apply_record", broken)
+        assert store.edit_product(0, price=150)[0]
+        assert store.rollups_stale
+    saved = Rollups.open(xlsx_file)
+    assert saved.stamp() != file_stamp(xlsx_file)
+    saved.close()
+    rollups = main.load_rollups(xlsx_file)
+    try:
+        assert rollups.series("widget", "day").close.tolist() == [150]
+    finally:
+        rollups.close()
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+import main
+from events import capture_changes
+from search import ProductSearch, parse_query
+
+NOW = datetime(2024, 3, 10, 12)
+
+RECORDS = [
+    {"name": "Red Widget", "description": "steel bolt", "stock": 10, "price": 100, "date": "2024-03-01 10:00:00"},
+    {"product": "red widget", "price": 120, "date": "2024-03-05 10:00:00"},
+    {"product": "red widget", "stock": 4, "date": "2024-03-08 10:00:00"},
+    {"name": "Blue Gadget", "description": "plastic", "stock": 30, "price": 50, "date": "2024-02-01 12:00:00"},
+    {"name": "Gizmo", "description": "steel spring", "stock": 2, "price": 80, "date": "2024-03-09 12:00:00"},
+]
+
+QUERIES = ["", "steel", "*idge", "stock<10", "price>=80 steel", "changed<7d", "date>30d", "wid gad"]
+
+
+@pytest.fixture
+def catalog(xlsx_file):
+    main.bulk_import(xlsx_file, RECORDS)
+    return xlsx_file
+
+
+def test_parse_query():
+    assert parse_query("Red *idg", NOW) == {"words": ["red"], "parts": ["idg"]}
+    assert parse_query("price>=10 price<20", NOW)["price"] == (10, 20)
+    assert parse_query("stock=5", NOW)["stock"] == (5, 6)
+    assert parse_query("changed<7d", NOW)["changed"] == ("2024-03-03", None)
+    assert parse_query("date=2024-03-01", NOW)["date"] == ("2024-03-01 00:00:00", "2024-03-02 00:00:00")
+    with pytest.raises(ValueError):
+        parse_query("price<cheap", NOW)
+    with pytest.raises(ValueError):
+        parse_query("date>yesterday", NOW)
+
+
+def test_query(catalog):
+    search = main.product_search(catalog)
+    assert len(search) == 3
+    assert search.search("steel") == ["gizmo", "red widget"]
+    assert search.search("*idge") == ["red widget"]
+    assert search.search("gad") == ["blue gadget"]
+    assert search.search("stock<10") == ["gizmo", "red widget"]
+    assert search.query(price=(80, 101)) == ["gizmo"]
+    assert search.query(changed=("2024-03-05", None)) == ["red widget"]
+    assert search.query(date=(None, "2024-03-01")) == ["blue gadget"]
+    with pytest.raises(ValueError):
+        search.query(colour=(None, None))
+
+
+def test_apply_event_matches_a_rebuild(catalog):
+    index = main.load_index(catalog)
+    rollups = main.load_rollups(catalog)
+    search = ProductSearch(index, rollups)
+    operations = [
+        (main.edit_product, catalog, 2, None, None, None, 130),
+        (main.delete_last_row, catalog, 2),
+        (main.edit_product, catalog, 0, "Gadget Pro", None, 25, None),
+        (main.add_product, catalog, "Spanner", "steel tool", 7, 15),
+        (main.delete_last_row, catalog, 0),
+        (main.delete_product_sheet, catalog, "blue gadget"),
+    ]
+    try:
+        for func, *args in operations:
+            (success, msg), changes = capture_changes(func, *args)
+            assert success, msg
+            for event in changes:
+                index.apply_event(event)
+                search.apply_event(event)
+
+            rebuilt_rollups = main.load_rollups(catalog)
+            rebuilt = ProductSearch(main.load_index(catalog), rebuilt_rollups)
+            rebuilt_rollups.close()
+            assert search.products.keys() == rebuilt.products.keys()
+            for title, product in rebuilt.products.items():
+                assert search.products[title]["changed"] == product["changed"], title
+            for text in QUERIES:
+                assert search.query(**parse_query(text, NOW)) == rebuilt.query(**parse_query(text, NOW)), text
+    finally:
+        rollups.close()
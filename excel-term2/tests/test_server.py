@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+import client
+import events
+import main
+from server import ProductServer
+
+
+@pytest.fixture
+def server(store_file):
+    server = ProductServer(store_file)
+    assert server.start()
+    yield server
+    server.stop()
+    for path in list(client._clients):
+        client._clients.pop(path).close()
+
+
+def test_requests_go_through_the_daemon(server):
+    file_name = server.file_name
+    assert client.get_client(file_name) is not None
+    with events.capture() as changes:
+        assert main.add_product(file_name, "Widget", "first", 10, 100)[0]
+        assert main.edit_product(file_name, 0, stock=9)[0]
+    assert [event["type"] for event in changes] == ["sheet_added", "row_appended"]
+    assert [event["seq"] for event in changes] == [1, 2]
+    # Acknowledged once saved, so a fresh view of the file has it
+    assert main.load_index(file_name).last_record("widget")["Stock"] == 9
+
+
+def test_sheets_travel_as_titles(server, monkeypatch):
+    file_name = server.file_name
+    assert main.add_product(file_name, "Widget", "first", 10, 100)[0]
+    sent = []
+    daemon = client.get_client(file_name)
+    request = daemon.request
+    monkeypatch.setattr(daemon, "request", lambda op, *args: sent.append((op, args[0])) or request(op, *args))
+    assert main.edit_product(file_name, 0, stock=9)[0]
+    # Another client's sheet shifts the positions, the title still names the product
+    assert main.add_product(file_name, "Gadget", "other", 3, 50)[0]
+    assert main.delete_last_row(file_name, "widget")[0]
+    assert sent == [("edit_product", "widget"), ("add_product", "Gadget"), ("delete_last_row", "widget")]
+    assert main.load_index(file_name).last_record("widget")["Stock"] == 10
+    assert main.edit_product(file_name, "gizmo", stock=1) == (False, "Product sheet 'gizmo' does not exist.")
+    assert main.edit_product(file_name, 5, stock=1) == (False, "Invalid Sheet Index.")
+
+
+def test_other_clients_are_notified(server):
+    file_name = server.file_name
+    other = client.StoreClient(server.path)
+    received, done = [], threading.Event()
+    other.subscribe(lambda changes: received.extend(changes) or done.set())
+    try:
+        assert main.add_product(file_name, "Widget", "first", 10, 100)[0]
+        assert done.wait(5)
+        assert received[0]["type"] == "sheet_added" and received[0]["sheet"] == "widget"
+    finally:
+        other.close()
+
+
+def test_unknown_operations_are_refused(server):
+    assert client.get_client(server.file_name).request("drop_everything") == (False, "Unknown operation 'drop_everything'.")
+
+
+def test_second_daemon_does_not_start(server):
+    second = ProductServer(server.file_name)
+    assert not second.start()
+    second.store.close()
+
+
+def test_bulk_import_refuses_while_a_daemon_runs(server):
+    report = main.bulk_import(server.file_name, [])
+    assert report["applied"] == 0 and "stop it" in report["rejected"][0][1]
@@ -0,0 +1,51 @@
+import main
+from sqlite_store import SQLiteReader, SQLiteStore
+
+
+def fill(file_name):
+    records = [{"name": "Widget", "description": "d", "stock": 10, "price": 100, "date": "2024-01-01 00:00:00"}]
+    records += [{"product": "widget", "stock": 10 - day, "date": f"2024-01-{day:02d} 00:00:00"} for day in range(2, 21)]
+    records.append({"name": "Gadget", "description": "d", "stock": 1, "price": 5, "date": "2024-01-01 00:00:00"})
+    main.bulk_import(file_name, records)
+
+
+def test_store_matches_the_workbook_backend(tmp_path):
+    results = []
+    for suffix in ("xlsx", "db"):
+        file_name = str(tmp_path / f"products.{suffix}")
+        main.create_storage(file_name)
+        main.add_product(file_name, "Widget", "first", 10, 100)
+        main.edit_product(file_name, 0, name="Gizmo", stock=5)
+        main.add_product(file_name, "Gadget", "other", 1, 5)
+        main.delete_last_row(file_name, 1)
+        index = main.load_index(file_name)
+        results.append(([title for title in index.sheetnames if title != "Sheet"],
+                         {title: (entry["rows"], entry["last"][1:]) for title, entry in index.products.items() if entry["rows"]}))
+    assert results[0] == results[1]
+    assert results[1][0] == ["gadget", "widget"]
+
+
+def test_reader_streams_rows_in_chunks(sqlite_file, monkeypatch):
+    import sqlite_store
+    monkeypatch.setattr(sqlite_store, "SQLITE_FETCH_ROWS", 3)
+    fill(sqlite_file)
+    reader = SQLiteReader(sqlite_file)
+    try:
+        sheet = reader["widget"]
+        assert len(sheet) == 20
+        assert [row[3] for row in sheet.iter_rows(min_row=2)] == [10] + [10 - day for day in range(2, 21)]
+        assert sheet.rows(18, 20)[-1][3] == -10
+        assert sheet.date_at(0).startswith("2024-01-01")
+    finally:
+        reader.close()
+
+
+def test_export_and_import_round_trip(tmp_path, sqlite_file):
+    fill(sqlite_file)
+    xlsx_file = str(tmp_path / "export.xlsx")
+    assert main.export_xlsx(sqlite_file, xlsx_file)
+    copy = str(tmp_path / "copy.db")
+    assert main.import_xlsx(xlsx_file, copy)
+    with SQLiteStore(sqlite_file) as original, SQLiteStore(copy) as imported:
+        assert imported.sheetnames == original.sheetnames
+        assert imported.metadata_index().products == original.metadata_index().products
@@ -0,0 +1,67 @@
+import os
+
+from openpyxl import load_workbook
+
+import main
+
+
+def sheet_rows(file_name, title):
+    wb = load_workbook(file_name, read_only=True)
+    try:
+        return [row for row in wb[title].iter_rows(min_row=2, values_only=True)]
+    finally:
+        wb.close()
+
+
+def test_store_batches_saves(xlsx_file):
+    store = main.ProductStore(xlsx_file, flush_every=3, flush_interval=0, journal=False)
+    saved = os.path.getmtime(xlsx_file), os.path.getsize(xlsx_file)
+    store.add_product("Widget", "first", 10, 100)
+    store.edit_product(0, stock=9)
+    assert store.pending == 2
+    assert (os.path.getmtime(xlsx_file), os.path.getsize(xlsx_file)) == saved
+    store.edit_product(0, stock=8)
+    assert store.pending == 0
+    assert [row[3] for row in sheet_rows(xlsx_file, "widget")] == [10, 9, 8]
+    assert store.close()
+
+
+def test_close_saves_pending_changes(xlsx_file):
+    with main.ProductStore(xlsx_file, flush_every=0, flush_interval=0, journal=False) as store:
+        store.add_product("Widget", "first", 10, 100)
+    assert len(sheet_rows(xlsx_file, "widget")) == 1
+
+
+def test_edit_renames_and_delete_last_row_restores(xlsx_file):
+    with main.ProductStore(xlsx_file, flush_every=0, flush_interval=0, journal=False) as store:
+        store.add_product("Widget", "first", 10, 100)
+        assert store.edit_product(0, name="Gadget", price=120)[0]
+        assert store.sheetnames[0] == "Gadget"
+        assert store.delete_last_row(0)[0]
+        assert store.sheetnames[0] == "widget"
+        assert store.delete_last_row(0) == (True, "Last row of widget deleted successfully.")
+        assert store.delete_last_row(0) == (False, "Cannot delete the header.")
+
+
+def test_module_operations(store_file):
+    assert main.add_product(store_file, "Widget", "first", 10, 100)[0]
+    assert main.add_product(store_file, "Widget", "again", 1, 1) == (False, "Product sheet 'widget' already exist.")
+    assert main.edit_product(store_file, 0, stock=5)[0]
+    assert main.load_index(store_file).last_record("widget")["Stock"] == 5
+    assert main.delete_last_row(store_file, 0)[0]
+    assert main.delete_product_sheet(store_file, "widget")[0]
+    assert not main.load_index(store_file).has_sheet("widget")
+
+
+def test_module_operations_report_a_failed_save(xlsx_file, monkeypatch):
+    monkeypatch.setattr(main, "save_changes", lambda wb, file_name: False)
+    success, msg = main.add_product(xlsx_file, "Widget", "first", 10, 100)
+    assert not success
+    assert "Failed to save" in msg
+    monkeypatch.undo()
+    assert not main.load_index(xlsx_file).has_sheet("widget")
+
+
+def test_failed_operation_is_not_reported_as_a_save_failure(xlsx_file, monkeypatch):
+    monkeypatch.setattr(main, "save_changes", lambda wb, file_name: False)
+    assert main.edit_product(xlsx_file, 5, stock=1) == (False, "Invalid Sheet Index.")
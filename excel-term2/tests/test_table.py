@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from reader import LazySheet
+from table import VirtualTable
+from utils import HEADERS
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("No display to run Tk")
+    yield root
+    root.destroy()
+
+
+def sheet(count):
+    start = datetime(2024, 1, 1)
+    return LazySheet("widget", [tuple(HEADERS)] + [
+        (start + timedelta(days=i), "Widget", "", i, 100) for i in range(count)])
+
+
+def page_stock(table):
+    return [int(table.tree.item(item)["values"][3]) for item in table.tree.get_children()]
+
+
+def test_only_the_page_is_materialized(root):
+    table = VirtualTable(root, page_size=10, buffer_rows=5)
+    table.set_source(sheet(1000))
+    assert page_stock(table) == list(range(10))
+    table.scroll_to(500)
+    assert page_stock(table) == list(range(500, 510))
+    table.scroll_to(5000)
+    assert page_stock(table) == list(range(990, 1000))
+    assert table.position_label.cget("text") == "991-1000 of 1000"
+
+
+def test_jump_to_date(root):
+    table = VirtualTable(root, page_size=10)
+    table.set_source(sheet(100))
+    table.jump_entry.insert(0, "2024-02-01")
+    table.jump_to_date()
+    assert page_stock(table)[0] == 31
+
+
+def test_rows_appended_and_removed_on_the_last_page(root):
+    source = sheet(5)
+    table = VirtualTable(root, page_size=10)
+    table.set_source(source)
+    source.append(["2024-02-01 00:00:00", "Widget", "", 5, 100])
+    table.row_appended()
+    assert page_stock(table) == list(range(6))
+    source.pop()
+    table.row_removed()
+    assert page_stock(table) == list(range(5))
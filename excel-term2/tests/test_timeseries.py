@@ -0,0 +1,70 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from timeseries import SeriesCache, SheetSeries, to_datetime64
+
+ROWS = [
+    (datetime(2024, 1, 3, 9), "A", "", 8, 110),
+    (datetime(2024, 1, 1, 9), "A", "", 10, 100),
+    (None, "A", "", 1, 1),
+    ("2024-01-02 09:00:00", "A", "", 9, 105),
+    (datetime(2024, 1, 5, 9), "A", "", 7, None),
+]
+
+
+class Sheets(dict):
+    """Minimal workbook: title -> rows, with ``iter_rows`` like a worksheet."""
+
+    def __getitem__(self, title):
+        rows = dict.__getitem__(self, title)
+
+        class Sheet:
+            def iter_rows(self, min_row=1, values_only=True):
+                return iter(rows[min_row - 1:])
+        return Sheet()
+
+
+def test_series_sorts_and_skips_undated_rows():
+    series = SheetSeries.from_rows(ROWS)
+    assert len(series) == 4
+    assert series.stock.tolist() == [10, 9, 8, 7]
+    assert series.price.tolist() == [100, 105, 110, 0]
+
+
+def test_to_datetime64_mixes_strings_and_blanks():
+    dates = to_datetime64(["2024-01-02 09:00:00", None, "garbage"])
+    assert dates[0] == np.datetime64("2024-01-02T09:00:00")
+    assert np.isnat(dates[1]) and np.isnat(dates[2])
+
+
+def test_window_covers_whole_days():
+    series = SheetSeries.from_rows(ROWS)
+    dates, stock, price = series.between(date(2024, 1, 2), date(2024, 1, 3))
+    assert stock.tolist() == [9, 8]
+    assert series.price_changes(date(2024, 1, 1), date(2024, 1, 3)).tolist() == [5, 5]
+    assert len(series.between(date(2024, 2, 1))[0]) == 0
+
+
+def test_cache_builds_once_and_invalidates():
+    sheets = Sheets(a=[("Transaction Date",)] + list(ROWS))
+    cache = SeriesCache()
+    first = cache.get(sheets, "a")
+    assert cache.get(sheets, "a") is first
+    cache.invalidate("a")
+    assert "a" not in cache
+    assert cache.get(sheets, "a") is not first
+
+
+def test_append_and_pop_grow_in_place():
+    series = SheetSeries.from_rows(ROWS)
+    for day in range(6, 40):
+        assert series.append((datetime(2024, 1, 1, 9) + timedelta(days=day), "A", "", day, day))
+    assert not series.append((datetime(2023, 12, 1), "A", "", 1, 1))
+    assert len(series) == 38
+    assert series.stock[-1] == 39 and series.dates.size == series.price.size == 38
+    assert series.pop((datetime(2024, 1, 1, 9) + timedelta(days=39), "A", "", 39, 39))
+    assert not series.pop((datetime(2024, 1, 1, 9), "A", "", 10, 100))
+    assert len(series) == 37 and series.stock[-1] == 38
+    assert series.append((datetime(2024, 6, 1), "A", "", 5, 6))
+    assert series.stock[-2:].tolist() == [38, 5]
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+import main
+import reader
+import worker
+from aggregate import aggregate_workbook
+from worker import IOWorker, Job, Cancelled, check_cancelled
+
+
+class FakeRoot:
+    """Stands in for Tk: ``after`` callbacks only run when ``pump`` is called."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def pump(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def io_worker():
+    root = FakeRoot()
+    io_worker = IOWorker(root)
+    yield root, io_worker
+    io_worker.shutdown()
+
+
+def test_jobs_run_in_order_and_deliver_on_the_tk_thread(io_worker):
+    root, io_worker = io_worker
+    results = []
+    io_worker.submit("write", lambda: "saved", on_done=results.append)
+    io_worker.submit("read", lambda: "loaded", on_done=results.append)
+    assert io_worker.state == "write"
+    wait_until(lambda: io_worker._results.qsize() == 2)
+    assert results == []
+    root.pump()
+    assert results == ["saved", "loaded"]
+    assert io_worker.state is None
+
+
+def test_second_write_is_refused_while_one_is_pending(io_worker):
+    root, io_worker = io_worker
+    release = threading.Event()
+    assert io_worker.submit("write", release.wait) is not None
+    assert io_worker.submit("write", lambda: None) is None
+    release.set()
+
+
+def test_cancelled_load_stops_between_chunks(io_worker):
+    root, io_worker = io_worker
+    started, chunks, results = threading.Event(), [], []
+
+    def load():
+        started.set()
+        for chunk in range(1000):
+            check_cancelled()
+            chunks.append(chunk)
+            time.sleep(0.01)
+        return "stale"
+
+    io_worker.submit("read", load, on_done=results.append, group="sheet")
+    started.wait(5)
+    io_worker.cancel("read", group="sheet")
+    io_worker.submit("read", lambda: "fresh", on_done=results.append, group="sheet")
+    wait_until(lambda: io_worker._results.qsize() == 1)
+    root.pump()
+    assert results == ["fresh"]
+    assert len(chunks) < 1000
+
+
+def test_check_cancelled_outside_a_job_does_nothing():
+    check_cancelled()
+
+
+def cancelled_job():
+    job = Job("read", None, ())
+    job.cancel()
+    return job
+
+
+def test_loaders_check_for_cancellation(store_file, monkeypatch):
+    main.add_product(store_file, "Widget", "first", 10, 100)
+    view = main.open_reader(store_file)
+    monkeypatch.setattr(worker._local, "job", cancelled_job(), raising=False)
+    monkeypatch.setattr(reader, "CANCEL_CHECK_ROWS", 1)
+    try:
+        with pytest.raises(Cancelled):
+            aggregate_workbook(view, view.sheetnames)
+        with pytest.raises(Cancelled):
+            list(view["widget"].iter_rows(min_row=2))
+    finally:
+        view.close()
@@ -0,0 +1,182 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_datetime64(values) -> np.ndarray:
+    """Convert transaction dates (datetimes or strings) to datetime64[s], NaT for blanks."""
+    values = values if isinstance(values, list) else list(values)
+    try:
+        # Native datetime cells: numpy's own conversion of datetime objects is
+        # several times slower than computing the seconds from the fields
+        seconds = ((value.toordinal() - EPOCH_ORDINAL) * 86400 + value.hour * 3600 + value.minute * 60 + value.second
+                   for value in values)
+        return np.fromiter(seconds, np.int64, len(values)).view("datetime64[s]")
+    except (AttributeError, TypeError):
+        pass  # Blanks, or dates written as strings before the migration
+    try:
+        return np.array(values, dtype="datetime64[s]")
+    except (TypeError, ValueError):
+        # Fall back per value so one malformed cell doesn't drop the sheet
+        converted = []
+        for value in values:
+            try:
+                converted.append(np.datetime64(value, "s"))
+            except (TypeError, ValueError):
+                converted.append(np.datetime64("NaT"))
+        return np.array(converted, dtype="datetime64[s]")
+
+
+def to_int64(values) -> np.ndarray:
+    """Convert a stock/price column to int64, using 0 for blank cells."""
+    return np.array([value if value is not None else 0 for value in values], dtype=np.int64)
+
+
+class SheetSeries:
+    """Columnar view of one product sheet: timestamps, stock and price, sorted by date.
+
+    The columns live in buffers with spare capacity, doubled when full, so
+    ``append`` and ``pop`` are amortised O(1). ``dates``, ``stock`` and
+    ``price`` are views of the used part; a later ``pop`` followed by an
+    ``append`` overwrites the last point they show.
+    """
+
+    def __init__(self, dates, stock, price):
+        dates = to_datetime64(dates)
+        stock = to_int64(stock)
+        price = to_int64(price)
+
+        valid = ~np.isnat(dates)
+        dates, stock, price = dates[valid], stock[valid], price[valid]
+        if dates.size and np.any(dates[1:] < dates[:-1]):
+            order = np.argsort(dates, kind="stable")
+            dates, stock, price = dates[order], stock[order], price[order]
+
+        self._dates, self._stock, self._price = dates, stock, price
+        self._len = dates.size
+
+    @classmethod
+    def from_rows(cls, rows) -> "SheetSeries":
+        """Build from ``(date, name, description, stock, price)`` rows."""
+        dates, stock, price = [], [], []
+        for row in rows:
+            if len(row) < 5:
+                continue
+            dates.append(row[0])
+            stock.append(row[3])
+            price.append(row[4])
+        return cls(dates, stock, price)
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[:self._len]
+
+    @property
+    def stock(self) -> np.ndarray:
+        return self._stock[:self._len]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self._price[:self._len]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _grow(self) -> None:
+        capacity = max(2 * self._dates.size, 16)
+        for name in ("_dates", "_stock", "_price"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._len] = old[:self._len]
+            setattr(self, name, new)
+
+    def append(self, row) -> bool:
+        """Add one row at the end; False if it would break the date order."""
+        date = to_datetime64([row[0]])[0]
+        if np.isnat(date):
+            return True  # Undated rows are left out, as in the constructor
+        if self._len and date < self._dates[self._len - 1]:
+            return False
+        if self._len == self._dates.size:
+            self._grow()
+        self._dates[self._len] = date
+        self._stock[self._len] = to_int64([row[3]])[0]
+        self._price[self._len] = to_int64([row[4]])[0]
+        self._len += 1
+        return True
+
+    def pop(self, row) -> bool:
+        """Drop the last point, which must be ``row``; False if it isn't."""
+        date = to_datetime64([row[0]])[0]
+        if np.isnat(date):
+            return True
+        last = self._len - 1
+        if last < 0 or self._dates[last] != date \
+                or self._stock[last] != to_int64([row[3]])[0] or self._price[last] != to_int64([row[4]])[0]:
+            return False
+        self._len = last
+        return True
+
+    def window(self, start: date = None, end: date = None) -> slice:
+        """Index range of transactions between two dates (both days inclusive)."""
+        lo, hi = 0, self._len
+        if start is not None:
+            lo = int(np.searchsorted(self.dates, np.datetime64(start, "s"), side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(self.dates, np.datetime64(end + timedelta(days=1), "s"), side="left"))
+        return slice(lo, max(lo, hi))
+
+    def between(self, start: date = None, end: date = None):
+        """Return ``(dates, stock, price)`` arrays for the date range."""
+        window = self.window(start, end)
+        return self.dates[window], self.stock[window], self.price[window]
+
+    def price_changes(self, start: date = None, end: date = None) -> np.ndarray:
+        """Consecutive price deltas inside the date range."""
+        return np.diff(self.price[self.window(start, end)])
+
+
+class SeriesCache:
+    """Per-sheet ``SheetSeries`` built on first use and dropped when the workbook changes."""
+
+    def __init__(self):
+        self._series = {}
+
+    def get(self, workbook, sheet_name: str) -> SheetSeries:
+        series = self._series.get(sheet_name)
+        if series is None:
+            ws = workbook[sheet_name]
+            series = SheetSeries.from_rows(ws.iter_rows(min_row=2, values_only=True))
+            self._series[sheet_name] = series
+        return series
+
+    def __contains__(self, sheet_name: str) -> bool:
+        return sheet_name in self._series
+
+    def apply_event(self, event: dict) -> None:
+        """Patch cached series for a change event (see ``events``), dropping what can't be patched."""
+        title = event.get("sheet")
+        series = self._series.get(title)
+        match event["type"]:
+            case "row_appended":
+                if series is not None and not series.append(event["row"]):
+                    self.invalidate(title)
+            case "row_removed":
+                if series is not None and not series.pop(event["row"]):
+                    self.invalidate(title)
+            case "sheet_renamed":
+                if series is not None:
+                    self._series[event["title"]] = self._series.pop(title)
+            case "sheet_deleted":
+                self.invalidate(title)
+            case "reset":
+                self.invalidate()
+
+    def invalidate(self, sheet_name: str = None) -> None:
+        """Forget one sheet, or every sheet when no name is given."""
+        if sheet_name is None:
+            self._series.clear()
+        else:
+            self._series.pop(sheet_name, None)
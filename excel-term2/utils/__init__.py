@@ -1 +1,7 @@
-from .constants import excel_file_path, EXCEL_FILE, data_folder
\ No newline at end of file
+from .constants import excel_file_path, EXCEL_FILE, data_folder, STORAGE_BACKEND, DB_FILE, db_file_path, \
+    storage_file_path, SQLITE_SUFFIXES, HEADERS, DATE_FORMAT, FLUSH_EVERY, FLUSH_INTERVAL, BULK_WRITE_ONLY_ROWS, \
+    BULK_IMPORT_CHUNK,     JOURNAL_WRITES, JOURNAL_SUFFIX, JOURNAL_MAX_BYTES, JOURNAL_MAX_AGE, INDEX_SUFFIX, ROLLUP_SUFFIX, ROLLUP_GRANULARITIES, \
+    TABLE_PAGE_SIZE, TABLE_PAGE_SIZES, TABLE_BUFFER_ROWS, IO_POLL_MS, CANCEL_CHECK_ROWS, STARTUP_BUDGET, CHART_MARKER_POINTS, \
+    AGGREGATE_MIN_PARALLEL_SHEETS, ANALYTICS_CHUNK_SHEETS, ANALYTICS_TOP, SHEET_CACHE_SIZE, SQLITE_FETCH_ROWS, \
+    PERF_ENABLED, PERF_MAX_SAMPLES, PERF_TRACE_EVENTS, PERF_PANEL_REFRESH_MS, \
+    SERVER_SOCKET_SUFFIX, SERVER_BATCH_SIZE, SERVER_BATCH_WAIT, SERVER_TIMEOUT
@@ -2,4 +2,86 @@ import os
 
 EXCEL_FILE = 'products.xlsx'
 data_folder = 'datas'
-excel_file_path = os.path.join(data_folder, EXCEL_FILE)
\ No newline at end of file
+excel_file_path = os.path.join(data_folder, EXCEL_FILE)
+
+# Storage backend: 'xlsx' keeps the workbook, 'sqlite' the indexed database.
+# Paths ending in one of SQLITE_SUFFIXES are opened with the SQLite backend.
+STORAGE_BACKEND = 'xlsx'
+DB_FILE = 'products.db'
+db_file_path = os.path.join(data_folder, DB_FILE)
+storage_file_path = db_file_path if STORAGE_BACKEND == 'sqlite' else excel_file_path
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+HEADERS = ["Transaction Date", "Name", "Description", "Stock", "Price"]
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# ProductStore write-back schedule: save after this many operations or seconds
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 5.0
+
+# bulk_import switches to a streamed write-only save from this many rows on,
+# and spools validated rows to disk this many at a time
+BULK_WRITE_ONLY_ROWS = 5000
+BULK_IMPORT_CHUNK = 5000
+
+# Journaled writes: append operations to a sidecar log and fold it into the
+# workbook once it grows past this many bytes or its oldest record is this old
+JOURNAL_WRITES = False
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_MAX_BYTES = 1024 * 1024
+JOURNAL_MAX_AGE = 300.0
+
+# Sidecar metadata index (sheet order, last record, row count, date range)
+INDEX_SUFFIX = '.index.json'
+
+# Price/stock rollups (rollups.py), coarsest granularity first; workbooks keep
+# them in a sidecar database, SQLite stores in their own database
+ROLLUP_SUFFIX = '.rollup.db'
+ROLLUP_GRANULARITIES = ('month', 'week', 'day')
+
+# Virtualized product table
+TABLE_PAGE_SIZE = 50
+TABLE_PAGE_SIZES = [25, 50, 100, 250, 500]
+TABLE_BUFFER_ROWS = 50
+
+# How often the GUI checks the background I/O worker for finished jobs, and
+# how many rows a load reads between checks for being cancelled
+IO_POLL_MS = 50
+CANCEL_CHECK_ROWS = 5000
+
+# Seconds from launch to the first sheet on screen the GUI and the benchmark
+# report against
+STARTUP_BUDGET = 1.5
+
+# Chart lines with at most this many plotted points get point markers
+CHART_MARKER_POINTS = 200
+
+# Below this many sheets aggregation runs in-process instead of a process pool
+AGGREGATE_MIN_PARALLEL_SHEETS = 50
+
+# Analytics (analytics.py): sheets folded per NumPy pass, and how many
+# products and stock drops the rankings keep
+ANALYTICS_CHUNK_SHEETS = 200
+ANALYTICS_TOP = 10
+
+# Parsed sheets kept by the read-only workbook reader
+SHEET_CACHE_SIZE = 8
+
+# Rows fetched per query when streaming a product out of SQLite
+SQLITE_FETCH_ROWS = 5000
+
+# Instrumentation (perf.py): recording state at start-up, samples kept per
+# span for the percentiles, spans kept for the trace export, panel refresh
+PERF_ENABLED = os.environ.get('PRODUCTS_PERF', '') not in ('', '0')
+PERF_MAX_SAMPLES = 1000
+PERF_TRACE_EVENTS = 10000
+PERF_PANEL_REFRESH_MS = 1000
+
+# Write daemon (server.py): it listens on the storage path plus this suffix,
+# applies queued operations in order and saves once per batch of at most
+# SERVER_BATCH_SIZE operations, optionally waiting SERVER_BATCH_WAIT seconds
+# for more; clients give up on a reply after SERVER_TIMEOUT seconds.
+SERVER_SOCKET_SUFFIX = '.sock'
+SERVER_BATCH_SIZE = 100
+SERVER_BATCH_WAIT = 0.0
+SERVER_TIMEOUT = 60.0
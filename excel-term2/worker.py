@@ -0,0 +1,140 @@
+import queue
+import threading
+
+from utils import IO_POLL_MS
+
+
+_local = threading.local()
+
+
+class Cancelled(Exception):
+    """Raised by ``check_cancelled`` in a job that was cancelled while running."""
+
+
+def check_cancelled() -> None:
+    """Stop the calling job if it was cancelled; loaders call it between chunks.
+
+    Does nothing outside an ``IOWorker`` job, so the loaders can be called
+    from anywhere.
+    """
+    job = getattr(_local, "job", None)
+    if job is not None and job.cancelled.is_set():
+        raise Cancelled()
+
+
+class Job:
+    """One unit of work submitted to an ``IOWorker``."""
+
+    def __init__(self, kind: str, func, args: tuple, on_done=None, on_error=None, group=None):
+        self.kind = kind  # "read" or "write"
+        self.group = group
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+
+class IOWorker:
+    """Run workbook I/O on a background thread and hand results back to Tk.
+
+    Jobs run one at a time in submission order, so a load queued after a
+    save sees the saved file. Callbacks are invoked from ``root.after`` on
+    the Tk thread. While a write is pending further writes are refused;
+    reads can be cancelled, in which case their result is dropped and a
+    running one stops at its next ``check_cancelled``.
+    """
+
+    def __init__(self, root, on_state=None, poll_ms: int = IO_POLL_MS):
+        self.root = root
+        self.on_state = on_state
+        self.poll_ms = poll_ms
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._pending = []  # submitted and not yet delivered, touched on the Tk thread only
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.root.after(self.poll_ms, self._poll)
+
+    @property
+    def state(self):
+        """"write" while a save is pending, "read" while a load is, else None."""
+        kinds = {job.kind for job in self._pending}
+        if "write" in kinds:
+            return "write"
+        return "read" if kinds else None
+
+    def has_pending(self, kind: str) -> bool:
+        """Whether a job of this kind was submitted and not delivered yet."""
+        return any(job.kind == kind for job in self._pending)
+
+    def submit(self, kind: str, func, *args, on_done=None, on_error=None, group=None):
+        """Queue ``func(*args)``; returns the Job, or None if a save is in flight."""
+        if kind == "write" and self.state == "write":
+            return None
+        job = Job(kind, func, args, on_done, on_error, group)
+        self._pending.append(job)
+        self._jobs.put(job)
+        self._notify()
+        return job
+
+    def cancel(self, kind: str = "read", group=None) -> None:
+        """Cancel pending jobs of one kind, optionally only one group (saves can't be cancelled)."""
+        if kind == "write":
+            return
+        for job in [job for job in self._pending if job.kind == kind and group in (None, job.group)]:
+            job.cancel()
+            self._pending.remove(job)
+        self._notify()
+
+    def shutdown(self) -> None:
+        self._jobs.put(None)
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if job.cancelled.is_set():
+                continue
+            _local.job = job
+            try:
+                self._results.put((job, job.func(*job.args), None))
+            except Cancelled:
+                pass  # Already dropped by cancel
+            except Exception as e:
+                self._results.put((job, None, e))
+            finally:
+                _local.job = None
+
+    def _poll(self) -> None:
+        try:
+            self._deliver()
+        finally:
+            self.root.after(self.poll_ms, self._poll)
+
+    def _deliver(self) -> None:
+        delivered = False
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job not in self._pending:
+                continue  # Cancelled while running
+            self._pending.remove(job)
+            delivered = True
+            if error is not None:
+                if job.on_error:
+                    job.on_error(error)
+            elif job.on_done:
+                job.on_done(result)
+        if delivered:
+            self._notify()
+
+    def _notify(self) -> None:
+        if self.on_state:
+            self.on_state(self.state)